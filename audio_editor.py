@@ -1,17 +1,19 @@
 # audio_editor.py
 import os
-import subprocess
 from typing import Optional
 import utils
+from ffmpeg_engine import FFmpegEngine, FFmpegJobMixin, get_default_engine
 
 
-class AudioEditor:
-    def __init__(self, ffmpeg_cmd: str = "ffmpeg"):
+class AudioEditor(FFmpegJobMixin):
+    def __init__(self, ffmpeg_cmd: str = "ffmpeg", engine: Optional[FFmpegEngine] = None):
         """
         初始化音频编辑器
         :param ffmpeg_cmd: ffmpeg 命令名称，默认为 'ffmpeg'（需在系统 PATH 中）
+        :param engine: 共享的 ffmpeg 执行引擎，默认使用全局引擎（限制并发进程数）
         """
         self.ffmpeg = ffmpeg_cmd
+        self.engine = engine if engine is not None else get_default_engine()
 
     def _run_ffmpeg(self, cmd_args: list) -> bool:
         """
@@ -19,23 +21,8 @@ class AudioEditor:
         :param cmd_args: ffmpeg 参数列表，如 ['-i', 'input.mp3', 'output.mp3']
         :return: True 表示成功，False 表示失败
         """
-        global full_cmd
-        try:
-            full_cmd = [self.ffmpeg] + cmd_args
-            result = subprocess.run(
-                full_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True
-            )
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"[❌ 音频处理失败，命令：{' '.join(full_cmd)}]")
-            print(f"[错误详情]: {e.stderr.decode('utf-8', errors='ignore')}")
-            return False
-        except Exception as e:
-            print(f"[❌ 未知错误: {e}]")
-            return False
+        # 统一提交到共享执行引擎，由引擎负责进程并发控制与错误日志
+        return self.engine.run([self.ffmpeg] + cmd_args, label="音频处理失败")
 
     # ----------------------------------------------------------------------
     # 【1】音量控制
@@ -91,6 +78,8 @@ class AudioEditor:
         :return: 是否成功
         """
         duration = utils.get_video_duration(input_path)
+        if duration is None:
+            return False
         fade_out_duration_st = duration - float(fade_out_duration)
 
         safe_output = utils.get_output_filepath(os.path.dirname(output_path), os.path.basename(output_path))
@@ -0,0 +1,264 @@
+# batch_cli.py
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from ffmpeg_engine import FFmpegEngine
+from job_metrics import JobMetrics
+from job_queue import JobResult, RenderJob, default_worker_id
+from operations import OperationRunner, resolve_operation
+from resource_governor import ResourceGovernor
+
+# ======================================================================
+# 批处理命令行：按清单（JSON / YAML）批量执行编辑操作
+#   python batch_cli.py jobs.json --jobs 8
+# 清单格式（YAML 结构相同，需要安装 PyYAML）：
+#   {"jobs": [{"operation": "ExportDistributor.export_for_douyin",
+#              "params": {"input_path": "in.mp4", "output_path": "out.mp4"}}, ...]}
+# 每个作业完成后追加一行到日志（journal），中断后重新运行同一清单会跳过已成功的作业。
+# ======================================================================
+
+# 同时排队等待执行的作业数 = 并发数 × _SUBMIT_WINDOW（清单很大时不会一次创建全部 Future）
+_SUBMIT_WINDOW = 4
+
+
+def load_manifest(path: str) -> List[RenderJob]:
+    """
+    读取作业清单
+    :param path: .json / .yaml / .yml 文件；顶层为 {"jobs": [...]} 或直接为作业列表
+    :return: RenderJob 列表（未指定 id 的作业按操作名与参数生成稳定 ID，清单调整顺序后仍能续跑）
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("读取 YAML 清单需要安装 PyYAML（pip install pyyaml），或改用 JSON 清单")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    entries = data.get('jobs', []) if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("清单格式错误：需要作业列表或 {\"jobs\": [...]}")
+
+    jobs, errors = [], []
+    for index, entry in enumerate(entries):
+        operation = entry.get('operation') if isinstance(entry, dict) else None
+        params = entry.get('params', {}) if isinstance(entry, dict) else None
+        try:
+            if not operation or not isinstance(params, dict):
+                raise ValueError("缺少 operation 或 params")
+            resolve_operation(operation)
+        except ValueError as e:
+            errors.append(f"第 {index + 1} 个作业：{e}")
+            continue
+        jobs.append(RenderJob(operation, params, job_id=str(entry.get('id') or job_id_for(operation, params))))
+    if errors:
+        raise ValueError("清单中有无效作业：\n" + "\n".join(errors))
+    return jobs
+
+
+def job_id_for(operation: str, params: Dict[str, Any]) -> str:
+    """由操作名与参数生成的稳定作业 ID"""
+    identity = json.dumps({'operation': operation, 'params': params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(identity.encode('utf-8'), digest_size=10).hexdigest()
+
+
+class BatchJournal:
+    """
+    作业日志（JSON Lines）：每个作业完成后追加一行 JobResult，进程被中断最多丢失正在写入的一行
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._checked_tail = False
+
+    def results(self) -> Iterator[JobResult]:
+        """读取已有记录（忽略中断时写了一半的最后一行）"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield JobResult.from_dict(json.loads(line))
+                except (ValueError, TypeError):
+                    continue
+
+    def completed(self) -> Set[str]:
+        """已成功完成的作业 ID"""
+        done: Set[str] = set()
+        for result in self.results():
+            if result.ok:
+                done.add(result.job_id)
+            else:
+                done.discard(result.job_id)
+        return done
+
+    def append(self, result: JobResult) -> None:
+        line = json.dumps(result.to_dict(), ensure_ascii=False) + "\n"
+        with self._lock:
+            if not self._checked_tail:
+                # 上次运行在写入中途被终止时，文件以半行结尾：先补上换行，否则新记录会接在半行后面而无法解析
+                self._checked_tail = True
+                if self._ends_with_partial_line():
+                    line = "\n" + line
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _ends_with_partial_line(self) -> bool:
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except OSError:
+            return False
+
+
+class BatchRunner:
+    """按清单并发执行作业，写日志并统计吞吐量"""
+
+    def __init__(self, journal_path: str, concurrency: int = 4, ffmpeg_cmd: str = "ffmpeg",
+                 engine: Optional[FFmpegEngine] = None):
+        """
+        :param journal_path: 作业日志路径
+        :param concurrency: 同时执行的作业数（ffmpeg 进程总数仍受引擎 max_processes 限制）
+        :param ffmpeg_cmd: ffmpeg 命令名称
+        :param engine: 共享的 ffmpeg 执行引擎，默认使用全局引擎
+        """
+        self.journal = BatchJournal(journal_path)
+        self.concurrency = max(1, int(concurrency))
+        self.runner = OperationRunner(ffmpeg_cmd, engine)
+        self.worker_id = default_worker_id()
+        self._stop = threading.Event()
+
+    def execute(self, job: RenderJob) -> JobResult:
+        """执行一个作业（异常记录到结果中，不会中断批处理）"""
+        started = time.time()
+        try:
+            ok = self.runner.run(job.operation, job.params) is not False
+            error = None if ok else "操作返回 False"
+        except Exception:
+            ok, error = False, traceback.format_exc(limit=5)
+        return JobResult(job.job_id, ok, self.worker_id, started, time.time(), error)
+
+    def run(self, jobs: List[RenderJob]) -> Dict[str, Any]:
+        """
+        执行清单中尚未成功的作业
+        :return: 统计信息 {"total", "skipped", "ok", "failed", "elapsed", "interrupted", "by_operation"}
+        """
+        done = self.journal.completed()
+        pending = [job for job in jobs if job.job_id not in done]
+        stats: Dict[str, Any] = {'total': len(jobs), 'skipped': len(jobs) - len(pending), 'ok': 0, 'failed': 0,
+                                 'interrupted': False, 'by_operation': {}}
+        if stats['skipped']:
+            print(f"[⏭️ 跳过 {stats['skipped']} 个已完成的作业（{self.journal.path}）]")
+        started = time.perf_counter()
+        running: Dict[Future, RenderJob] = {}
+        queue = iter(pending)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch-job") as pool:
+            try:
+                while True:
+                    # 有界提交：排队中的作业不超过并发数的 _SUBMIT_WINDOW 倍
+                    while not self._stop.is_set() and len(running) < self.concurrency * _SUBMIT_WINDOW:
+                        job = next(queue, None)
+                        if job is None:
+                            break
+                        running[pool.submit(self.execute, job)] = job
+                    if not running:
+                        break
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self._record(running.pop(future), future.result(), stats)
+            except KeyboardInterrupt:
+                # 未开始的作业取消，已开始的作业执行完并写入日志，重新运行时从这里继续
+                stats['interrupted'] = True
+                for future in running:
+                    future.cancel()
+                for future, job in running.items():
+                    if not future.cancelled():
+                        self._record(job, future.result(), stats)
+        stats['elapsed'] = time.perf_counter() - started
+        return stats
+
+    def stop(self) -> None:
+        """停止提交新作业（已提交的作业继续执行）"""
+        self._stop.set()
+
+    def _record(self, job: RenderJob, result: JobResult, stats: Dict[str, Any]) -> None:
+        self.journal.append(result)
+        stats['ok' if result.ok else 'failed'] += 1
+        per_operation = stats['by_operation'].setdefault(job.operation, {'count': 0, 'failed': 0, 'seconds': 0.0})
+        per_operation['count'] += 1
+        per_operation['failed'] += 0 if result.ok else 1
+        per_operation['seconds'] += result.duration
+        if not result.ok:
+            print(f"[❌ {job.operation} {job.job_id}] {(result.error or '').strip().splitlines()[-1:]}")
+
+
+def print_summary(stats: Dict[str, Any]) -> None:
+    """打印吞吐量统计"""
+    executed = stats['ok'] + stats['failed']
+    elapsed = stats.get('elapsed') or 0.0
+    rate = executed / elapsed if elapsed > 0 else 0.0
+    print("=" * 60)
+    print(f"[📊 批处理{'（已中断）' if stats['interrupted'] else ''}] 共 {stats['total']} 个作业："
+          f"成功 {stats['ok']}，失败 {stats['failed']}，跳过 {stats['skipped']}")
+    print(f"[⏱️ 耗时 {elapsed:.1f}s，吞吐量 {rate:.2f} 作业/秒（{rate * 60:.1f} 作业/分钟）]")
+    for operation, values in sorted(stats['by_operation'].items()):
+        print(f"    {operation}: {values['count']} 个，失败 {values['failed']}，"
+              f"平均 {values['seconds'] / values['count']:.2f}s")
+    print("=" * 60)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口：python batch_cli.py jobs.json --jobs 8；全部成功返回 0，有失败返回 1，中断返回 130"""
+    parser = argparse.ArgumentParser(description="AutoVideoClip 批处理：按清单执行编辑操作")
+    parser.add_argument('manifest', help="作业清单（.json / .yaml）")
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, help="同时执行的作业数")
+    parser.add_argument('--journal', default=None, help="作业日志路径，默认 <清单>.journal.jsonl")
+    parser.add_argument('--restart', action='store_true', help="忽略已有日志，重新执行全部作业")
+    parser.add_argument('--ffmpeg', default="ffmpeg", help="ffmpeg 命令名称")
+    parser.add_argument('--max-processes', type=int, default=None, help="同时运行的 ffmpeg 进程数")
+    parser.add_argument('--governor', choices=('off', 'on', 'pin'), default='off',
+                        help="资源调度：on 按核心数与并行作业数分配线程数，pin 同时绑定 CPU")
+    parser.add_argument('--job-log', default=None, help="ffmpeg 资源记录（JSON Lines）文件路径")
+    parser.add_argument('--metrics-textfile', default=None, help="Prometheus textfile 路径")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"[❌ 读取清单失败：{e}]")
+        return 2
+    journal_path = args.journal or f"{args.manifest}.journal.jsonl"
+    if args.restart and os.path.exists(journal_path):
+        os.remove(journal_path)
+
+    governor = ResourceGovernor(pin=args.governor == 'pin') if args.governor != 'off' else None
+    metrics = JobMetrics(args.job_log, args.metrics_textfile) if args.job_log or args.metrics_textfile else None
+    engine = FFmpegEngine(max_processes=args.max_processes, governor=governor, metrics=metrics)
+    runner = BatchRunner(journal_path, concurrency=args.jobs, ffmpeg_cmd=args.ffmpeg, engine=engine)
+    print(f"[🚀 批处理开始：{len(jobs)} 个作业，并发 {runner.concurrency}，日志 {journal_path}]")
+    stats = runner.run(jobs)
+    engine.shutdown()
+    print_summary(stats)
+    if stats['interrupted']:
+        return 130
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
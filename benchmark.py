@@ -0,0 +1,367 @@
+# benchmark.py
+import argparse
+import fnmatch
+import inspect
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource  # 仅 Unix：统计子进程的 CPU 时间与峰值内存
+except ImportError:
+    resource = None
+
+from ffmpeg_engine import FFmpegEngine, FFmpegJobMixin
+from media_factory import DEFAULT_MEDIA_CACHE, MediaFactory, MediaSpec
+from operations import EDITOR_CLASSES, OperationRunner, resolve_operation
+
+# ======================================================================
+# 性能基准：在标准合成素材上运行六个编辑器类的每个公开方法，
+# 记录墙钟时间、ffmpeg 子进程的 CPU 时间与峰值内存、实时倍率，写入 JSON 历史，
+# 与历史基线相比变慢超过阈值时返回非零退出码。
+#   python benchmark.py --clips 720p:10 1080p:60 --methods "ColorCorrection.*"
+# ======================================================================
+
+# 标准素材：分辨率 × 时长（秒）
+CLIP_RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+CLIP_DURATIONS = (10, 60, 600)
+CLIP_FPS = 30
+DEFAULT_CLIPS = ("720p:10",)
+
+# 基准历史（回归基线）保存在独立的 benchmarks/ 目录：outputs/ 每次运行测试都会被清空
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "benchmark_history.json")
+# 回归判定：比最近 BASELINE_RUNS 次的中位数慢 threshold 以上，且绝对差超过 NOISE_FLOOR_SECONDS
+DEFAULT_THRESHOLD = 0.10
+BASELINE_RUNS = 5
+NOISE_FLOOR_SECONDS = 0.05
+REGRESSION_METRICS = ('wall_time', 'cpu_time')
+
+# 输入 / 输出都是音频的操作（其余操作的主输入为视频）
+AUDIO_OPERATIONS = {
+    "AudioEditor.adjust_volume", "AudioEditor.apply_audio_fade", "AudioEditor.trim_audio_by_time",
+    "AudioEditor.apply_equalizer", "AudioEditor.apply_echo_effect", "AudioEditor.apply_highpass_filter",
+    "AudioEditor.apply_lowpass_filter", "AudioEditor.mix_multiple_audio_tracks", "VideoTrimmer.mix_audio_with_delay",
+}
+_VIDEO_PARAMS = {'input_path', 'video_path', 'video1_path', 'video2_path', 'main_video_path', 'pip_video_path'}
+_AUDIO_PARAMS = {'audio_path', 'audio1_path', 'audio2_path', 'bgm_path'}
+_IMAGE_PARAMS = {'watermark_path', 'graphic_path', 'ar_path'}
+
+
+class ClipSpec:
+    """标准合成素材的规格，文本形式为 "分辨率:时长"，如 "1080p:60" """
+
+    __slots__ = ('name', 'width', 'height', 'duration')
+
+    def __init__(self, name: str, width: int, height: int, duration: float):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.duration = duration
+
+    @classmethod
+    def parse(cls, text: str) -> "ClipSpec":
+        resolution, _, duration = text.partition(':')
+        if resolution not in CLIP_RESOLUTIONS:
+            raise ValueError(f"未知的素材分辨率：{resolution}，可选值：{', '.join(CLIP_RESOLUTIONS)}")
+        width, height = CLIP_RESOLUTIONS[resolution]
+        return cls(resolution, width, height, float(duration or CLIP_DURATIONS[0]))
+
+    def __str__(self) -> str:
+        return f"{self.name}:{self.duration:g}"
+
+
+class BenchmarkMedia:
+    """某个规格的合成素材（视频 / 音频 / 图片），由 MediaFactory 按规格缓存在 media_dir 中，只生成一次"""
+
+    def __init__(self, spec: ClipSpec, media_dir: str = DEFAULT_MEDIA_CACHE, ffmpeg_cmd: str = "ffmpeg"):
+        self.spec = spec
+        self.factory = MediaFactory(media_dir, ffmpeg_cmd)
+        self.specs = [
+            MediaSpec.video(spec.duration, spec.width, spec.height, fps=CLIP_FPS, video_codec='libx264'),
+            MediaSpec.audio(spec.duration, frequency=220, extension='.m4a'),
+            MediaSpec.image(spec.height // 4, spec.height // 4),
+        ]
+        self.video, self.audio, self.image = [self.factory.path_for(media) for media in self.specs]
+
+    def prepare(self) -> bool:
+        """生成缺失的素材，返回是否全部就绪"""
+        return all(self.factory.generate_many(self.specs))
+
+
+def benchmark_operations(patterns: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    所有会渲染输出文件的公开方法（有 output_path 等输出参数），可按通配符过滤
+    :param patterns: 如 ["ColorCorrection.*", "VideoTrimmer.trim_by_segments"]，None 表示全部
+    """
+    operations = []
+    for class_name, cls in EDITOR_CLASSES.items():
+        for method_name, fn in inspect.getmembers(cls, inspect.isfunction):
+            if method_name.startswith('_') or hasattr(FFmpegJobMixin, method_name):
+                continue
+            params = inspect.signature(fn).parameters
+            if not any(name.startswith('output') for name in params):
+                continue
+            operation = f"{class_name}.{method_name}"
+            if patterns is None or any(fnmatch.fnmatchcase(operation, pattern) for pattern in patterns):
+                operations.append(operation)
+    return sorted(operations)
+
+
+def build_params(operation: str, media: BenchmarkMedia, work_dir: str) -> Dict[str, Any]:
+    """
+    为一次基准调用生成关键字参数：输入指向合成素材，输出写入 work_dir，时间参数按素材时长取比例
+    :return: 关键字参数
+    """
+    cls, method_name = resolve_operation(operation)
+    duration = media.spec.duration
+    audio_only = operation in AUDIO_OPERATIONS
+    output_ext = ".mp3" if audio_only else ".mp4"
+
+    def at(fraction: float) -> str:
+        return f"{duration * fraction:g}"
+
+    values = {
+        'start_time': at(0.1),
+        'end_time': at(0.6),
+        'segments': [(at(0.1), at(0.3)), (at(0.5), at(0.7))],
+        'speed_map': [(at(0.2), at(0.4), 2.0), (at(0.6), at(0.8), 0.5)],
+        'speed': 2.0,
+        'effect_expr': "eq=brightness=0.1",
+        'title_text': "Benchmark",
+        'subtitle_text': "Benchmark",
+        'resolution': "1080:1920",
+        'bitrate': "5M",
+        'video_paths': [media.video, media.video],
+        'audio_paths': [media.audio, media.audio],
+        'operations': [("adjust_brightness", {"brightness": 0.1}), ("apply_sharpen", {})],
+        'video_args': ['-c:v', 'libx264', '-preset', 'medium', '-crf', '23'],
+        'audio_args': ['-c:a', 'aac', '-b:a', '192k'],
+        'outputs_by_platform': {platform_name: os.path.join(work_dir, f"{platform_name}.mp4")
+                                for platform_name in ("douyin", "bilibili")},
+        'output_audio_path': os.path.join(work_dir, "output_audio.mp3"),
+    }
+    params = {}
+    for name, param in list(inspect.signature(getattr(cls, method_name)).parameters.items())[1:]:
+        if param.default is not inspect.Parameter.empty:
+            continue
+        if name in values:
+            params[name] = values[name]
+        elif name == 'input_path' and audio_only:
+            params[name] = media.audio
+        elif name in _VIDEO_PARAMS:
+            params[name] = media.video
+        elif name in _AUDIO_PARAMS:
+            params[name] = media.audio
+        elif name in _IMAGE_PARAMS:
+            params[name] = media.image
+        elif name.startswith('output'):
+            params[name] = os.path.join(work_dir, name + output_ext)
+        else:
+            raise ValueError(f"{operation} 的参数 {name} 没有基准取值")
+    return params
+
+
+def _children_usage() -> Tuple[Optional[float], Optional[int]]:
+    """已结束子进程累计的 CPU 时间（秒）与其中最大的峰值内存（KB）"""
+    if resource is None:
+        return None, None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # macOS 的 ru_maxrss 单位为字节，Linux 为 KB
+    peak = usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    return usage.ru_utime + usage.ru_stime, peak
+
+
+def run_case(operation: str, params: Dict[str, Any], ffmpeg_cmd: str = "ffmpeg",
+             engine: Optional[FFmpegEngine] = None) -> Dict[str, Any]:
+    """
+    在当前进程中执行一次基准调用并计量
+    CPU 时间取调用前后 RUSAGE_CHILDREN 的差值；峰值内存是进程生命周期内最大的子进程，
+    准确计量需要每个用例单独一个进程（见 run_case_isolated）
+    :return: {"ok", "wall_time", "cpu_time", "peak_rss_kb"}
+    """
+    runner = OperationRunner(ffmpeg_cmd, engine or FFmpegEngine())
+    cpu_before, _ = _children_usage()
+    start = time.perf_counter()
+    try:
+        ok = runner.run(operation, params) is not False
+    except Exception as e:
+        print(f"[❌ {operation} 执行异常：{e!r}]")
+        ok = False
+    wall_time = time.perf_counter() - start
+    cpu_after, peak_rss = _children_usage()
+    return {
+        'ok': ok,
+        'wall_time': wall_time,
+        'cpu_time': cpu_after - cpu_before if cpu_after is not None else None,
+        'peak_rss_kb': peak_rss,
+    }
+
+
+def run_case_isolated(operation: str, clip: ClipSpec, media_dir: str, ffmpeg_cmd: str = "ffmpeg") -> Dict[str, Any]:
+    """在独立的子进程中执行一次基准调用，使子进程统计只包含本用例的 ffmpeg"""
+    fd, result_file = tempfile.mkstemp(prefix="bench_", suffix=".json")
+    os.close(fd)
+    try:
+        cmd = [sys.executable, os.path.abspath(__file__), '--case', operation, '--clips', str(clip),
+               '--media-dir', media_dir, '--ffmpeg', ffmpeg_cmd, '--result-file', result_file]
+        subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=False)
+        with open(result_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return json.loads(content) if content else {'ok': False, 'wall_time': None, 'cpu_time': None,
+                                                     'peak_rss_kb': None}
+    finally:
+        os.remove(result_file)
+
+
+class BenchmarkHistory:
+    """
+    JSON 格式的基准历史：{"runs": [{"timestamp", "host", "commit", "results": {用例: 指标}}, ...]}
+    用例名为 "操作名@素材规格"，如 "ColorCorrection.apply_denoise@1080p:60"
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY):
+        self.path = path
+        self.runs: List[Dict[str, Any]] = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.runs = json.load(f).get('runs', [])
+
+    def baseline(self, case: str, metric: str, runs: int = BASELINE_RUNS) -> Optional[float]:
+        """最近 runs 次成功记录的中位数，没有历史时返回 None"""
+        samples = [run['results'][case][metric] for run in self.runs
+                   if run['results'].get(case, {}).get('ok') and run['results'][case].get(metric) is not None]
+        return statistics.median(samples[-runs:]) if samples else None
+
+    def regressions(self, results: Dict[str, Dict[str, Any]], threshold: float = DEFAULT_THRESHOLD,
+                    runs: int = BASELINE_RUNS) -> List[Tuple[str, str, float, float]]:
+        """
+        与历史基线比较，找出变慢超过阈值的用例
+        :return: [(用例, 指标, 基线, 本次), ...]
+        """
+        found = []
+        for case, result in sorted(results.items()):
+            if not result.get('ok'):
+                continue
+            for metric in REGRESSION_METRICS:
+                current, base = result.get(metric), self.baseline(case, metric, runs)
+                if current is None or base is None:
+                    continue
+                if current > base * (1 + threshold) and current - base > NOISE_FLOOR_SECONDS:
+                    found.append((case, metric, base, current))
+        return found
+
+    def append(self, results: Dict[str, Dict[str, Any]]) -> None:
+        self.runs.append({
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'host': platform.node(),
+            'commit': _git_commit(),
+            'results': results,
+        })
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        partial = self.path + ".partial"
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump({'runs': self.runs}, f, ensure_ascii=False, indent=2)
+        os.replace(partial, self.path)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(clips: Sequence[ClipSpec], operations: Sequence[str], media_dir: str = DEFAULT_MEDIA_CACHE,
+                   ffmpeg_cmd: str = "ffmpeg", repeat: int = 1) -> Dict[str, Dict[str, Any]]:
+    """
+    依次运行所有用例（每个用例每次都在独立进程中执行，互不干扰），重复多次时各指标取中位数
+    :return: {用例: {"ok", "wall_time", "cpu_time", "peak_rss_kb", "realtime_factor"}}
+    """
+    results = {}
+    for clip in clips:
+        if not BenchmarkMedia(clip, media_dir, ffmpeg_cmd).prepare():
+            continue
+        for operation in operations:
+            samples = [run_case_isolated(operation, clip, media_dir, ffmpeg_cmd) for _ in range(max(1, repeat))]
+            result = {'ok': all(sample['ok'] for sample in samples)}
+            for metric in ('wall_time', 'cpu_time', 'peak_rss_kb'):
+                values = [sample[metric] for sample in samples if sample.get(metric) is not None]
+                result[metric] = statistics.median(values) if values else None
+            # 实时倍率：素材时长 / 处理耗时，大于 1 表示比实时播放更快
+            wall_time = result['wall_time']
+            result['realtime_factor'] = clip.duration / wall_time if wall_time else None
+            case = f"{operation}@{clip}"
+            results[case] = result
+            status = "✅" if result['ok'] else "❌"
+            print(f"[{status} {case}] {wall_time or 0:.2f}s，CPU {result['cpu_time'] or 0:.2f}s，"
+                  f"峰值内存 {(result['peak_rss_kb'] or 0) / 1024:.0f}MB，"
+                  f"实时倍率 {result['realtime_factor'] or 0:.2f}x")
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口：运行基准、写入历史并检查回归；有失败或回归时返回 1"""
+    parser = argparse.ArgumentParser(description="AutoVideoClip 性能基准")
+    parser.add_argument('--clips', nargs='+', default=list(DEFAULT_CLIPS),
+                        help=f"素材规格，如 720p:10 1080p:60 4k:600（分辨率：{', '.join(CLIP_RESOLUTIONS)}）")
+    parser.add_argument('--methods', nargs='+', default=None, help="要运行的操作（支持通配符），默认全部")
+    parser.add_argument('--repeat', type=int, default=1, help="每个用例重复次数（取中位数）")
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="JSON 历史文件")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="回归阈值，0.1 表示慢 10%%")
+    parser.add_argument('--baseline-runs', type=int, default=BASELINE_RUNS, help="基线取最近多少次的中位数")
+    parser.add_argument('--media-dir', default=DEFAULT_MEDIA_CACHE, help="合成素材缓存目录")
+    parser.add_argument('--ffmpeg', default="ffmpeg", help="ffmpeg 命令名称")
+    parser.add_argument('--no-save', action='store_true', help="只比较，不写入历史")
+    parser.add_argument('--list', action='store_true', help="列出所有可运行的操作")
+    # 内部使用：在子进程中执行单个用例，结果写入 --result-file
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(benchmark_operations()))
+        return 0
+    clips = [ClipSpec.parse(text) for text in args.clips]
+    if args.case:
+        media = BenchmarkMedia(clips[0], args.media_dir, args.ffmpeg)
+        work_dir = tempfile.mkdtemp(prefix="bench_case_")
+        try:
+            result = run_case(args.case, build_params(args.case, media, work_dir), args.ffmpeg)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        with open(args.result_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return 0 if result['ok'] else 1
+
+    operations = benchmark_operations(args.methods)
+    if not operations:
+        print(f"[❌ 没有匹配的操作：{' '.join(args.methods)}]")
+        return 1
+    history = BenchmarkHistory(args.history)
+    results = run_benchmarks(clips, operations, args.media_dir, args.ffmpeg, args.repeat)
+    regressions = history.regressions(results, args.threshold, args.baseline_runs)
+    failures = [case for case, result in results.items() if not result['ok']]
+    if not args.no_save:
+        history.append(results)
+        history.save()
+
+    for case, metric, base, current in regressions:
+        print(f"[📉 性能回归] {case} {metric}: {base:.3f}s → {current:.3f}s（+{(current / base - 1) * 100:.1f}%）")
+    print(f"[📊 基准完成] {len(results)} 个用例，{len(failures)} 个失败，{len(regressions)} 项回归"
+          f"（阈值 {args.threshold * 100:.0f}%）")
+    return 1 if regressions or failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# chunked_encoder.py
+import os
+import tempfile
+from typing import List, Optional, Tuple
+
+from ffmpeg_engine import FFmpegEngine, defer_cleanup
+from media_probe import probe, probe_keyframes
+
+# 每个分段的最短时长（秒）：分段太短时进程启动与编码器预热的开销占比过高
+MIN_CHUNK_SECONDS = 10.0
+# 每个并行进程分到的分段数：关键帧间隔不均匀时，多切几段可以让各进程的负载更平均
+CHUNKS_PER_PROCESS = 2
+
+
+def plan_chunks(keyframes: List[float], duration: float, chunk_count: int,
+                min_chunk_seconds: float = MIN_CHUNK_SECONDS) -> List[Tuple[float, Optional[float]]]:
+    """
+    在关键帧处把视频切分为若干时长接近的分段
+    :param keyframes: 关键帧时间（秒，升序，见 media_probe.probe_keyframes）
+    :param duration: 视频总时长（秒）
+    :param chunk_count: 期望的分段数
+    :param min_chunk_seconds: 分段最短时长
+    :return: [(起点, 时长), ...]，最后一段时长为 None（读到文件结尾）；无法切分时只有一段
+    """
+    chunk_count = max(1, min(chunk_count, int(duration // max(min_chunk_seconds, 0.001))))
+    starts = [0.0]
+    for index in range(1, chunk_count):
+        target = duration * index / chunk_count
+        # 选择离理想切点最近的关键帧，且与上一个切点、文件结尾都保持足够距离
+        candidates = [t for t in keyframes
+                      if t - starts[-1] >= min_chunk_seconds and duration - t >= min_chunk_seconds]
+        if not candidates:
+            break
+        cut = min(candidates, key=lambda t: abs(t - target))
+        if cut > starts[-1]:
+            starts.append(cut)
+
+    chunks: List[Tuple[float, Optional[float]]] = []
+    for index, start in enumerate(starts):
+        is_last = index == len(starts) - 1
+        chunks.append((start, None if is_last else round(starts[index + 1] - start, 6)))
+    return chunks
+
+
+def encode_in_chunks(engine: FFmpegEngine, ffmpeg_cmd: str, input_path: str, output_path: str,
+                     video_args: List[str], audio_args: List[str], output_args: List[str],
+                     label: str = "分段编码失败", chunk_count: Optional[int] = None,
+                     min_chunk_seconds: float = MIN_CHUNK_SECONDS) -> bool:
+    """
+    分段并行编码：在关键帧处切分输入，各分段以相同的视频编码参数（码率控制一致）由多个 ffmpeg 并行编码，
+    音频整体编码一次（避免 AAC 在分段边界产生的静音间隙），最后用 concat 以 -c copy 无损拼接。
+    分段从关键帧开始、到下一段的关键帧之前结束，各段帧互不重叠也不遗漏。
+    输入太短或无法获取关键帧时，退化为一次普通编码。
+    注意：video_args 中的滤镜会在每个分段上单独执行，只适用于与时间无关的滤镜（缩放、调色等）。
+    :param engine: ffmpeg 执行引擎，并行数受其 max_processes 限制
+    :param ffmpeg_cmd: ffmpeg 命令名称
+    :param video_args: 视频滤镜与编码参数，如 ['-vf', 'scale=1080:1920', '-c:v', 'libx264', '-crf', '23']
+    :param audio_args: 音频编码参数，如 ['-c:a', 'aac', '-b:a', '192k']
+    :param output_args: 容器参数，如 ['-movflags', '+faststart']
+    :param chunk_count: 分段数，默认 max_processes * CHUNKS_PER_PROCESS
+    :param min_chunk_seconds: 分段最短时长（秒）
+    :return: 是否成功
+    """
+    info = probe(input_path)
+    keyframes = probe_keyframes(input_path) if info is not None and info.has_video else None
+    chunk_count = chunk_count or engine.max_processes * CHUNKS_PER_PROCESS
+    chunks = plan_chunks(keyframes, info.duration, chunk_count, min_chunk_seconds) \
+        if keyframes and info.duration else []
+    if len(chunks) < 2:
+        return engine.run([ffmpeg_cmd, '-i', input_path] + video_args + audio_args + output_args + [output_path],
+                          label=label)
+
+    work_dir = tempfile.mkdtemp(prefix="chunks_", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        # 同时运行的编码器平分 CPU 线程，避免每个 libx264 都按全部核数开线程造成过度竞争
+        threads = max(1, (os.cpu_count() or 1) // min(len(chunks), engine.max_processes))
+        commands, chunk_files = [], []
+        for index, (start, length) in enumerate(chunks):
+            chunk_file = os.path.join(work_dir, f"chunk_{index:04d}.mp4")
+            seek = ['-ss', f"{start:.6f}"] + (['-t', f"{length:.6f}"] if length is not None else [])
+            commands.append([ffmpeg_cmd, '-y'] + seek + ['-i', input_path, '-an'] + video_args +
+                            ['-threads', str(threads), chunk_file])
+            chunk_files.append(chunk_file)
+
+        audio_file = None
+        if info.has_audio:
+            audio_file = os.path.join(work_dir, "audio.m4a")
+            commands.append([ffmpeg_cmd, '-y', '-i', input_path, '-vn'] + audio_args + [audio_file])
+
+        list_file = os.path.join(work_dir, "chunks.txt")
+        with open(list_file, 'w', encoding='utf-8') as f:
+            for chunk_file in chunk_files:
+                f.write(f"file '{chunk_file}'\n")
+
+        if not all(engine.run_many(commands, label=label)):
+            return False
+
+        concat = [ffmpeg_cmd, '-y', '-f', 'concat', '-safe', '0', '-i', list_file]
+        if audio_file is not None:
+            concat += ['-i', audio_file, '-map', '0:v', '-map', '1:a']
+        concat += ['-c', 'copy'] + output_args + [output_path]
+        return engine.run(concat, label=label)
+    finally:
+        # 捕获模式下（Project / 异步 API）等命令真正执行之后再删除分段目录
+        defer_cleanup(work_dir)
@@ -1,17 +1,25 @@
 # color_correction.py
+import inspect
 import os
-import subprocess
-#from typing import Optional
-from utils import get_output_filepath
+from typing import Any, Dict, List, Optional, Tuple
+from utils import get_output_filepath, split_top_level
+from ffmpeg_engine import FFmpegEngine, FFmpegJobMixin, capture_commands, get_default_engine
 
+# eq 滤镜中的 gamma 类参数（在亮度 / 对比度 / 饱和度之后生效）
+_EQ_GAMMA_KEYS = ('gamma', 'gamma_r', 'gamma_g', 'gamma_b')
+# eq 滤镜中的线性参数
+_EQ_LINEAR_KEYS = ('contrast', 'brightness', 'saturation')
 
-class ColorCorrection:
-    def __init__(self, ffmpeg_cmd: str = "ffmpeg"):
+
+class ColorCorrection(FFmpegJobMixin):
+    def __init__(self, ffmpeg_cmd: str = "ffmpeg", engine: Optional[FFmpegEngine] = None):
         """
         初始化色彩校正工具
         :param ffmpeg_cmd: ffmpeg 命令名称，默认为 'ffmpeg'（需在系统 PATH 中）
+        :param engine: 共享的 ffmpeg 执行引擎，默认使用全局引擎（限制并发进程数）
         """
         self.ffmpeg = ffmpeg_cmd
+        self.engine = engine if engine is not None else get_default_engine()
 
     def _run_ffmpeg(self, cmd_args: list) -> bool:
         """
@@ -19,23 +27,8 @@ class ColorCorrection:
         :param cmd_args: 参数列表，如 ['-i', 'input.mp4', '-vf', 'eq=...', 'output.mp4']
         :return: True 表示成功，False 表示失败
         """
-        global full_cmd
-        try:
-            full_cmd = [self.ffmpeg] + cmd_args
-            result = subprocess.run(
-                full_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True
-            )
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"[❌ 色彩校正失败，命令：{' '.join(full_cmd)}]")
-            print(f"[错误详情]: {e.stderr.decode('utf-8', errors='ignore')}")
-            return False
-        except Exception as e:
-            print(f"[❌ 未知错误: {e}]")
-            return False
+        # 统一提交到共享执行引擎，由引擎负责进程并发控制与错误日志
+        return self.engine.run([self.ffmpeg] + cmd_args, label="色彩校正失败")
 
     # ----------------------------------------------------------------------
     # 【1】亮度调整
@@ -325,4 +318,158 @@ class ColorCorrection:
         else:
             print(f"[⚠️] 未知风格: {style}")
             return False
-        return self._run_ffmpeg(cmd)
\ No newline at end of file
+        return self._run_ffmpeg(cmd)
+
+    # ----------------------------------------------------------------------
+    # 【17】滤镜链融合：多个调色操作只解码 / 编码一次
+    # ----------------------------------------------------------------------
+
+    # 可以融合进同一条 -vf 滤镜链的调色方法（均为单输入、单 -vf 的操作）
+    GRADE_OPERATIONS = (
+        'adjust_brightness', 'adjust_contrast', 'adjust_saturation', 'apply_cinematic_look',
+        'apply_vintage_look', 'apply_cool_look', 'apply_grayscale', 'apply_sharpen',
+        'apply_hue_shift', 'lift_shadows', 'reduce_highlights', 'adjust_curves',
+        'apply_denoise', 'apply_soft_focus', 'apply_rgb_split', 'apply_preset_style',
+    )
+
+    def grade(self, input_path: str, output_path: str, operations: List[Tuple[str, Dict[str, Any]]]) -> bool:
+        """
+        一次性应用多个调色操作：合并相邻的 eq 参数，生成一条 -vf 滤镜链，只运行一次 ffmpeg
+        :param operations: 操作列表，每个元素为 (方法名, 参数字典)，
+                           如 [("adjust_brightness", {"brightness": 0.1}), ("apply_sharpen", {})]
+        :return: 是否成功
+        """
+        vf = self.build_grade_filter(operations)
+        if vf is None:
+            return False
+        safe_output = get_output_filepath(os.path.dirname(output_path), os.path.basename(output_path))
+        cmd = [
+            '-i', input_path,
+            '-vf', vf,
+            safe_output
+        ]
+        return self._run_ffmpeg(cmd)
+
+    def chain(self) -> "ColorGrade":
+        """
+        创建链式调色构建器，如：
+        corrector.chain().adjust_brightness(0.1).adjust_contrast(1.2).apply_sharpen().render(in, out)
+        """
+        return ColorGrade(self)
+
+    def build_grade_filter(self, operations: List[Tuple[str, Dict[str, Any]]]) -> Optional[str]:
+        """
+        把调色操作列表编译为一条 -vf 滤镜链字符串（不执行 ffmpeg）
+        :return: 滤镜链，如 "eq=contrast=1.2:brightness=0.12,hue=h=30"；操作无效时返回 None
+        """
+        if not operations:
+            print("[❌] 错误：没有提供调色操作")
+            return None
+
+        filters: List[str] = []
+        for name, params in operations:
+            if name not in self.GRADE_OPERATIONS:
+                print(f"[❌] 错误：{name} 不是可融合的调色操作")
+                return None
+            # 复用各方法自身生成的滤镜参数，保证与单独调用时效果一致
+            with capture_commands() as commands:
+                ok = getattr(self, name)('', '', **(params or {}))
+            if not ok or not commands:
+                return None
+            cmd = commands[-1]
+            filters.extend(split_top_level(cmd[cmd.index('-vf') + 1], ','))
+
+        return ",".join(merge_adjacent_eq(filters))
+
+
+class ColorGrade:
+    """
+    链式调色构建器：记录调色操作，render() 时合并为一条滤镜链并只编码一次。
+    支持 ColorCorrection.GRADE_OPERATIONS 中的全部方法，参数与原方法一致（省略输入 / 输出路径）。
+    """
+
+    def __init__(self, corrector: ColorCorrection):
+        self.corrector = corrector
+        self.operations: List[Tuple[str, Dict[str, Any]]] = []
+
+    def __getattr__(self, name: str):
+        if name not in ColorCorrection.GRADE_OPERATIONS:
+            raise AttributeError(f"ColorGrade 不支持操作：{name}")
+        signature = inspect.signature(getattr(ColorCorrection, name))
+
+        def add_operation(*args, **kwargs) -> "ColorGrade":
+            # 按原方法签名绑定参数（跳过 self / input_path / output_path）
+            bound = signature.bind_partial(None, None, None, *args, **kwargs)
+            params = {key: value for key, value in bound.arguments.items()
+                      if key not in ('self', 'input_path', 'output_path')}
+            self.operations.append((name, params))
+            return self
+
+        return add_operation
+
+    def build_filter(self) -> Optional[str]:
+        """返回融合后的 -vf 滤镜链字符串"""
+        return self.corrector.build_grade_filter(self.operations)
+
+    def render(self, input_path: str, output_path: str) -> bool:
+        """执行所有已记录的调色操作（单次 ffmpeg）"""
+        return self.corrector.grade(input_path, output_path, self.operations)
+
+
+# ----------------------------------------------------------------------
+# 【辅助函数】eq 滤镜参数解析与合并
+# ----------------------------------------------------------------------
+def _parse_eq(filter_str: str) -> Optional[Dict[str, float]]:
+    """把 "eq=contrast=1.2:brightness=0.1" 解析为参数字典；非 eq 滤镜返回 None"""
+    if not filter_str.startswith('eq='):
+        return None
+    params = {}
+    for item in filter_str[3:].split(':'):
+        key, _, value = item.partition('=')
+        if key not in _EQ_LINEAR_KEYS + _EQ_GAMMA_KEYS:
+            return None  # 含有无法合并的参数，保持原样
+        params[key] = float(value)
+    return params
+
+
+def _merge_eq(first: Dict[str, float], second: Dict[str, float]) -> Optional[Dict[str, float]]:
+    """
+    合并两个相邻的 eq 滤镜（先 first 后 second），不可合并时返回 None。
+    eq 对每个像素计算 v' = contrast * (v - 0.5) + 0.5 + brightness，之后再做 gamma 校正：
+    - 线性部分串联后仍是线性：contrast = c1 * c2，brightness = b1 * c2 + b2，saturation = s1 * s2
+    - gamma 串联等于 gamma 相乘
+    - 但 first 含 gamma 时 second 不能再有线性参数（gamma 之后的线性变换无法并入同一个 eq）
+    以上推导不考虑中间结果被裁剪到 [0, 1] 的情况。
+    """
+    if any(key in first for key in _EQ_GAMMA_KEYS) and any(key in second for key in _EQ_LINEAR_KEYS):
+        return None
+
+    c1, c2 = first.get('contrast', 1.0), second.get('contrast', 1.0)
+    b1, b2 = first.get('brightness', 0.0), second.get('brightness', 0.0)
+    merged = {}
+    if 'contrast' in first or 'contrast' in second:
+        merged['contrast'] = c1 * c2
+    if 'brightness' in first or 'brightness' in second:
+        merged['brightness'] = b1 * c2 + b2
+    if 'saturation' in first or 'saturation' in second:
+        merged['saturation'] = first.get('saturation', 1.0) * second.get('saturation', 1.0)
+    for key in _EQ_GAMMA_KEYS:
+        if key in first or key in second:
+            merged[key] = first.get(key, 1.0) * second.get(key, 1.0)
+    return merged
+
+
+def merge_adjacent_eq(filters: List[str]) -> List[str]:
+    """合并滤镜链中所有可合并的相邻 eq 滤镜，其它滤镜保持顺序不变"""
+    result: List[str] = []
+    last_eq: Optional[Dict[str, float]] = None
+    for filter_str in filters:
+        params = _parse_eq(filter_str)
+        merged = _merge_eq(last_eq, params) if last_eq is not None and params is not None else None
+        if merged is not None:
+            last_eq = merged
+            result[-1] = 'eq=' + ':'.join(f"{key}={round(value, 6)}" for key, value in merged.items())
+        else:
+            last_eq = params
+            result.append(filter_str)
+    return result
@@ -1,17 +1,21 @@
 # export_distributor.py
 import os
-import subprocess
 from typing import Optional, Dict
 from utils import get_output_filepath
+from media_probe import probe
+from ffmpeg_engine import FFmpegEngine, FFmpegJobMixin, get_default_engine
+from chunked_encoder import encode_in_chunks
 
 
-class ExportDistributor:
-    def __init__(self, ffmpeg_cmd: str = "ffmpeg"):
+class ExportDistributor(FFmpegJobMixin):
+    def __init__(self, ffmpeg_cmd: str = "ffmpeg", engine: Optional[FFmpegEngine] = None):
         """
         初始化导出分发器
         :param ffmpeg_cmd: ffmpeg 命令名称，默认为 'ffmpeg'
+        :param engine: 共享的 ffmpeg 执行引擎，默认使用全局引擎（限制并发进程数）
         """
         self.ffmpeg = ffmpeg_cmd
+        self.engine = engine if engine is not None else get_default_engine()
 
     def _run_ffmpeg(self, cmd_args: list) -> bool:
         """
@@ -19,23 +23,8 @@ class ExportDistributor:
         :param cmd_args: 参数列表，如 ['-i', 'input.mp4', '-vf', ..., 'output.mp4']
         :return: True 表示成功，False 表示失败
         """
-        global full_cmd
-        try:
-            full_cmd = [self.ffmpeg] + cmd_args
-            result = subprocess.run(
-                full_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True
-            )
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"[❌ 导出失败，命令：{' '.join(full_cmd)}]")
-            print(f"[错误详情]: {e.stderr.decode('utf-8', errors='ignore')}")
-            return False
-        except Exception as e:
-            print(f"[❌ 未知错误: {e}]")
-            return False
+        # 统一提交到共享执行引擎，由引擎负责进程并发控制与错误日志
+        return self.engine.run([self.ffmpeg] + cmd_args, label="导出失败")
 
     # ----------------------------------------------------------------------
     # 【1】导出为通用高质量 MP4（适合大部分平台）
@@ -115,29 +104,30 @@ class ExportDistributor:
     # ----------------------------------------------------------------------
     # 【内部方法】通用平台导出（可扩展）
     # ----------------------------------------------------------------------
-    def export_for_platform(self, input_path: str, output_path: str, resolution: str, bitrate: str, fps: int = 30) -> bool:
+    def export_for_platform(self, input_path: str, output_path: str, resolution: str, bitrate: str, fps: int = 30,
+                            chunked: bool = False) -> bool:
         """
         通用导出方法，用于各平台定制
         :param resolution: 如 "1920:1080"
         :param bitrate: 如 "8M"
         :param fps: 帧率，如 30
+        :param chunked: 分段并行编码（适合长视频，见 export_chunked）
         :return: 是否成功
         """
         safe_output = get_output_filepath(os.path.dirname(output_path), os.path.basename(output_path))
-        cmd = [
-            '-i', input_path,
+        video_args = [
             '-vf', f'scale={resolution}',
             '-r', str(fps),
             '-c:v', 'libx264',
             '-b:v', bitrate,
             '-preset', 'slow',
             '-crf', '23',
-            '-c:a', 'aac',
-            '-b:a', '192k',
-            '-movflags', '+faststart',
-            safe_output
         ]
-        return self._run_ffmpeg(cmd)
+        audio_args = ['-c:a', 'aac', '-b:a', '192k']
+        output_args = ['-movflags', '+faststart']
+        if chunked:
+            return self.export_chunked(input_path, safe_output, video_args, audio_args, output_args)
+        return self._run_ffmpeg(['-i', input_path] + video_args + audio_args + output_args + [safe_output])
 
     # ----------------------------------------------------------------------
     # 【7】自定义导出（用户手动控制所有导出参数）
@@ -149,7 +139,8 @@ class ExportDistributor:
                       audio_bitrate: str = '192k',
                       resolution: Optional[str] = None,
                       fps: Optional[int] = None,
-                      optimize: bool = True) -> bool:
+                      optimize: bool = True,
+                      chunked: bool = False) -> bool:
         """
         完全自定义导出参数，用户可控制分辨率、码率、帧率、编码器等
         :param input_path: 输入视频路径
@@ -161,9 +152,15 @@ class ExportDistributor:
         :param resolution: 分辨率，如 '1920:1080' 或 '1080:1920'（宽:高）
         :param fps: 帧率，如 30、60
         :param optimize: 是否优化（添加 -movflags +faststart，适合网络播放）
+        :param chunked: 分段并行编码（适合长视频，见 export_chunked）
         :return: 是否成功
         """
         safe_output = get_output_filepath(os.path.dirname(output_path), os.path.basename(output_path))
+        if chunked:
+            video_args = ['-c:v', video_codec, '-b:v', video_bitrate]
+            video_args += (['-vf', f'scale={resolution}'] if resolution else []) + (['-r', str(fps)] if fps else [])
+            return self.export_chunked(input_path, safe_output, video_args, ['-c:a', audio_codec, '-b:a', audio_bitrate],
+                                       ['-movflags', '+faststart'] if optimize else [])
         cmd = ['-i', input_path, '-c:v', video_codec, '-b:v', video_bitrate, '-c:a', audio_codec, '-b:a', audio_bitrate]
 
         if resolution:
@@ -334,8 +331,6 @@ class ExportDistributor:
         :param platform: 平台名称，如 "douyin", "xiaohongshu", "bilibili", "youtube"
         :return: dict，包含是否通过、详细参数与提示信息
         """
-        import subprocess
-
         # 平台推荐配置（简化校验维度：分辨率、帧率、格式）
         platform_standards = {
             "douyin": {
@@ -390,33 +385,22 @@ class ExportDistributor:
         max_bitrate = standard["max_video_bitrate"]
         tips = standard["tips"]
 
-        # ---- Step 1: 获取视频信息（通过 ffprobe，解析分辨率 / 帧率 / 格式等）
+        # ---- Step 1: 获取视频信息（通过 media_probe，解析分辨率 / 帧率 / 格式等）
         try:
-            # 获取视频基本信息
-            cmd_probe = [
-                'ffprobe', '-v', 'error',
-                '-select_streams', 'v:0',
-                '-show_entries', 'stream=width,height,r_frame_rate,codec_name',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
-                input_path
-            ]
-            probe_output = subprocess.check_output(cmd_probe, stderr=subprocess.STDOUT, text=True).strip().split('\n')
+            # 获取视频基本信息（与其他模块共享同一次 ffprobe 的缓存结果）
+            info = probe(input_path)
+            video = info.video if info is not None else None
 
-            if len(probe_output) < 4:
+            if video is None or not video.width or not video.height:
                 result["message"] = "无法解析视频信息，请检查文件是否为有效视频"
                 return result
 
-            width = int(probe_output[0])
-            height = int(probe_output[1])
-            framerate_str = probe_output[2]  # 如 "30/1"
-            codec = probe_output[3].lower()
+            width = video.width
+            height = video.height
+            codec = (video.codec_name or "").lower()
 
-            # 计算实际帧率（处理 r_frame_rate = "30/1" -> 30.0）
-            try:
-                num, den = map(int, framerate_str.split('/'))
-                actual_fps = round(num / den)
-            except:
-                actual_fps = 30  # 默认假设
+            # 实际帧率（优先取 avg_frame_rate，"30/1" 已解析为 30.0）
+            actual_fps = round(video.frame_rate) if video.frame_rate else 30  # 默认假设
 
             resolution = f"{width}:{height}"
             actual_format = os.path.splitext(input_path)[1][1:].lower()  # .mp4 -> mp4
@@ -462,4 +446,81 @@ class ExportDistributor:
             result["message"] = f"校验失败：{str(e)}"
             result["details"]["错误"] = str(e)
 
-        return result
\ No newline at end of file
+        return result
+
+    # ----------------------------------------------------------------------
+    # 【13】分段并行导出（长视频）
+    # ----------------------------------------------------------------------
+    def export_chunked(self, input_path: str, output_path: str, video_args: list, audio_args: list,
+                       output_args: Optional[list] = None, chunk_count: Optional[int] = None) -> bool:
+        """
+        分段并行导出：在关键帧处切分输入，各分段以相同的码率控制参数并行编码，再以 -c copy 无损拼接。
+        单个 libx264 进程在几个线程之后就难以继续提速，长视频分段后总耗时随 CPU 核数下降。
+        并行进程数受执行引擎的 max_processes 限制。
+        :param video_args: 视频滤镜与编码参数，如 ['-vf', 'scale=1080:1920', '-c:v', 'libx264', '-b:v', '8M']
+        :param audio_args: 音频编码参数，如 ['-c:a', 'aac', '-b:a', '192k']
+        :param output_args: 容器参数，如 ['-movflags', '+faststart']
+        :param chunk_count: 分段数，默认为并行进程数的 2 倍
+        :return: 是否成功
+        """
+        safe_output = get_output_filepath(os.path.dirname(output_path), os.path.basename(output_path))
+        return encode_in_chunks(self.engine, self.ffmpeg, input_path, safe_output, list(video_args),
+                                list(audio_args), list(output_args or []), label="导出失败", chunk_count=chunk_count)
+
+    # ----------------------------------------------------------------------
+    # 【14】一次解码，同时导出到多个平台
+    # ----------------------------------------------------------------------
+    def export_all_platforms(self, input_path: str, outputs_by_platform: Dict[str, str]) -> bool:
+        """
+        只解码一次源视频，用 split 把画面分给各平台的输出，一次 ffmpeg 调用写出所有文件。
+        各平台的分辨率 / 码率 / 帧率取自 get_platform_preset，编码设置与 export_for_platform 相同；
+        分辨率相同的平台共用同一个缩放分支（缩放后再 split）。
+        :param outputs_by_platform: {平台名: 输出路径}，如 {"douyin": "out/dy.mp4", "bilibili": "out/bili.mp4"}
+        :return: 是否成功
+        """
+        if not outputs_by_platform:
+            print("[❌ 导出失败：未指定任何平台]")
+            return False
+
+        # 按分辨率分组（保持调用方给出的平台顺序）
+        groups: Dict[str, list] = {}
+        for platform, output_path in outputs_by_platform.items():
+            preset = self.get_platform_preset(platform)
+            if preset is None:
+                print(f"[❌ 导出失败：未知平台 {platform}]")
+                return False
+            safe_output = get_output_filepath(os.path.dirname(output_path), os.path.basename(output_path))
+            groups.setdefault(preset["resolution"], []).append((preset, safe_output))
+
+        # 滤镜图：[0:v] → split（每种分辨率一个分支）→ scale → split（该分辨率的每个平台一个输出）
+        chains, labels, outputs = [], [], []
+        branches = [f"[s{i}]" for i in range(len(groups))]
+        if len(groups) > 1:
+            chains.append(f"[0:v]split={len(groups)}{''.join(branches)}")
+        else:
+            branches = ["[0:v]"]
+        for branch, (resolution, members) in zip(branches, groups.items()):
+            group_labels = [f"[v{len(labels) + i}]" for i in range(len(members))]
+            if len(members) > 1:
+                chains.append(f"{branch}scale={resolution},split={len(members)}{''.join(group_labels)}")
+            else:
+                chains.append(f"{branch}scale={resolution}{group_labels[0]}")
+            labels.extend(group_labels)
+            outputs.extend(members)
+
+        cmd = ['-i', input_path, '-filter_complex', ';'.join(chains)]
+        for label, (preset, safe_output) in zip(labels, outputs):
+            cmd += [
+                '-map', label,
+                '-map', '0:a:0?',
+                '-r', str(preset["fps"]),
+                '-c:v', 'libx264',
+                '-b:v', preset["bitrate"],
+                '-preset', 'slow',
+                '-crf', '23',
+                '-c:a', 'aac',
+                '-b:a', '192k',
+                '-movflags', '+faststart',
+                safe_output
+            ]
+        return self._run_ffmpeg(cmd)
@@ -0,0 +1,655 @@
+# ffmpeg_engine.py
+import asyncio
+import functools
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from ffmpeg_progress import (PROGRESS_ARGS, ProgressParser, ProgressStream, current_progress_callback,
+                             emit_progress)
+from job_metrics import (JobMetrics, account_job, current_account, current_operation, job_tag, note_stderr,
+                         wait_process)
+from render_cache import RenderCache
+from render_tier import apply_tier
+from resource_governor import ResourceGovernor, ThreadBudget, affinity_preexec
+
+# 异步执行时等待进程名额的轮询间隔（秒）：名额与同步执行共用同一个信号量
+_ASYNC_SLOT_POLL = (0.005, 0.1)
+
+
+class CapturedCommands(list):
+    """
+    capture_commands() 捕获到的命令列表。
+    cleanups 保存方法登记的临时文件清理动作（见 defer_cleanup），
+    调用方真正执行这些命令时应先 take_cleanups() 取走，执行完再调用；否则在离开捕获上下文时执行。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.labels: List[str] = []
+        self.cleanups: List[Callable[[], None]] = []
+
+    def record(self, full_cmd: List[str], label: str) -> None:
+        """记录一条命令及其失败提示前缀"""
+        self.append(list(full_cmd))
+        self.labels.append(label)
+
+    def take_cleanups(self) -> List[Callable[[], None]]:
+        cleanups, self.cleanups = self.cleanups, []
+        return cleanups
+
+
+# 命令捕获：在 capture_commands() 上下文中，引擎只记录命令而不启动 ffmpeg
+_captured_commands: ContextVar[Optional[CapturedCommands]] = ContextVar("captured_commands", default=None)
+
+
+@contextmanager
+def capture_commands() -> Iterator[CapturedCommands]:
+    """
+    捕获上下文内编辑器方法生成的 ffmpeg 命令（不真正执行，视为执行成功）。
+    用于在不渲染的情况下获取某个方法会使用的滤镜参数，例如把多个调色操作融合为一次编码。
+    :return: 命令列表，每个元素为完整命令，如 ['ffmpeg', '-i', 'in.mp4', '-vf', 'eq=...', 'out.mp4']
+    """
+    commands = CapturedCommands()
+    token = _captured_commands.set(commands)
+    try:
+        yield commands
+    finally:
+        _captured_commands.reset(token)
+        run_cleanups(commands.take_cleanups())
+
+
+def defer_cleanup(path: str) -> None:
+    """
+    删除命令执行完后不再需要的临时文件（如 concat 列表文件）或临时目录。
+    在 capture_commands() 中只登记，等捕获的命令真正执行之后再删除。
+    :param path: 临时文件 / 目录路径
+    """
+    def remove():
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    captured = _captured_commands.get()
+    if captured is not None:
+        captured.cleanups.append(remove)
+    else:
+        remove()
+
+
+def run_cleanups(cleanups: Iterable[Callable[[], None]]) -> None:
+    """依次执行 take_cleanups() 取走的清理动作"""
+    for cleanup in cleanups:
+        cleanup()
+
+
+class FFmpegEngine:
+    """
+    共享的 ffmpeg 作业执行引擎。
+    所有编辑器类（VideoEditor / VideoTrimmer / AudioEditor / ColorCorrection /
+    VideoCompositor / ExportDistributor）都把 ffmpeg 命令提交到这里执行：
+    - 通过信号量限制同时运行的 ffmpeg 进程数量（max_processes）
+    - 通过线程池异步调度作业，返回 Future，调用方无需自己管理线程
+    - 可选的渲染缓存（cache）：相同输入 + 相同参数的命令直接复用之前的输出
+    - 按当前渲染档位（render_tier：draft / preview / final）改写输出编码参数
+    - 可选的资源调度（governor）：按核心数与并行作业数为每条命令分配线程数，可绑定 CPU
+    - 可选的资源计量（metrics）：记录每条命令的耗时、CPU、峰值内存、读写字节数，按操作汇总导出
+    """
+
+    def __init__(self, max_processes: Optional[int] = None, max_workers: Optional[int] = None,
+                 cache: Optional[RenderCache] = None, governor: Optional[ResourceGovernor] = None,
+                 metrics: Optional[JobMetrics] = None):
+        """
+        初始化执行引擎
+        :param max_processes: 同时运行的 ffmpeg 进程上限，默认等于 CPU 核心数
+        :param max_workers: 调度线程数量上限，默认是进程上限的 4 倍
+                            （作业在等待进程名额或执行 ffprobe 时不占用 ffmpeg 名额）
+        :param cache: 渲染缓存，默认不启用
+        :param governor: 资源调度器，默认不启用（ffmpeg 使用自身的线程数默认值）
+        :param metrics: 作业资源计量，默认不启用
+        """
+        self.cache = cache
+        self.governor = governor
+        self.metrics = metrics
+        self.max_processes = max(1, int(max_processes or os.cpu_count() or 1))
+        self.max_workers = max(1, int(max_workers or self.max_processes * 4))
+        # 进程名额：只在 ffmpeg 子进程运行期间持有，嵌套提交不会死锁
+        self._slots = threading.BoundedSemaphore(self.max_processes)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # 管道作业需要同时占用多个进程名额：串行获取，避免两个管道各占一部分名额互相等待
+        self._pipeline_lock = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    # 【1】同步执行单条 ffmpeg 命令（受进程上限约束）
+    # ----------------------------------------------------------------------
+    def run(self, full_cmd: List[str], label: str = "FFmpeg 命令执行失败") -> bool:
+        """
+        执行一条完整的 ffmpeg 命令，阻塞直到子进程结束
+        :param full_cmd: 完整命令列表，如 ['ffmpeg', '-i', 'input.mp4', 'output.mp4']
+        :param label: 失败时打印的提示前缀，如 "色彩校正失败"
+        :return: True 表示成功，False 表示失败（会打印详细的错误日志）
+        """
+        captured = _captured_commands.get()
+        if captured is not None:
+            captured.record(full_cmd, label)
+            return True
+
+        full_cmd = apply_tier(full_cmd)
+        cache = self.cache
+        key = cache.key_for(full_cmd) if cache is not None else None
+        if key is not None and cache.fetch(key, full_cmd[-1]):
+            return True
+        if cache is not None:
+            cache.prepare_output(full_cmd[-1])
+
+        with self._process_slot() as budget:
+            full_cmd = budget.apply(full_cmd) if budget is not None else full_cmd
+            success = self._accounted([full_cmd], label, lambda: self._execute(full_cmd, label))
+        if success and key is not None:
+            cache.store(key, full_cmd[-1])
+        return success
+
+    def _accounted(self, full_cmds: List[List[str]], label: str, execute: Callable[[], bool]) -> bool:
+        """
+        执行 execute()；启用资源计量时，把其中启动的子进程的资源使用登记为一条作业记录
+        :param full_cmds: 作业包含的命令（管道作业为各阶段），用于统计输入 / 输出文件大小
+        """
+        metrics = self.metrics
+        if metrics is None:
+            return execute()
+        with account_job(full_cmds, current_operation(), label) as account:
+            success = execute()
+        metrics.record(account.finish(success))
+        return success
+
+    @contextmanager
+    def _process_slot(self, count: int = 1) -> Iterator[Optional[ThreadBudget]]:
+        """
+        持有 count 个进程名额；启用资源调度时同时申请线程预算（并在上下文内绑定 CPU）
+        :return: ThreadBudget，未启用资源调度时为 None
+        """
+        governor = self.governor
+        if governor is None:
+            with self._acquire_slots(count):
+                yield None
+            return
+        with governor.waiting(count), self._acquire_slots(count):
+            with governor.lease(self.max_processes, count) as budget:
+                yield budget
+
+    @contextmanager
+    def _acquire_slots(self, count: int) -> Iterator[None]:
+        if count == 1:
+            with self._slots:
+                yield
+            return
+        with self._pipeline_lock:
+            for _ in range(count):
+                self._slots.acquire()
+        try:
+            yield
+        finally:
+            for _ in range(count):
+                self._slots.release()
+
+    async def run_async(self, full_cmd: List[str], label: str = "FFmpeg 命令执行失败",
+                        timeout: Optional[float] = None) -> bool:
+        """
+        run() 的异步版本：使用 asyncio.create_subprocess_exec 启动 ffmpeg，等待期间不占用线程
+        - 与同步执行共用进程名额（max_processes）
+        - 所在任务被取消时会杀掉 ffmpeg 子进程，并继续抛出 CancelledError
+        :param timeout: 超时时间（秒），超时后杀掉子进程并返回 False；None 表示不限时
+        :return: True 表示成功，False 表示失败或超时
+        """
+        captured = _captured_commands.get()
+        if captured is not None:
+            captured.record(full_cmd, label)
+            return True
+
+        full_cmd = apply_tier(full_cmd)
+        cache = self.cache
+        key = None
+        if cache is not None:
+            key = await asyncio.to_thread(cache.key_for, full_cmd)
+            if key is not None and await asyncio.to_thread(cache.fetch, key, full_cmd[-1]):
+                return True
+            cache.prepare_output(full_cmd[-1])
+
+        governor = self.governor
+        with governor.waiting() if governor is not None else nullcontext():
+            await self._acquire_slot_async()
+            try:
+                with governor.lease(self.max_processes) if governor is not None else nullcontext() as budget:
+                    if budget is not None:
+                        full_cmd = budget.apply(full_cmd)
+                    if self.metrics is None:
+                        success = await self._execute_async(full_cmd, label, timeout)
+                    else:
+                        # 异步子进程由事件循环回收，无法取得 rusage：只记录耗时、读写字节数与输出时长
+                        with account_job([full_cmd], current_operation(), label) as account:
+                            success = await self._execute_async(full_cmd, label, timeout)
+                        self.metrics.record(account.finish(success))
+            finally:
+                self._slots.release()
+        if success and key is not None:
+            await asyncio.to_thread(cache.store, key, full_cmd[-1])
+        return success
+
+    async def _acquire_slot_async(self) -> None:
+        """在不阻塞事件循环的前提下获取进程名额（非阻塞尝试 + 退避轮询，取消时不会泄漏名额）"""
+        delay, max_delay = _ASYNC_SLOT_POLL
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+    async def _execute_async(self, full_cmd: List[str], label: str, timeout: Optional[float]) -> bool:
+        """
+        启动 ffmpeg 子进程并异步等待结束（调用方已持有进程名额）
+        :return: True 表示成功，False 表示失败或超时
+        """
+        callback = current_progress_callback()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *(full_cmd[:1] + PROGRESS_ARGS + full_cmd[1:] if callback is not None else full_cmd),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                preexec_fn=affinity_preexec()
+            )
+        except Exception as e:
+            print(f"[❌ 未知错误: {e}]")
+            return False
+
+        try:
+            if callback is None:
+                _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            else:
+                # 同时读取进度（标准输出）与错误日志（标准错误），避免任一管道写满阻塞 ffmpeg
+                _, stderr, _ = await asyncio.wait_for(asyncio.gather(
+                    _read_progress_async(process.stdout, label, callback),
+                    process.stderr.read(),
+                    process.wait()
+                ), timeout)
+        except asyncio.TimeoutError:
+            await _kill_process(process)
+            print(f"[❌ {label}（超时 {timeout:.1f} 秒），命令：{' '.join(full_cmd)}]")
+            return False
+        except asyncio.CancelledError:
+            await _kill_process(process)
+            raise
+
+        note_stderr(stderr.decode('utf-8', errors='ignore'))
+        if process.returncode != 0:
+            print(f"[❌ {label}，命令：{' '.join(full_cmd)}]")
+            print(f"[错误详情]: {stderr.decode('utf-8', errors='ignore')}")
+            return False
+        return True
+
+    def _execute(self, full_cmd: List[str], label: str) -> bool:
+        """
+        启动 ffmpeg 子进程并等待结束（调用方已持有进程名额）
+        :return: True 表示成功，False 表示失败
+        """
+        callback = current_progress_callback()
+        if callback is not None:
+            return self._execute_with_progress(full_cmd, label, callback)
+        try:
+            # stdin 指向空设备：并发运行时避免多个 ffmpeg 争抢终端输入；
+            # 标准错误写入临时文件，由 wait_process() 等待（启用资源计量时通过 wait4 取得该进程的 rusage）
+            with tempfile.TemporaryFile() as stderr_file:
+                with subprocess.Popen(
+                    full_cmd,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=stderr_file,
+                    preexec_fn=affinity_preexec()  # 资源调度分配的 CPU 集合（未绑定时为 None）
+                ) as process:
+                    try:
+                        returncode = wait_process(process)
+                    except BaseException:
+                        process.kill()
+                        raise
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode('utf-8', errors='ignore')
+            note_stderr(stderr)
+            if returncode != 0:
+                print(f"[❌ {label}，命令：{' '.join(full_cmd)}]")
+                print(f"[错误详情]: {stderr}")
+                return False
+            return True
+        except Exception as e:
+            print(f"[❌ 未知错误: {e}]")
+            return False
+
+    def _execute_with_progress(self, full_cmd: List[str], label: str,
+                               callback: Callable[..., None]) -> bool:
+        """
+        附带 -progress pipe:1 启动 ffmpeg，逐行解析标准输出并回调进度（调用方已持有进程名额）
+        :return: True 表示成功，False 表示失败
+        """
+        parser = ProgressParser(label)
+        try:
+            # 标准错误写入临时文件：只需读取标准输出一个管道，不会因另一个管道写满而阻塞
+            with tempfile.TemporaryFile() as stderr_file:
+                with subprocess.Popen(
+                    full_cmd[:1] + PROGRESS_ARGS + full_cmd[1:],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=stderr_file,
+                    text=True,
+                    encoding='utf-8',
+                    errors='ignore',
+                    preexec_fn=affinity_preexec()
+                ) as process:
+                    for line in process.stdout:
+                        event = parser.feed(line)
+                        if event is not None:
+                            emit_progress(callback, event)
+                    returncode = wait_process(process)
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode('utf-8', errors='ignore')
+                note_stderr(stderr)
+                if returncode != 0:
+                    print(f"[❌ {label}，命令：{' '.join(full_cmd)}]")
+                    print(f"[错误详情]: {stderr}")
+                    return False
+            return True
+        except Exception as e:
+            print(f"[❌ 未知错误: {e}]")
+            return False
+
+    def run_pipeline(self, full_cmds: List[List[str]], label: str = "FFmpeg 命令执行失败") -> bool:
+        """
+        以管道串联执行多条 ffmpeg 命令：前一条的标准输出直接接到后一条的标准输入，各阶段同时运行，
+        中间结果不落盘。整条管道占用 min(阶段数, max_processes) 个进程名额。
+        :param full_cmds: 完整命令列表；除最后一条外输出到 pipe:1，除第一条外从 pipe:0 读取
+        :param label: 失败时打印的提示前缀
+        :return: 所有阶段都成功时返回 True
+        """
+        cmds = [list(cmd) for cmd in full_cmds]
+        if len(cmds) == 1:
+            return self.run(cmds[0], label)
+        captured = _captured_commands.get()
+        if captured is not None:
+            for cmd in cmds:
+                captured.record(cmd, label)
+            return True
+        cmds = [apply_tier(cmd) for cmd in cmds]
+
+        slots = min(len(cmds), self.max_processes)
+        with self._process_slot(slots) as budget:
+            if budget is not None:
+                # 各阶段同时运行，平分整条管道的线程预算
+                cmds = [budget.apply(cmd) for cmd in cmds]
+            return self._accounted(cmds, label, lambda: self._execute_pipeline(cmds, label))
+
+    def _execute_pipeline(self, cmds: List[List[str]], label: str) -> bool:
+        """启动并串联管道中的全部 ffmpeg 子进程，等待全部结束（调用方已持有进程名额）"""
+        callback = current_progress_callback()
+        if callback is not None:
+            # 最后一个阶段写磁盘，标准输出空闲，用来上报整条管道的进度
+            cmds[-1] = cmds[-1][:1] + PROGRESS_ARGS + cmds[-1][1:]
+        processes: List[subprocess.Popen] = []
+        stderr_files = [tempfile.TemporaryFile() for _ in cmds]
+        try:
+            upstream = subprocess.DEVNULL
+            for index, cmd in enumerate(cmds):
+                is_last = index == len(cmds) - 1
+                process = subprocess.Popen(
+                    cmd,
+                    stdin=upstream,
+                    stdout=subprocess.PIPE if not is_last or callback is not None else subprocess.DEVNULL,
+                    stderr=stderr_files[index],
+                    preexec_fn=affinity_preexec()
+                )
+                if index > 0:
+                    # 父进程关闭管道读端：下游提前退出时上游能收到 SIGPIPE，而不是一直阻塞
+                    upstream.close()
+                processes.append(process)
+                upstream = process.stdout
+
+            if callback is not None:
+                parser = ProgressParser(label)
+                for line in processes[-1].stdout:
+                    event = parser.feed(line.decode('utf-8', errors='ignore'))
+                    if event is not None:
+                        emit_progress(callback, event)
+                processes[-1].stdout.close()
+            returncodes = [wait_process(process) for process in processes]
+            if current_account() is not None:
+                stderr_files[-1].seek(0)
+                note_stderr(stderr_files[-1].read().decode('utf-8', errors='ignore'))
+
+            success = True
+            for index, returncode in enumerate(returncodes):
+                if returncode != 0:
+                    success = False
+                    stderr_files[index].seek(0)
+                    print(f"[❌ {label}（管道第 {index + 1}/{len(cmds)} 阶段），命令：{' '.join(cmds[index])}]")
+                    print(f"[错误详情]: {stderr_files[index].read().decode('utf-8', errors='ignore')}")
+            return success
+        except Exception as e:
+            for process in processes:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+            print(f"[❌ 未知错误: {e}]")
+            return False
+        finally:
+            for stderr_file in stderr_files:
+                stderr_file.close()
+
+    # ----------------------------------------------------------------------
+    # 【2】异步提交：任意可调用对象 / 单条命令
+    # ----------------------------------------------------------------------
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        把一个作业（通常是编辑器的公开方法）提交到引擎线程池
+        :param fn: 可调用对象，如 editor.cut_video
+        :return: concurrent.futures.Future，result() 为 fn 的返回值
+        """
+        # 在提交时的上下文中执行，report_progress() 等上下文设置对线程池中的作业同样生效
+        return self._get_executor().submit(copy_context().run, fn, *args, **kwargs)
+
+    def submit_command(self, full_cmd: List[str], label: str = "FFmpeg 命令执行失败") -> Future:
+        """
+        异步执行一条完整的 ffmpeg 命令
+        :return: Future，result() 为 True / False
+        """
+        return self.submit(self.run, full_cmd, label)
+
+    def run_many(self, full_cmds: Iterable[List[str]], label: str = "FFmpeg 命令执行失败") -> List[bool]:
+        """
+        并行执行多条互不依赖的 ffmpeg 命令，并按输入顺序返回结果。
+        使用调用方独享的临时线程池等待子进程，因此可以在引擎作业内部安全地嵌套调用。
+        :param full_cmds: 完整命令列表的列表
+        :return: 每条命令是否成功的列表
+        """
+        cmds = list(full_cmds)
+        if not cmds:
+            return []
+        if _captured_commands.get() is not None:
+            # 捕获模式不启动进程：按顺序记录，保证命令与失败提示一一对应
+            return [self.run(cmd, label) for cmd in cmds]
+        # 工作线程的调用栈中没有编辑器方法：先在调用方识别操作名，供资源计量标注
+        operation = current_operation() if self.metrics is not None else None
+
+        def run_one(cmd: List[str]) -> bool:
+            with job_tag(operation):
+                return self.run(cmd, label)
+
+        # 每条命令各自复制一份调用方的上下文（同一个 Context 不能被多个线程同时进入）
+        contexts = [copy_context() for _ in cmds]
+        with ThreadPoolExecutor(max_workers=min(len(cmds), self.max_processes)) as pool:
+            return list(pool.map(lambda cmd, context: context.run(run_one, cmd), cmds, contexts))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        关闭引擎线程池（之后再次提交会自动重建线程池）
+        :param wait: 是否等待已提交的作业全部完成
+        """
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="ffmpeg-job")
+            return self._executor
+
+
+async def _read_progress_async(stream: asyncio.StreamReader, label: str, callback: Callable[..., None]) -> None:
+    """逐行读取 -progress 输出并回调进度事件"""
+    parser = ProgressParser(label)
+    async for line in stream:
+        event = parser.feed(line.decode('utf-8', errors='ignore'))
+        if event is not None:
+            emit_progress(callback, event)
+
+
+async def _kill_process(process: asyncio.subprocess.Process) -> None:
+    """杀掉仍在运行的子进程并回收，避免留下僵尸进程"""
+    if process.returncode is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+    await asyncio.shield(process.wait())
+
+
+# ======================================================================
+# 全局默认引擎：未显式传入 engine 的编辑器实例共享同一个进程池
+# 可通过环境变量 AUTOVIDEOCLIP_MAX_FFMPEG 设置默认的并发进程数，
+# AUTOVIDEOCLIP_RENDER_CACHE 设置渲染缓存目录（AUTOVIDEOCLIP_RENDER_CACHE_MB 为容量上限，单位 MB），
+# AUTOVIDEOCLIP_GOVERNOR 启用资源调度（"1" 分配线程数，"pin" 同时绑定 CPU），
+# AUTOVIDEOCLIP_JOB_LOG / AUTOVIDEOCLIP_METRICS_TEXTFILE 启用资源计量（JSON Lines 日志 / Prometheus textfile）
+# ======================================================================
+_default_engine: Optional[FFmpegEngine] = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine() -> FFmpegEngine:
+    """获取（必要时创建）全局默认执行引擎"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            env_value = os.environ.get("AUTOVIDEOCLIP_MAX_FFMPEG")
+            cache_dir = os.environ.get("AUTOVIDEOCLIP_RENDER_CACHE")
+            cache = None
+            if cache_dir:
+                cache_mb = os.environ.get("AUTOVIDEOCLIP_RENDER_CACHE_MB")
+                cache = RenderCache(cache_dir, int(cache_mb) * 1024 ** 2) if cache_mb else RenderCache(cache_dir)
+            governor_mode = os.environ.get("AUTOVIDEOCLIP_GOVERNOR", "").lower()
+            governor = ResourceGovernor(pin=governor_mode == "pin") if governor_mode in ("1", "pin") else None
+            job_log = os.environ.get("AUTOVIDEOCLIP_JOB_LOG")
+            textfile = os.environ.get("AUTOVIDEOCLIP_METRICS_TEXTFILE")
+            metrics = JobMetrics(job_log, textfile) if job_log or textfile else None
+            _default_engine = FFmpegEngine(max_processes=int(env_value) if env_value else None, cache=cache,
+                                           governor=governor, metrics=metrics)
+        return _default_engine
+
+
+def set_default_engine(engine: FFmpegEngine) -> None:
+    """替换全局默认执行引擎（只影响之后创建的编辑器实例）"""
+    global _default_engine
+    with _default_engine_lock:
+        _default_engine = engine
+
+
+class FFmpegJobMixin:
+    """
+    编辑器类的公共作业接口：通过 self.engine 异步提交公开方法。
+    使用方需在 __init__ 中设置 self.engine。
+    每个公开方法都有对应的协程版本：editor.cut_video_async(...) 等价于 editor.run_async("cut_video", ...)
+    """
+
+    engine: FFmpegEngine
+
+    def submit(self, method_name: str, *args, **kwargs) -> Future:
+        """
+        异步执行本实例的某个公开方法
+        :param method_name: 方法名，如 "apply_denoise"
+        :return: Future，result() 为该方法的返回值（通常为 True / False）
+        """
+        return self.engine.submit(getattr(self, method_name), *args, **kwargs)
+
+    def submit_batch(self, method_name: str, calls: Iterable[Any]) -> List[Future]:
+        """
+        批量异步执行同一个方法
+        :param method_name: 方法名，如 "export_for_douyin"
+        :param calls: 每次调用的参数，元素可以是 tuple（位置参数）或 dict（关键字参数）
+        :return: Future 列表，顺序与 calls 一致
+        """
+        futures = []
+        for call in calls:
+            if isinstance(call, dict):
+                futures.append(self.submit(method_name, **call))
+            else:
+                futures.append(self.submit(method_name, *call))
+        return futures
+
+    async def run_async(self, method_name: str, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        以协程方式执行本实例的某个公开方法（asyncio.create_subprocess_exec，等待 ffmpeg 时不占用线程）
+        先在捕获模式下调用方法生成 ffmpeg 命令（同时完成 ffprobe 探测等准备工作），再在事件循环中依次执行。
+        任务被取消时会杀掉正在运行的 ffmpeg 子进程。
+        :param method_name: 方法名，如 "apply_denoise"
+        :param timeout: 整个作业的超时时间（秒），超时后杀掉子进程并返回 False；None 表示不限时
+        :return: 与同步方法相同的返回值（通常为 True / False）
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        method = getattr(self, method_name)
+
+        def plan():
+            with capture_commands() as captured:
+                result = method(*args, **kwargs)
+                return result, list(zip(captured, captured.labels)), captured.take_cleanups()
+
+        result, commands, cleanups = await asyncio.to_thread(plan)
+        try:
+            if result is False:
+                return False
+            with job_tag(f"{type(self).__name__}.{method_name}"):
+                for full_cmd, label in commands:
+                    remaining = None if deadline is None else max(0.0, deadline - loop.time())
+                    if not await self.engine.run_async(full_cmd, label, timeout=remaining):
+                        return False
+            return result
+        finally:
+            run_cleanups(cleanups)
+
+    def __getattr__(self, name: str) -> Any:
+        """为每个公开方法提供 xxx_async 协程版本"""
+        if name.endswith('_async') and not name.startswith('_'):
+            method_name = name[:-len('_async')]
+            if callable(getattr(type(self), method_name, None)):
+                return functools.partial(self.run_async, method_name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def stream_progress(self, method_name: str, *args, timeout: Optional[float] = None, **kwargs) -> ProgressStream:
+        """
+        以协程方式执行某个公开方法，并通过异步迭代器实时获取进度（需在事件循环中调用）
+            stream = editor.stream_progress("export_for_douyin", input_path, output_path)
+            async for event in stream:
+                print(event.out_time, event.speed)
+            ok = await stream
+        :param method_name: 方法名，如 "export_for_douyin"
+        :param timeout: 整个作业的超时时间（秒）
+        :return: ProgressStream，迭代得到 ProgressEvent，await 得到方法返回值
+        """
+        return ProgressStream(lambda: self.run_async(method_name, *args, timeout=timeout, **kwargs))
@@ -0,0 +1,173 @@
+# ffmpeg_progress.py
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+# 当前上下文的进度回调：由 report_progress() 设置，引擎在启动 ffmpeg 时读取
+_progress_callback: ContextVar[Optional[Callable[["ProgressEvent"], None]]] = ContextVar("progress_callback",
+                                                                                          default=None)
+
+# 追加到 ffmpeg 命令中的参数：把进度以 key=value 形式写到标准输出，并关闭标准错误里的统计行
+PROGRESS_ARGS = ['-progress', 'pipe:1', '-nostats']
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ProgressEvent:
+    """
+    ffmpeg -progress 输出的一次进度报告（ffmpeg 默认每 0.5 秒输出一次）
+    数值字段在 ffmpeg 输出 N/A 时为 None
+    """
+
+    __slots__ = ('label', 'frame', 'fps', 'bitrate', 'total_size', 'out_time', 'speed',
+                 'dup_frames', 'drop_frames', 'finished', 'elapsed')
+
+    def __init__(self, label: str, fields: Dict[str, str], elapsed: float):
+        """
+        :param label: 作业标签（如 "色彩校正失败" 所属的操作类型）
+        :param fields: 一个进度块中的全部 key=value
+        :param elapsed: 从 ffmpeg 启动到这次报告经过的秒数
+        """
+        self.label = label
+        self.frame = _to_int(fields.get('frame'))
+        self.fps = _to_float(fields.get('fps'))
+        self.bitrate = _to_float(fields.get('bitrate', '').replace('kbits/s', ''))  # kbit/s
+        self.total_size = _to_int(fields.get('total_size'))  # 已写出的字节数
+        out_time_us = _to_int(fields.get('out_time_us'))
+        self.out_time = out_time_us / 1_000_000 if out_time_us is not None else None  # 已处理的媒体时长（秒）
+        self.speed = _to_float(fields.get('speed', '').rstrip('x'))  # 相对实时的处理速度，如 2.5
+        self.dup_frames = _to_int(fields.get('dup_frames'))
+        self.drop_frames = _to_int(fields.get('drop_frames'))
+        self.finished = fields.get('progress') == 'end'
+        self.elapsed = elapsed
+
+    def percent(self, total_duration: float) -> Optional[float]:
+        """
+        根据输出总时长计算完成百分比
+        :param total_duration: 输出文件的预期时长（秒），如 media_probe.probe(input).duration
+        """
+        if self.out_time is None or not total_duration:
+            return None
+        return min(100.0, self.out_time / total_duration * 100)
+
+    def eta(self, total_duration: float) -> Optional[float]:
+        """
+        按当前处理速度估算剩余秒数
+        :param total_duration: 输出文件的预期时长（秒）
+        """
+        if self.out_time is None or not self.speed or not total_duration:
+            return None
+        return max(0.0, (total_duration - self.out_time) / self.speed)
+
+    def __repr__(self) -> str:
+        return (f"<ProgressEvent frame={self.frame} fps={self.fps} out_time={self.out_time} "
+                f"speed={self.speed} size={self.total_size}{' end' if self.finished else ''}>")
+
+
+class ProgressParser:
+    """逐行解析 ffmpeg -progress 输出；每遇到 progress=continue/end 生成一个 ProgressEvent"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.monotonic()
+        self._fields: Dict[str, str] = {}
+
+    def feed(self, line: str) -> Optional[ProgressEvent]:
+        """
+        :param line: 一行输出，如 "frame=120"
+        :return: 一个进度块结束时返回 ProgressEvent，否则返回 None
+        """
+        key, sep, value = line.strip().partition('=')
+        if not sep:
+            return None
+        self._fields[key] = value.strip()
+        if key != 'progress':
+            return None
+        event = ProgressEvent(self.label, self._fields, time.monotonic() - self.started)
+        self._fields = {}
+        return event
+
+
+@contextmanager
+def report_progress(callback: Callable[[ProgressEvent], None]) -> Iterator[None]:
+    """
+    在上下文内执行的编辑器方法都会附带 -progress 参数，并把每次进度报告交给 callback。
+    通过 engine.submit() 提交到线程池的作业同样生效（提交时复制当前上下文）。
+    :param callback: 接收 ProgressEvent 的函数，在等待 ffmpeg 的线程（或事件循环）中调用
+    """
+    token = _progress_callback.set(callback)
+    try:
+        yield
+    finally:
+        _progress_callback.reset(token)
+
+
+def current_progress_callback() -> Optional[Callable[[ProgressEvent], None]]:
+    """获取当前上下文的进度回调（未设置时为 None）"""
+    return _progress_callback.get()
+
+
+def emit_progress(callback: Callable[[ProgressEvent], None], event: ProgressEvent) -> None:
+    """调用进度回调；回调本身出错不影响 ffmpeg 作业"""
+    try:
+        callback(event)
+    except Exception as e:
+        print(f"[⚠️ 进度回调出错：{e}]")
+
+
+class ProgressStream:
+    """
+    以异步迭代器的方式获取一个作业的进度：
+        stream = editor.stream_progress("export_for_douyin", input_path, output_path)
+        async for event in stream:
+            print(event.out_time, event.speed)
+        ok = await stream
+    """
+
+    _DONE = object()
+
+    def __init__(self, job: Callable[[], Awaitable[Any]]):
+        """
+        :param job: 无参协程函数，在其执行期间设置的进度回调会把事件放入队列
+        """
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+        async def run():
+            try:
+                with report_progress(self._queue.put_nowait):
+                    return await job()
+            finally:
+                self._queue.put_nowait(self._DONE)
+
+        self._task = asyncio.ensure_future(run())
+
+    def __aiter__(self) -> "ProgressStream":
+        return self
+
+    async def __anext__(self) -> ProgressEvent:
+        event = await self._queue.get()
+        if event is self._DONE:
+            raise StopAsyncIteration
+        return event
+
+    def __await__(self):
+        """等待作业结束并返回结果（与同步方法返回值相同）"""
+        return self._task.__await__()
+
+    def cancel(self) -> None:
+        """取消作业（会杀掉正在运行的 ffmpeg 子进程）"""
+        self._task.cancel()
@@ -0,0 +1,301 @@
+# job_metrics.py
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from render_tier import split_outputs
+
+# ======================================================================
+# 作业资源计量：每条 ffmpeg 命令记录墙钟时间、用户 / 系统 CPU、峰值内存（wait4）、
+# 读写字节数（输入 / 输出文件大小）与输出时长，并标注发起它的操作（如 ColorCorrection.apply_denoise）。
+# 记录写入结构化日志（JSON Lines），并汇总为 Prometheus textfile（node_exporter 的 textfile collector）。
+# 用法：FFmpegEngine(metrics=JobMetrics(log_path="jobs.jsonl", textfile_path="autovideoclip.prom"))
+# ======================================================================
+
+# 未能识别发起操作时的标签
+UNKNOWN_OPERATION = "unknown"
+# FFmpegJobMixin 的调度方法：不是编辑操作本身，识别操作时跳过
+_DISPATCH_METHODS = {'submit', 'submit_batch', 'run_async', 'stream_progress'}
+# ffmpeg 统计行中的输出时间，如 "time=00:01:02.50"
+_TIME_PATTERN = re.compile(r"time=\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+_job_tag: ContextVar[Optional[str]] = ContextVar("job_tag", default=None)
+_current_account: ContextVar[Optional["JobAccount"]] = ContextVar("job_account", default=None)
+
+
+@contextmanager
+def job_tag(operation: Optional[str]) -> Iterator[None]:
+    """
+    为上下文内执行的 ffmpeg 命令显式标注操作名（优先于从调用栈识别）
+        with job_tag("ExportDistributor.export_for_douyin"):
+            ...
+    """
+    token = _job_tag.set(operation)
+    try:
+        yield
+    finally:
+        _job_tag.reset(token)
+
+
+def current_operation() -> str:
+    """
+    当前 ffmpeg 命令所属的操作名：显式标注（job_tag）优先，
+    否则取调用栈中最外层的编辑器公开方法（方法内部调用的其他公开方法不单独计算）
+    """
+    tagged = _job_tag.get()
+    if tagged:
+        return tagged
+    operation = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        editor = frame.f_locals.get('self')
+        name = frame.f_code.co_name
+        if (editor is not None and hasattr(type(editor), '_run_ffmpeg') and not name.startswith('_')
+                and name not in _DISPATCH_METHODS and callable(getattr(type(editor), name, None))):
+            operation = f"{type(editor).__name__}.{name}"
+        frame = frame.f_back
+    return operation or UNKNOWN_OPERATION
+
+
+def parse_output_time(stderr: str) -> Optional[float]:
+    """从 ffmpeg 的标准错误中解析最后一次统计的输出时间（秒）"""
+    matches = _TIME_PATTERN.findall(stderr)
+    if not matches:
+        return None
+    hours, minutes, seconds = matches[-1]
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+class JobRecord:
+    """一条 ffmpeg 命令的资源使用记录"""
+
+    __slots__ = ('operation', 'label', 'ok', 'started_at', 'wall_seconds', 'user_cpu_seconds', 'system_cpu_seconds',
+                 'max_rss_bytes', 'read_bytes', 'write_bytes', 'output_seconds', 'output', 'host')
+
+    def __init__(self, operation: str, label: str, ok: bool, started_at: float, wall_seconds: float,
+                 user_cpu_seconds: Optional[float] = None, system_cpu_seconds: Optional[float] = None,
+                 max_rss_bytes: Optional[int] = None, read_bytes: int = 0, write_bytes: int = 0,
+                 output_seconds: Optional[float] = None, output: Optional[str] = None, host: Optional[str] = None):
+        """
+        :param operation: 操作名，如 "ColorCorrection.apply_denoise"
+        :param label: 引擎执行时的提示前缀，如 "色彩校正失败"
+        :param user_cpu_seconds: 用户态 CPU 时间（无法计量时为 None，如异步执行）
+        :param max_rss_bytes: ffmpeg 进程的峰值内存（管道作业为各阶段之和）
+        :param read_bytes: 输入文件大小之和
+        :param write_bytes: 输出文件大小之和
+        :param output_seconds: 输出时长（ffmpeg 最后一次统计的 time=）
+        """
+        self.operation = operation
+        self.label = label
+        self.ok = ok
+        self.started_at = started_at
+        self.wall_seconds = wall_seconds
+        self.user_cpu_seconds = user_cpu_seconds
+        self.system_cpu_seconds = system_cpu_seconds
+        self.max_rss_bytes = max_rss_bytes
+        self.read_bytes = read_bytes
+        self.write_bytes = write_bytes
+        self.output_seconds = output_seconds
+        self.output = output
+        self.host = host or socket.gethostname()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"<JobRecord {self.operation} {'ok' if self.ok else 'failed'} {self.wall_seconds:.2f}s>"
+
+
+class JobAccount:
+    """执行中的作业：收集子进程的 rusage 与标准错误，结束时生成 JobRecord"""
+
+    def __init__(self, full_cmds: List[List[str]], operation: str, label: str):
+        self.full_cmds = full_cmds
+        self.operation = operation
+        self.label = label
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.user_cpu: Optional[float] = None
+        self.system_cpu: Optional[float] = None
+        self.max_rss: Optional[int] = None
+        self.output_seconds: Optional[float] = None
+
+    def add_usage(self, usage: Any) -> None:
+        """累加一个已结束子进程的 rusage（os.wait4 的返回值）"""
+        # macOS 的 ru_maxrss 单位为字节，Linux 为 KB
+        rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+        self.user_cpu = (self.user_cpu or 0.0) + usage.ru_utime
+        self.system_cpu = (self.system_cpu or 0.0) + usage.ru_stime
+        self.max_rss = (self.max_rss or 0) + rss
+
+    def add_stderr(self, stderr: str) -> None:
+        """从最后一个阶段的标准错误中解析输出时长"""
+        seconds = parse_output_time(stderr)
+        if seconds is not None:
+            self.output_seconds = seconds
+
+    def finish(self, ok: bool) -> JobRecord:
+        inputs = [cmd[i + 1] for cmd in self.full_cmds[:1] for i, arg in enumerate(cmd[:-1]) if arg == '-i']
+        outputs = [output for _, output in split_outputs(self.full_cmds[-1])[1]] if self.full_cmds[-1] else []
+        return JobRecord(self.operation, self.label, ok, self.started_at, time.perf_counter() - self._start,
+                         self.user_cpu, self.system_cpu, self.max_rss,
+                         read_bytes=sum(_file_size(path) for path in inputs),
+                         write_bytes=sum(_file_size(path) for path in outputs),
+                         output_seconds=self.output_seconds,
+                         output=outputs[-1] if outputs else None)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path) if os.path.isfile(path) else 0
+    except OSError:
+        return 0
+
+
+@contextmanager
+def account_job(full_cmds: List[List[str]], operation: str, label: str) -> Iterator[JobAccount]:
+    """在上下文内启动的 ffmpeg 子进程通过 wait_process() / note_stderr() 把资源使用记入该作业"""
+    account = JobAccount(full_cmds, operation, label)
+    token = _current_account.set(account)
+    try:
+        yield account
+    finally:
+        _current_account.reset(token)
+
+
+def current_account() -> Optional[JobAccount]:
+    """当前上下文中正在计量的作业，未启用计量时为 None"""
+    return _current_account.get()
+
+
+def wait_process(process: subprocess.Popen) -> int:
+    """
+    等待子进程结束并返回退出码；正在计量作业时用 os.wait4 取得该子进程自身的 rusage
+    （RUSAGE_CHILDREN 是整个进程所有子进程的累计值，并发作业之间无法区分）
+    """
+    account = current_account()
+    if account is None or not hasattr(os, 'wait4'):
+        return process.wait()
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        return process.wait()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    account.add_usage(usage)
+    return process.returncode
+
+
+def note_stderr(stderr: str) -> None:
+    """把子进程的标准错误交给当前计量的作业（解析输出时长）"""
+    account = current_account()
+    if account is not None:
+        account.add_stderr(stderr)
+
+
+class JobMetrics:
+    """
+    作业记录的汇总与导出：
+    - log_path：每条记录追加一行 JSON（结构化日志，可直接导入日志系统）
+    - textfile_path：按操作汇总的 Prometheus 指标，每条记录后原子重写
+    """
+
+    def __init__(self, log_path: Optional[str] = None, textfile_path: Optional[str] = None,
+                 keep_records: int = 1000):
+        """
+        :param log_path: JSON Lines 日志文件路径，None 表示不写日志
+        :param textfile_path: Prometheus textfile 路径（如 /var/lib/node_exporter/autovideoclip.prom）
+        :param keep_records: 内存中保留的最近记录数（records() 返回）
+        """
+        self.log_path = log_path
+        self.textfile_path = textfile_path
+        self.keep_records = keep_records
+        self._records: List[JobRecord] = []
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, record: JobRecord) -> None:
+        """登记一条作业记录：写日志、更新汇总、重写 textfile"""
+        with self._lock:
+            self._records.append(record)
+            del self._records[:-self.keep_records]
+            totals = self._totals.setdefault(record.operation, {
+                'jobs_ok': 0, 'jobs_failed': 0, 'wall_seconds': 0.0, 'user_cpu_seconds': 0.0,
+                'system_cpu_seconds': 0.0, 'max_rss_bytes': 0, 'read_bytes': 0, 'write_bytes': 0,
+                'output_seconds': 0.0})
+            totals['jobs_ok' if record.ok else 'jobs_failed'] += 1
+            for key in ('wall_seconds', 'user_cpu_seconds', 'system_cpu_seconds', 'read_bytes', 'write_bytes',
+                        'output_seconds'):
+                totals[key] += getattr(record, key) or 0
+            totals['max_rss_bytes'] = max(totals['max_rss_bytes'], record.max_rss_bytes or 0)
+            if self.log_path:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record.to_dict(), ensure_ascii=False) + "\n")
+            if self.textfile_path:
+                self._write_textfile()
+
+    def records(self) -> List[JobRecord]:
+        """最近的作业记录"""
+        with self._lock:
+            return list(self._records)
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """按操作汇总的累计值"""
+        with self._lock:
+            return {operation: dict(values) for operation, values in self._totals.items()}
+
+    def prometheus_text(self) -> str:
+        """Prometheus 文本格式的指标"""
+        with self._lock:
+            return self._render_prometheus()
+
+    def _render_prometheus(self) -> str:
+        metrics = [
+            ('autovideoclip_job_wall_seconds_total', 'counter', "ffmpeg 作业累计墙钟时间（秒）", 'wall_seconds'),
+            ('autovideoclip_job_user_cpu_seconds_total', 'counter', "ffmpeg 作业累计用户态 CPU 时间（秒）",
+             'user_cpu_seconds'),
+            ('autovideoclip_job_system_cpu_seconds_total', 'counter', "ffmpeg 作业累计系统态 CPU 时间（秒）",
+             'system_cpu_seconds'),
+            ('autovideoclip_job_max_rss_bytes', 'gauge', "单个作业的最大峰值内存（字节）", 'max_rss_bytes'),
+            ('autovideoclip_job_read_bytes_total', 'counter', "作业输入文件累计字节数", 'read_bytes'),
+            ('autovideoclip_job_write_bytes_total', 'counter', "作业输出文件累计字节数", 'write_bytes'),
+            ('autovideoclip_job_output_seconds_total', 'counter', "作业输出媒体的累计时长（秒）", 'output_seconds'),
+        ]
+        operations = sorted(self._totals)
+        lines = ["# HELP autovideoclip_jobs_total ffmpeg 作业数（按操作与结果）",
+                 "# TYPE autovideoclip_jobs_total counter"]
+        for operation in operations:
+            for status in ('ok', 'failed'):
+                lines.append(f'autovideoclip_jobs_total{{operation="{_escape(operation)}",status="{status}"}} '
+                             f'{self._totals[operation][f"jobs_{status}"]:g}')
+        for name, kind, help_text, key in metrics:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{operation="{_escape(operation)}"}} {self._totals[operation][key]:g}'
+                      for operation in operations]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self) -> None:
+        """立即重写 Prometheus textfile"""
+        with self._lock:
+            self._write_textfile()
+
+    def _write_textfile(self) -> None:
+        # 先写临时文件再原子替换：node_exporter 不会读到写了一半的文件
+        directory = os.path.dirname(os.path.abspath(self.textfile_path))
+        os.makedirs(directory, exist_ok=True)
+        partial = f"{self.textfile_path}.{os.getpid()}.partial"
+        with open(partial, 'w', encoding='utf-8') as f:
+            f.write(self._render_prometheus())
+        os.replace(partial, self.textfile_path)
+
+
+def _escape(value: str) -> str:
+    """Prometheus 标签值转义"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
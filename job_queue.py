@@ -0,0 +1,217 @@
+# job_queue.py
+import json
+import os
+import socket
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+# 队列目录下的三个状态子目录：待处理 / 执行中 / 已完成
+_STATES = ('pending', 'running', 'done')
+
+
+class RenderJob:
+    """一个可序列化的渲染作业：操作名 + 关键字参数（包含输入 / 输出路径）"""
+
+    __slots__ = ('job_id', 'operation', 'params', 'submitted_at')
+
+    def __init__(self, operation: str, params: Dict[str, Any], job_id: Optional[str] = None,
+                 submitted_at: Optional[float] = None):
+        """
+        :param operation: 操作名，如 "ExportDistributor.export_for_douyin"（见 operations.resolve_operation）
+        :param params: 方法的关键字参数，必须可以 JSON 序列化（tuple 会变为 list）
+        :param job_id: 作业 ID，默认按提交时间生成（字典序即提交顺序）
+        """
+        self.operation = operation
+        self.params = params
+        self.job_id = job_id or f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        self.submitted_at = submitted_at if submitted_at is not None else time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RenderJob":
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+    def __repr__(self) -> str:
+        return f"<RenderJob {self.job_id} {self.operation}>"
+
+
+class JobResult:
+    """作业执行结果：是否成功、执行者、耗时与错误信息"""
+
+    __slots__ = ('job_id', 'ok', 'worker', 'started_at', 'finished_at', 'error')
+
+    def __init__(self, job_id: str, ok: bool, worker: str, started_at: float, finished_at: float,
+                 error: Optional[str] = None):
+        self.job_id = job_id
+        self.ok = ok
+        self.worker = worker
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.error = error
+
+    @property
+    def duration(self) -> float:
+        """执行耗时（秒）"""
+        return self.finished_at - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "JobResult":
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else f"failed: {self.error}"
+        return f"<JobResult {self.job_id} {status} by {self.worker} in {self.duration:.2f}s>"
+
+
+def default_worker_id() -> str:
+    """执行者标识：主机名 + 进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class FileJobQueue:
+    """
+    基于共享目录的作业队列（不依赖任何外部服务），协调者与各主机上的执行者只需挂载同一个目录：
+        pending/<job_id>.json   待处理的作业
+        running/<job_id>.json   已被某个执行者领取（os.rename 原子移动，保证一个作业只被领取一次）
+        done/<job_id>.json      作业 + 执行结果
+    执行中的作业由执行者定期更新修改时间作为心跳，执行者崩溃后可通过 requeue_stale() 重新入队。
+    """
+
+    def __init__(self, root: str):
+        """
+        :param root: 队列目录（多台主机时放在共享存储上）
+        """
+        self.root = os.path.abspath(root)
+        for state in _STATES:
+            os.makedirs(os.path.join(self.root, state), exist_ok=True)
+
+    def _path(self, state: str, job_id: str) -> str:
+        return os.path.join(self.root, state, f"{job_id}.json")
+
+    def _write(self, path: str, data: Dict[str, Any]) -> None:
+        """
+        先写临时文件再改名，读取方不会看到写了一半的 JSON。
+        临时文件由 mkstemp 生成、名称唯一：不同主机上进程号相同的执行者同时写同一个作业时也不会互相覆盖
+        """
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _job_ids(self, state: str) -> List[str]:
+        names = os.listdir(os.path.join(self.root, state))
+        return sorted(name[:-len('.json')] for name in names if name.endswith('.json'))
+
+    # ----------------------------------------------------------------------
+    # 【1】协调者：提交与查询
+    # ----------------------------------------------------------------------
+    def put(self, job: RenderJob) -> str:
+        """
+        提交一个作业
+        :return: 作业 ID
+        """
+        self._write(self._path('pending', job.job_id), job.to_dict())
+        return job.job_id
+
+    def result(self, job_id: str) -> Optional[JobResult]:
+        """已完成作业的结果，未完成时返回 None"""
+        data = self._read(self._path('done', job_id))
+        return JobResult.from_dict(data['result']) if data else None
+
+    def wait(self, job_ids: Iterable[str], timeout: Optional[float] = None,
+             poll_interval: float = 0.2) -> Dict[str, JobResult]:
+        """
+        等待一组作业完成
+        :param timeout: 最长等待时间（秒），None 表示一直等待
+        :return: {作业 ID: 结果}，超时时只包含已完成的作业
+        """
+        remaining = list(job_ids)
+        results: Dict[str, JobResult] = {}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while remaining:
+            for job_id in list(remaining):
+                result = self.result(job_id)
+                if result is not None:
+                    results[job_id] = result
+                    remaining.remove(job_id)
+            if not remaining or (deadline is not None and time.monotonic() >= deadline):
+                break
+            time.sleep(poll_interval)
+        return results
+
+    def counts(self) -> Dict[str, int]:
+        """各状态的作业数量，如 {"pending": 3, "running": 2, "done": 10}"""
+        return {state: len(self._job_ids(state)) for state in _STATES}
+
+    # ----------------------------------------------------------------------
+    # 【2】执行者：领取、心跳与完成
+    # ----------------------------------------------------------------------
+    def claim(self) -> Optional[RenderJob]:
+        """
+        按提交顺序领取一个待处理作业
+        :return: RenderJob，队列为空时返回 None
+        """
+        for job_id in self._job_ids('pending'):
+            running = self._path('running', job_id)
+            try:
+                os.rename(self._path('pending', job_id), running)
+            except OSError:
+                continue  # 已被其他执行者领取
+            os.utime(running)
+            data = self._read(running)
+            if data is not None:
+                return RenderJob.from_dict(data)
+        return None
+
+    def heartbeat(self, job: RenderJob) -> None:
+        """更新执行中作业的心跳"""
+        try:
+            os.utime(self._path('running', job.job_id))
+        except OSError:
+            pass
+
+    def complete(self, job: RenderJob, result: JobResult) -> None:
+        """记录作业结果，并从执行中移除"""
+        self._write(self._path('done', job.job_id), {'job': job.to_dict(), 'result': result.to_dict()})
+        try:
+            os.remove(self._path('running', job.job_id))
+        except OSError:
+            pass
+
+    def requeue_stale(self, max_age: float) -> List[str]:
+        """
+        把心跳超时的执行中作业（执行者已崩溃或失联）放回待处理
+        :param max_age: 心跳超时时间（秒），应明显大于执行者的心跳间隔
+        :return: 重新入队的作业 ID
+        """
+        requeued = []
+        now = time.time()
+        for job_id in self._job_ids('running'):
+            running = self._path('running', job_id)
+            try:
+                if now - os.stat(running).st_mtime > max_age:
+                    os.rename(running, self._path('pending', job_id))
+                    requeued.append(job_id)
+            except OSError:
+                continue
+        return requeued
@@ -8,6 +8,7 @@
 import os
 import sys
 from utils import clear_outputs_directory
+from media_factory import MediaFactory
 
 # 添加当前目录和tests目录到系统路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -26,6 +27,9 @@ def main():
     # 清空outputs目录
     clear_outputs_directory(outputs_path)
 
+    # 补齐测试素材：inputs 目录中缺失的文件用 lavfi 合成（已有文件保持不变）
+    MediaFactory().ensure_test_inputs(os.path.join(current_dir, 'inputs'))
+
     # 运行测试
     run_tests()
 
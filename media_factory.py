@@ -0,0 +1,247 @@
+# media_factory.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from ffmpeg_engine import FFmpegEngine, get_default_engine
+from render_tier import render_tier
+
+# 合成素材默认缓存目录（可通过环境变量 AUTOVIDEOCLIP_MEDIA_CACHE 指定）
+DEFAULT_MEDIA_CACHE = os.environ.get("AUTOVIDEOCLIP_MEDIA_CACHE") or \
+    os.path.join(tempfile.gettempdir(), "autovideoclip_media")
+
+# 声道布局 → 声道数（"none" 表示没有音频流）
+AUDIO_LAYOUTS = {'none': 0, 'mono': 1, 'stereo': 2, '5.1': 6}
+# 音频来源：sine 正弦波，noise 粉红噪声（固定随机种子），silence 静音
+AUDIO_SOURCES = ('sine', 'noise', 'silence')
+# 按扩展名选择默认音频编码器
+_AUDIO_CODECS = {'.mp3': 'libmp3lame', '.wav': 'pcm_s16le', '.flac': 'flac', '.ogg': 'libopus', '.opus': 'libopus'}
+_DEFAULT_AUDIO_CODEC = 'aac'
+# 去掉编码器版本、创建时间等元数据，同一规格每次生成的文件字节一致
+_BITEXACT_ARGS = ['-map_metadata', '-1', '-fflags', '+bitexact', '-flags:v', '+bitexact', '-flags:a', '+bitexact']
+
+
+class MediaSpec:
+    """
+    合成素材规格（视频 / 音频 / 图片）。所有字段参与缓存键，规格相同的素材只生成一次。
+    画面来自 testsrc2（图片为纯色 color），声音来自 sine / anoisesrc / anullsrc，全部确定性生成。
+    """
+
+    __slots__ = ('kind', 'duration', 'width', 'height', 'fps', 'video_codec', 'pix_fmt', 'gop',
+                 'audio_layout', 'sample_rate', 'audio_codec', 'audio_source', 'frequency', 'color', 'extension')
+
+    def __init__(self, kind: str = 'video', duration: float = 10.0, width: int = 1280, height: int = 720,
+                 fps: float = 30, video_codec: str = 'libx264', pix_fmt: str = 'yuv420p', gop: Optional[int] = None,
+                 audio_layout: str = 'stereo', sample_rate: int = 48000, audio_codec: Optional[str] = None,
+                 audio_source: str = 'sine', frequency: int = 440, color: str = 'orange',
+                 extension: Optional[str] = None):
+        """
+        :param kind: "video" / "audio" / "image"
+        :param duration: 时长（秒），图片忽略
+        :param width: 宽度（像素），音频忽略
+        :param height: 高度（像素），音频忽略
+        :param fps: 帧率
+        :param video_codec: 视频编码器，如 libx264 / libx265 / mpeg4
+        :param pix_fmt: 像素格式
+        :param gop: 关键帧间隔（帧），默认 2 秒
+        :param audio_layout: 声道布局，见 AUDIO_LAYOUTS
+        :param sample_rate: 采样率
+        :param audio_codec: 音频编码器，默认按扩展名选择（mp3 → libmp3lame，wav → pcm_s16le，其余 aac）
+        :param audio_source: 音频来源，见 AUDIO_SOURCES
+        :param frequency: 正弦波频率（Hz）
+        :param color: 图片颜色
+        :param extension: 扩展名，默认视频 .mp4、音频 .mp3、图片 .png
+        """
+        if kind not in ('video', 'audio', 'image'):
+            raise ValueError(f"未知的素材类型：{kind}，可选值：video, audio, image")
+        if audio_layout not in AUDIO_LAYOUTS:
+            raise ValueError(f"未知的声道布局：{audio_layout}，可选值：{', '.join(AUDIO_LAYOUTS)}")
+        if audio_source not in AUDIO_SOURCES:
+            raise ValueError(f"未知的音频来源：{audio_source}，可选值：{', '.join(AUDIO_SOURCES)}")
+        self.kind = kind
+        self.duration = float(duration)
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = fps
+        self.video_codec = video_codec
+        self.pix_fmt = pix_fmt
+        self.gop = gop
+        self.audio_layout = audio_layout
+        self.sample_rate = int(sample_rate)
+        self.audio_source = audio_source
+        self.frequency = int(frequency)
+        self.color = color
+        self.extension = extension or {'video': '.mp4', 'audio': '.mp3', 'image': '.png'}[kind]
+        self.audio_codec = audio_codec or _AUDIO_CODECS.get(self.extension.lower(), _DEFAULT_AUDIO_CODEC)
+
+    @classmethod
+    def video(cls, duration: float = 10.0, width: int = 1280, height: int = 720, **kwargs) -> "MediaSpec":
+        return cls('video', duration, width, height, **kwargs)
+
+    @classmethod
+    def audio(cls, duration: float = 10.0, **kwargs) -> "MediaSpec":
+        return cls('audio', duration, **kwargs)
+
+    @classmethod
+    def image(cls, width: int = 256, height: int = 256, **kwargs) -> "MediaSpec":
+        return cls('image', width=width, height=height, **kwargs)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def key(self) -> str:
+        """缓存键：规格的稳定哈希"""
+        identity = json.dumps(self.to_dict(), sort_keys=True)
+        return hashlib.blake2b(identity.encode('utf-8'), digest_size=8).hexdigest()
+
+    def filename(self) -> str:
+        """可读的缓存文件名，如 video_1280x720_30fps_10s.<哈希>.mp4"""
+        if self.kind == 'audio':
+            label = f"audio_{self.audio_layout}_{self.duration:g}s"
+        elif self.kind == 'image':
+            label = f"image_{self.width}x{self.height}"
+        else:
+            label = f"video_{self.width}x{self.height}_{self.fps:g}fps_{self.duration:g}s"
+        return f"{label}.{self.key()}{self.extension}"
+
+    def ffmpeg_args(self, output_path: str) -> List[str]:
+        """生成该素材的 ffmpeg 参数（不含 ffmpeg 本身）"""
+        if self.kind == 'image':
+            return ['-y', '-f', 'lavfi', '-i', f"color=c={self.color}:size={self.width}x{self.height}",
+                    '-frames:v', '1'] + _BITEXACT_ARGS[:2] + [output_path]
+
+        args = ['-y']
+        if self.kind == 'video':
+            args += ['-f', 'lavfi', '-i',
+                     f"testsrc2=size={self.width}x{self.height}:rate={self.fps:g}:duration={self.duration:g}"]
+        channels = AUDIO_LAYOUTS[self.audio_layout] if self.kind == 'video' else max(1, AUDIO_LAYOUTS[self.audio_layout])
+        if channels:
+            args += ['-f', 'lavfi', '-i', self._audio_source()]
+        if self.kind == 'video':
+            gop = self.gop or max(1, round(self.fps * 2))
+            args += ['-map', '0:v', '-c:v', self.video_codec, '-pix_fmt', self.pix_fmt, '-g', str(gop)]
+            args += ['-map', '1:a', '-ac', str(channels)] if channels else []
+        else:
+            args += ['-ac', str(channels)]
+        if channels:
+            args += ['-c:a', self.audio_codec, '-ar', str(self.sample_rate)]
+        return args + ['-t', f"{self.duration:g}"] + _BITEXACT_ARGS + [output_path]
+
+    def _audio_source(self) -> str:
+        duration = f"{self.duration:g}"
+        if self.audio_source == 'noise':
+            return f"anoisesrc=d={duration}:c=pink:r={self.sample_rate}:a=0.1:seed=42"
+        if self.audio_source == 'silence':
+            return f"anullsrc=r={self.sample_rate}:cl=mono"
+        return f"sine=frequency={self.frequency}:sample_rate={self.sample_rate}:duration={duration}"
+
+    def __repr__(self) -> str:
+        return f"<MediaSpec {self.filename()}>"
+
+
+# 测试用例使用的素材（inputs/ 目录下缺失时按此规格生成）
+TEST_INPUTS: Dict[str, MediaSpec] = {
+    "cat_01.mp4": MediaSpec.video(30.0, 1280, 720),
+    "cat_02.mp4": MediaSpec.video(10.0, 1280, 720, frequency=523),
+    "cat_03.mp4": MediaSpec.video(10.0, 1280, 720, frequency=659),
+    "input1.mp4": MediaSpec.video(10.0, 1920, 1080),
+    "4k_01.mp4": MediaSpec.video(10.0, 3840, 2160),
+    "bgm.mp3": MediaSpec.audio(90.0, audio_source='noise'),
+    "logo.png": MediaSpec.image(200, 200),
+    "watermark.png": MediaSpec.image(256, 64, color='white'),
+}
+
+
+class MediaFactory:
+    """
+    合成素材工厂：按规格用 lavfi 生成测试 / 基准素材并缓存，测试不再依赖手工放入 inputs/ 的文件。
+    示例：
+        factory = MediaFactory()
+        clip = factory.video(duration=60, width=1920, height=1080, fps=60, video_codec='libx265')
+        bgm = factory.audio(duration=90, audio_source='noise')
+        factory.ensure_test_inputs("inputs")     # 补齐测试用例需要的 cat_01.mp4 / bgm.mp3 / logo.png 等
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, ffmpeg_cmd: str = "ffmpeg",
+                 engine: Optional[FFmpegEngine] = None):
+        """
+        :param cache_dir: 缓存目录，默认 DEFAULT_MEDIA_CACHE
+        :param ffmpeg_cmd: ffmpeg 命令名称
+        :param engine: 共享的 ffmpeg 执行引擎，默认使用全局引擎（批量生成时并行执行）
+        """
+        self.cache_dir = os.path.abspath(cache_dir or DEFAULT_MEDIA_CACHE)
+        self.ffmpeg = ffmpeg_cmd
+        self.engine = engine if engine is not None else get_default_engine()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, spec: MediaSpec) -> str:
+        """素材的缓存路径（不保证已生成）"""
+        return os.path.join(self.cache_dir, spec.filename())
+
+    def generate(self, spec: MediaSpec) -> Optional[str]:
+        """
+        生成一个素材（已缓存时直接返回）
+        :return: 素材路径，失败时返回 None
+        """
+        return self.generate_many([spec])[0]
+
+    def generate_many(self, specs: Iterable[MediaSpec]) -> List[Optional[str]]:
+        """
+        并行生成多个素材：未缓存的规格各写入临时文件，成功后原子替换为缓存文件，
+        多个进程同时生成同一规格也不会得到不完整的文件
+        :return: 与 specs 顺序一致的素材路径列表，失败的为 None
+        """
+        specs = list(specs)
+        paths = [self.path_for(spec) for spec in specs]
+        missing = {}
+        for spec, path in zip(specs, paths):
+            if not os.path.isfile(path) and path not in missing:
+                missing[path] = (spec, f"{path}.{os.getpid()}.{threading.get_ident()}.partial{spec.extension}")
+
+        if missing:
+            commands = [[self.ffmpeg] + spec.ffmpeg_args(partial) for spec, partial in missing.values()]
+            # 素材始终按规格编码，不受调用方 render_tier() 的影响
+            with render_tier("final"):
+                results = self.engine.run_many(commands, label="合成素材生成失败")
+            for (path, (_, partial)), ok in zip(missing.items(), results):
+                if ok and os.path.isfile(partial):
+                    os.replace(partial, path)
+                elif os.path.exists(partial):
+                    os.remove(partial)
+        return [path if os.path.isfile(path) else None for path in paths]
+
+    def video(self, duration: float = 10.0, width: int = 1280, height: int = 720, **kwargs) -> Optional[str]:
+        """生成视频素材，参数见 MediaSpec"""
+        return self.generate(MediaSpec.video(duration, width, height, **kwargs))
+
+    def audio(self, duration: float = 10.0, **kwargs) -> Optional[str]:
+        """生成音频素材，参数见 MediaSpec"""
+        return self.generate(MediaSpec.audio(duration, **kwargs))
+
+    def image(self, width: int = 256, height: int = 256, **kwargs) -> Optional[str]:
+        """生成图片素材，参数见 MediaSpec"""
+        return self.generate(MediaSpec.image(width, height, **kwargs))
+
+    def ensure_test_inputs(self, directory: str = "inputs",
+                           inputs: Optional[Dict[str, MediaSpec]] = None) -> Dict[str, bool]:
+        """
+        补齐测试用例使用的素材：目录中已存在的文件保持不变，缺失的从缓存复制（必要时先生成）
+        :param directory: 素材目录，如 "inputs"
+        :param inputs: {文件名: 规格}，默认 TEST_INPUTS
+        :return: {文件名: 是否就绪}
+        """
+        inputs = TEST_INPUTS if inputs is None else inputs
+        os.makedirs(directory, exist_ok=True)
+        wanted = {name: spec for name, spec in inputs.items() if not os.path.isfile(os.path.join(directory, name))}
+        generated = dict(zip(wanted, self.generate_many(wanted.values())))
+        status = {}
+        for name in inputs:
+            target = os.path.join(directory, name)
+            if name in generated and generated[name] is not None:
+                shutil.copyfile(generated[name], target)
+            status[name] = os.path.isfile(target)
+        return status
@@ -0,0 +1,336 @@
+# media_probe.py
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """把 ffprobe 输出的数值字符串转换为 float（"N/A" / 缺失时返回 None）"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    """把 ffprobe 输出的数值字符串转换为 int（"N/A" / 缺失时返回 None）"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_rate(value: Any) -> Optional[float]:
+    """解析帧率字符串，如 "30000/1001" -> 29.97，"0/0" 返回 None"""
+    try:
+        num, den = str(value).split('/')
+        return float(num) / float(den) if float(den) else None
+    except (TypeError, ValueError):
+        return _to_float(value)
+
+
+class StreamInfo:
+    """单路音视频流的信息（来自 ffprobe -show_streams）"""
+
+    __slots__ = ('index', 'codec_type', 'codec_name', 'width', 'height', 'frame_rate', 'pix_fmt',
+                 'sample_rate', 'channels', 'start_time', 'duration', 'bit_rate', 'time_base')
+
+    def __init__(self, index: int, codec_type: str, codec_name: Optional[str] = None,
+                 width: Optional[int] = None, height: Optional[int] = None, frame_rate: Optional[float] = None,
+                 pix_fmt: Optional[str] = None, sample_rate: Optional[int] = None, channels: Optional[int] = None,
+                 start_time: Optional[float] = None, duration: Optional[float] = None, bit_rate: Optional[int] = None,
+                 time_base: Optional[str] = None):
+        self.index = index
+        self.codec_type = codec_type
+        self.codec_name = codec_name
+        self.width = width
+        self.height = height
+        self.frame_rate = frame_rate
+        self.pix_fmt = pix_fmt
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.start_time = start_time
+        self.duration = duration
+        self.bit_rate = bit_rate
+        self.time_base = time_base  # 如 "1/15360"
+
+    @classmethod
+    def from_ffprobe(cls, stream: Dict[str, Any]) -> "StreamInfo":
+        """由 ffprobe JSON 输出中的单个 stream 字典构造"""
+        frame_rate = _parse_rate(stream.get('avg_frame_rate'))
+        if not frame_rate:
+            frame_rate = _parse_rate(stream.get('r_frame_rate'))
+        return cls(
+            index=_to_int(stream.get('index')) or 0,
+            codec_type=stream.get('codec_type', ''),
+            codec_name=stream.get('codec_name'),
+            width=_to_int(stream.get('width')),
+            height=_to_int(stream.get('height')),
+            frame_rate=frame_rate,
+            pix_fmt=stream.get('pix_fmt'),
+            sample_rate=_to_int(stream.get('sample_rate')),
+            channels=_to_int(stream.get('channels')),
+            start_time=_to_float(stream.get('start_time')),
+            duration=_to_float(stream.get('duration')),
+            bit_rate=_to_int(stream.get('bit_rate')),
+            time_base=stream.get('time_base'),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"<StreamInfo #{self.index} {self.codec_type} {self.codec_name}>"
+
+
+class MediaInfo:
+    """
+    一个媒体文件的完整探测结果（一次 ffprobe -show_format -show_streams 调用）
+    通过 probe() 获取，同一文件在大小和修改时间不变时只探测一次
+    """
+
+    __slots__ = ('path', 'format_name', 'duration', 'start_time', 'bit_rate', 'size', 'streams')
+
+    def __init__(self, path: str, format_name: Optional[str] = None, duration: Optional[float] = None,
+                 start_time: Optional[float] = None, bit_rate: Optional[int] = None, size: Optional[int] = None,
+                 streams: Optional[List[StreamInfo]] = None):
+        self.path = path
+        self.format_name = format_name
+        self.duration = duration
+        self.start_time = start_time
+        self.bit_rate = bit_rate
+        self.size = size
+        self.streams = streams or []
+
+    @classmethod
+    def from_ffprobe(cls, path: str, data: Dict[str, Any]) -> "MediaInfo":
+        """由 ffprobe -of json 的完整输出构造"""
+        fmt = data.get('format', {})
+        return cls(
+            path=path,
+            format_name=fmt.get('format_name'),
+            duration=_to_float(fmt.get('duration')),
+            start_time=_to_float(fmt.get('start_time')),
+            bit_rate=_to_int(fmt.get('bit_rate')),
+            size=_to_int(fmt.get('size')),
+            streams=[StreamInfo.from_ffprobe(stream) for stream in data.get('streams', [])],
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MediaInfo":
+        """由 to_dict() 的结果还原（用于磁盘缓存）"""
+        streams = [StreamInfo(**stream) for stream in data.get('streams', [])]
+        return cls(**{**data, 'streams': streams})
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['streams'] = [stream.to_dict() for stream in self.streams]
+        return data
+
+    # ---- 常用查询 ----
+    @property
+    def video(self) -> Optional[StreamInfo]:
+        """第一路视频流（封面图等 attached_pic 也算作视频流）"""
+        return next((s for s in self.streams if s.codec_type == 'video'), None)
+
+    @property
+    def audio(self) -> Optional[StreamInfo]:
+        """第一路音频流"""
+        return next((s for s in self.streams if s.codec_type == 'audio'), None)
+
+    @property
+    def has_video(self) -> bool:
+        return self.video is not None
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio is not None
+
+    @property
+    def resolution(self) -> Optional[Tuple[int, int]]:
+        """第一路视频流的分辨率 (宽, 高)"""
+        video = self.video
+        if video is None or not video.width or not video.height:
+            return None
+        return video.width, video.height
+
+    @property
+    def fps(self) -> Optional[float]:
+        """第一路视频流的帧率"""
+        video = self.video
+        return video.frame_rate if video is not None else None
+
+    def __repr__(self) -> str:
+        return f"<MediaInfo {self.path} {self.format_name} {self.duration}s streams={self.streams}>"
+
+
+# ======================================================================
+# 探测结果缓存：内存缓存按 (绝对路径, 大小, 修改时间) 记忆，
+# 可选的磁盘缓存（set_probe_cache_dir / 环境变量 AUTOVIDEOCLIP_PROBE_CACHE）在进程之间共享
+# ======================================================================
+_memory_cache: Dict[Tuple[str, int, int], MediaInfo] = {}
+_memory_lock = threading.Lock()
+_disk_cache_dir: Optional[str] = os.environ.get("AUTOVIDEOCLIP_PROBE_CACHE") or None
+
+
+def set_probe_cache_dir(cache_dir: Optional[str]) -> None:
+    """
+    设置探测结果的磁盘缓存目录
+    :param cache_dir: 缓存目录，None 表示只使用内存缓存
+    """
+    global _disk_cache_dir
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    _disk_cache_dir = cache_dir
+
+
+def clear_probe_cache() -> None:
+    """清空内存中的探测结果与关键帧缓存（磁盘缓存不受影响）"""
+    with _memory_lock:
+        _memory_cache.clear()
+        _keyframe_cache.clear()
+
+
+def probe(path: str, ffprobe_cmd: str = "ffprobe") -> Optional[MediaInfo]:
+    """
+    获取媒体文件信息（格式 + 所有流），只调用一次 ffprobe
+    :param path: 媒体文件路径
+    :param ffprobe_cmd: ffprobe 命令名称
+    :return: MediaInfo，文件不存在或探测失败时返回 None
+    """
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        print(f"获取媒体信息失败: {e}")
+        return None
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _memory_lock:
+        info = _memory_cache.get(key)
+    if info is not None:
+        return info
+
+    info = _load_from_disk(key)
+    if info is None:
+        info = _run_ffprobe(path, ffprobe_cmd)
+        if info is None:
+            return None
+        _save_to_disk(key, info)
+    with _memory_lock:
+        _memory_cache[key] = info
+    return info
+
+
+def _run_ffprobe(path: str, ffprobe_cmd: str) -> Optional[MediaInfo]:
+    cmd = [
+        ffprobe_cmd, '-v', 'error',
+        '-show_format', '-show_streams',
+        '-of', 'json',
+        path
+    ]
+    try:
+        result = subprocess.run(
+            cmd,
+            check=True,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+        )
+        return MediaInfo.from_ffprobe(path, json.loads(result.stdout))
+    except Exception as e:
+        print(f"获取媒体信息失败: {e}")
+        return None
+
+
+def _disk_cache_file(key: Tuple[str, int, int]) -> Optional[str]:
+    if not _disk_cache_dir:
+        return None
+    digest = hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+    return os.path.join(_disk_cache_dir, digest + ".json")
+
+
+def _load_from_disk(key: Tuple[str, int, int]) -> Optional[MediaInfo]:
+    cache_file = _disk_cache_file(key)
+    if cache_file is None or not os.path.isfile(cache_file):
+        return None
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return MediaInfo.from_dict(json.load(f))
+    except Exception:
+        return None
+
+
+def _save_to_disk(key: Tuple[str, int, int], info: MediaInfo) -> None:
+    cache_file = _disk_cache_file(key)
+    if cache_file is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(info.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, cache_file)
+    except OSError as e:
+        print(f"[⚠️ 写入探测缓存失败：{e}]")
+
+
+# ======================================================================
+# 关键帧位置：只解复用、读取视频包的 flags，不解码，可用于在关键帧处切分 / 无损剪切
+# ======================================================================
+_keyframe_cache: Dict[Tuple[str, int, int], List[float]] = {}
+
+
+def probe_keyframes(path: str, ffprobe_cmd: str = "ffprobe") -> Optional[List[float]]:
+    """
+    获取第一路视频流所有关键帧的时间（秒，相对文件开头，即可直接用于 -ss），结果按文件记忆
+    :param path: 视频文件路径
+    :param ffprobe_cmd: ffprobe 命令名称
+    :return: 升序的关键帧时间列表，失败时返回 None
+    """
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        print(f"获取关键帧失败: {e}")
+        return None
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _memory_lock:
+        cached = _keyframe_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    cmd = [
+        ffprobe_cmd, '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=p=0',
+        path
+    ]
+    try:
+        result = subprocess.run(
+            cmd,
+            check=True,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+        )
+    except Exception as e:
+        print(f"获取关键帧失败: {e}")
+        return None
+
+    info = probe(path, ffprobe_cmd)
+    start_time = (info.start_time if info is not None else None) or 0.0
+    times = set()
+    for line in result.stdout.splitlines():
+        fields = line.strip().split(',')
+        if len(fields) >= 2 and 'K' in fields[1]:
+            pts_time = _to_float(fields[0])
+            if pts_time is not None:
+                times.add(round(max(0.0, pts_time - start_time), 6))
+    keyframes = sorted(times)
+    with _memory_lock:
+        _keyframe_cache[key] = keyframes
+    return list(keyframes)
@@ -0,0 +1,77 @@
+# operations.py
+import inspect
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ffmpeg_engine import FFmpegEngine
+from job_metrics import job_tag
+from video_editor import VideoEditor
+from video_trimmer import VideoTrimmer
+from audio_editor import AudioEditor
+from color_correction import ColorCorrection
+from video_compositor import VideoCompositor
+from export_distributor import ExportDistributor
+
+# 可按名称调用的编辑器类："ColorCorrection.apply_denoise" → ColorCorrection().apply_denoise
+EDITOR_CLASSES: Dict[str, type] = {cls.__name__: cls for cls in (
+    VideoEditor, VideoTrimmer, AudioEditor, ColorCorrection, VideoCompositor, ExportDistributor)}
+
+
+def resolve_operation(operation: str) -> Tuple[type, str]:
+    """
+    把操作名解析为编辑器类和方法名
+    :param operation: 操作名，格式为 "类名.方法名"，如 "ExportDistributor.export_for_douyin"
+    :return: (编辑器类, 方法名)
+    """
+    class_name, _, method_name = operation.partition('.')
+    cls = EDITOR_CLASSES.get(class_name)
+    if cls is None:
+        raise ValueError(f"未知的编辑器类：{class_name}，可选值：{', '.join(EDITOR_CLASSES)}")
+    if method_name.startswith('_') or not inspect.isfunction(getattr(cls, method_name, None)):
+        raise ValueError(f"{class_name} 没有可调用的方法：{method_name}")
+    return cls, method_name
+
+
+def list_operations() -> List[str]:
+    """所有可按名称调用的操作，如 ["AudioEditor.adjust_volume", ...]"""
+    return sorted(f"{name}.{method}" for name, cls in EDITOR_CLASSES.items()
+                  for method, fn in inspect.getmembers(cls, inspect.isfunction) if not method.startswith('_'))
+
+
+class OperationRunner:
+    """
+    按名称执行编辑操作。每个编辑器类只创建一个实例（编辑器是无状态的，可在线程之间共享）。
+    """
+
+    def __init__(self, ffmpeg_cmd: str = "ffmpeg", engine: Optional[FFmpegEngine] = None):
+        """
+        :param ffmpeg_cmd: ffmpeg 命令名称
+        :param engine: 共享的 ffmpeg 执行引擎，默认使用全局引擎
+        """
+        self.ffmpeg = ffmpeg_cmd
+        self.engine = engine
+        self._editors: Dict[type, Any] = {}
+        self._lock = threading.Lock()
+
+    def editor_for(self, cls: type) -> Any:
+        with self._lock:
+            editor = self._editors.get(cls)
+            if editor is None:
+                editor = self._editors[cls] = cls(self.ffmpeg, self.engine)
+            return editor
+
+    def method(self, operation: str) -> Callable[..., Any]:
+        """获取操作对应的已绑定方法"""
+        cls, method_name = resolve_operation(operation)
+        return getattr(self.editor_for(cls), method_name)
+
+    def run(self, operation: str, params: Dict[str, Any]) -> Any:
+        """
+        执行一次操作
+        :param operation: 操作名，如 "ColorCorrection.adjust_brightness"
+        :param params: 关键字参数（包含输入 / 输出路径），如 {"input_path": ..., "output_path": ..., "brightness": 0.1}
+        :return: 方法的返回值（通常为 True / False）
+        """
+        method = self.method(operation)
+        with job_tag(operation):
+            return method(**params)
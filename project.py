@@ -0,0 +1,684 @@
+# project.py
+import inspect
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from ffmpeg_engine import FFmpegEngine, capture_commands, get_default_engine
+from utils import get_output_filepath, get_video_resolution, split_top_level
+from video_editor import VideoEditor
+from video_trimmer import VideoTrimmer
+from audio_editor import AudioEditor
+from color_correction import ColorCorrection, merge_adjacent_eq
+from video_compositor import VideoCompositor
+from export_distributor import ExportDistributor
+from proxy_manager import ProxyManager
+
+# 记录节点时使用的占位路径：只用来捕获命令，不会真正读写
+_INPUT_PLACEHOLDER = "__project_input__.mp4"
+_OUTPUT_PLACEHOLDER = "__project_output__.mp4"
+
+# 逐像素开销较大的滤镜及其相对开销（每像素）。启用 reorder_expensive_filters 时优化器把它们移到缩小分辨率之后：
+# 这些滤镜的半径 / 强度以像素为单位，缩小后再执行只是近似效果（更快，但与原顺序的输出不同）
+EXPENSIVE_FILTER_COST = {'hqdn3d': 8.0, 'smartblur': 6.0, 'unsharp': 4.0, 'boxblur': 3.0}
+# 只依赖当前帧当前像素、不改变帧序列的滤镜：昂贵滤镜可以越过它们移动。
+# trim / setpts / fade 等与时间有关的滤镜不在其中：hqdn3d 是时域降噪，越过 trim 会看不到切点之前的帧
+POINTWISE_FILTERS = {'eq', 'hue', 'colorchannelmixer', 'format', 'null', 'copy'}
+# 不带参数值的 ffmpeg 选项
+_FLAG_OPTIONS = {'-y', '-n', '-an', '-vn', '-sn', '-dn', '-shortest', '-nostdin'}
+# 编码器选项：取值为 copy（流复制）时与滤镜冲突，融合后需丢弃
+_CODEC_OPTIONS = {'-c', '-c:v', '-c:a', '-codec', '-vcodec', '-acodec'}
+# 改变画面尺寸的滤镜：主画面经过它们之后分辨率未知
+_GEOMETRY_FILTERS = {'scale', 'crop', 'pad', 'rotate', 'transpose', 'zoompan', 'hstack', 'vstack', 'xfade'}
+# 流式管道的中间格式：NUT 容器 + ffvhuff 无损帧内视频 + PCM 音频，编解码开销低且可以顺序读写
+PIPE_OUTPUT_ARGS = ['-c:v', 'ffvhuff', '-c:a', 'pcm_s16le', '-f', 'nut']
+# 管道中间阶段丢弃的输出编码选项（由 PIPE_OUTPUT_ARGS 代替，只有最后一个阶段按原设置编码）
+_PIPE_DROPPED_OPTIONS = _CODEC_OPTIONS | {'-b:v', '-b:a', '-crf', '-preset', '-tune', '-profile:v', '-level',
+                                          '-movflags', '-f', '-maxrate', '-bufsize', '-x264-params'}
+_LABEL_PATTERN = re.compile(r"\[([^\]]+)\]")
+_STREAM_REF_PATTERN = re.compile(r"^(\d+)(?::([va]))?$")
+
+
+class ProjectNode:
+    """工程图中的一个节点：某个编辑器实例的一次方法调用（不含主输入 / 输出路径）"""
+
+    def __init__(self, editor: Any, method_name: str, params: Dict[str, Any], input_param: str, output_param: str):
+        self.editor = editor
+        self.method_name = method_name
+        self.params = params
+        self.input_param = input_param
+        self.output_param = output_param
+
+    @property
+    def name(self) -> str:
+        return f"{type(self.editor).__name__}.{self.method_name}"
+
+    def call(self, input_path: str, output_path: str) -> bool:
+        """以真实的输入 / 输出路径执行该节点"""
+        kwargs = dict(self.params)
+        kwargs[self.input_param] = input_path
+        kwargs[self.output_param] = output_path
+        return getattr(self.editor, self.method_name)(**kwargs)
+
+    def capture(self) -> Optional[List[str]]:
+        """
+        捕获该节点生成的 ffmpeg 参数（不含 ffmpeg 本身）。
+        需要读取输入信息（如时长）、生成多条命令或依赖临时文件的方法返回 None，只能单独渲染。
+        """
+        with capture_commands() as commands:
+            ok = self.call(_INPUT_PLACEHOLDER, _OUTPUT_PLACEHOLDER)
+            uses_temp_files = bool(commands.cleanups)
+        if not ok or len(commands) != 1 or uses_temp_files:
+            return None
+        return commands[0][1:]
+
+    def __repr__(self) -> str:
+        return f"<ProjectNode {self.name} {self.params}>"
+
+
+class RenderStep:
+    """编译结果中的一步：一条 ffmpeg 命令、一条 ffmpeg 管道，或单独执行的节点"""
+
+    def __init__(self, input_path: str, output_path: str, args: Optional[List[str]] = None,
+                 node: Optional[ProjectNode] = None, nodes: Optional[List[ProjectNode]] = None,
+                 pipeline: Optional[List[List[str]]] = None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.args = args  # 融合后的 ffmpeg 参数
+        self.node = node  # 无法融合、需要单独执行的节点
+        self.pipeline = pipeline  # 流式管道中每个阶段的 ffmpeg 参数
+        self.nodes = nodes or ([node] if node else [])  # 本步覆盖的所有节点
+
+    def __repr__(self) -> str:
+        kind = "ffmpeg" if self.args is not None else "pipe" if self.pipeline is not None else "call"
+        return f"<RenderStep {kind} {[n.name for n in self.nodes]} -> {self.output_path}>"
+
+
+class _NodeRecorder:
+    """编辑器代理：调用其方法时只记录节点，不执行"""
+
+    def __init__(self, project: "Project", editor: Any):
+        self._project = project
+        self._editor = editor
+
+    def __getattr__(self, name: str):
+        method = getattr(type(self._editor), name, None)
+        if name.startswith('_') or not inspect.isfunction(method):
+            raise AttributeError(f"{type(self._editor).__name__} 没有可记录的方法：{name}")
+
+        def record(*args, **kwargs) -> "Project":
+            return self._project.add(self._editor, name, *args, **kwargs)
+
+        return record
+
+
+class Project:
+    """
+    惰性工程对象：把剪辑、调色、合成、音频、导出等操作记录为节点，render() 时统一编译。
+    编译器会把能融合的节点合并为尽量少的 ffmpeg 调用（通常只有一次）；
+    reorder_expensive_filters=True 时还会把降噪 / 锐化 / 模糊等高开销滤镜移动到导出缩小分辨率之后执行
+    （结果近似而非完全相同，适合草稿 / 预览，默认关闭）。
+    示例：
+        project = Project("inputs/cat_01.mp4")
+        project.trimmer.trim_by_segments([("5", "10"), ("15", "20")])
+        project.color.apply_denoise()
+        project.compositor.add_title("标题")
+        project.exporter.export_for_douyin()
+        project.render("outputs/final.mp4")
+    render(..., streaming=True) 时改为流式管道：每个节点一个 ffmpeg，通过管道同时运行，中间结果不落盘。
+    传入 proxies 时使用代理工作流：创建工程即在后台生成代理，未包含导出节点的试渲染在代理上执行，
+    包含 ExportDistributor 导出节点的渲染自动换回原始素材，使用同一份节点列表渲染成片。
+    """
+
+    def __init__(self, input_path: str, ffmpeg_cmd: str = "ffmpeg", engine: Optional[FFmpegEngine] = None,
+                 source_resolution: Optional[Tuple[int, int]] = None, proxies: Optional[ProxyManager] = None,
+                 reorder_expensive_filters: bool = False):
+        """
+        :param input_path: 工程的源视频路径
+        :param ffmpeg_cmd: ffmpeg 命令名称
+        :param engine: 共享的 ffmpeg 执行引擎，默认使用全局引擎
+        :param source_resolution: 源视频分辨率 (宽, 高)，默认在编译时通过 ffprobe 获取
+        :param proxies: 代理管理器，传入后启用代理工作流（立即在后台生成该素材的代理）
+        :param reorder_expensive_filters: 把高开销滤镜移到缩小分辨率之后（更快，但输出只是近似，见 optimize_video_filters）
+        """
+        self.input_path = input_path
+        self.reorder_expensive_filters = reorder_expensive_filters
+        self.source_resolution = source_resolution
+        self.proxies = proxies
+        if proxies is not None:
+            proxies.prepare(input_path)
+        self.ffmpeg = ffmpeg_cmd
+        self.engine = engine if engine is not None else get_default_engine()
+        self.nodes: List[ProjectNode] = []
+
+        # 各编辑器的记录代理，如 project.color.adjust_brightness(0.1)
+        self.editor = _NodeRecorder(self, VideoEditor(ffmpeg_cmd, self.engine))
+        self.trimmer = _NodeRecorder(self, VideoTrimmer(ffmpeg_cmd, self.engine))
+        self.audio = _NodeRecorder(self, AudioEditor(ffmpeg_cmd, self.engine))
+        self.color = _NodeRecorder(self, ColorCorrection(ffmpeg_cmd, self.engine))
+        self.compositor = _NodeRecorder(self, VideoCompositor(ffmpeg_cmd, self.engine))
+        self.exporter = _NodeRecorder(self, ExportDistributor(ffmpeg_cmd, self.engine))
+
+    # ----------------------------------------------------------------------
+    # 【1】记录节点
+    # ----------------------------------------------------------------------
+    def add(self, editor: Any, method_name: str, *args, **kwargs) -> "Project":
+        """
+        记录一次方法调用。参数与原方法一致，但省略主输入路径和输出路径。
+        :param editor: 编辑器实例，如 ColorCorrection()
+        :param method_name: 方法名，如 "apply_denoise"
+        :return: 工程本身，便于链式调用
+        """
+        parameters = list(inspect.signature(getattr(type(editor), method_name)).parameters.values())[1:]
+        output_param = next((p.name for p in parameters if p.name.startswith('output')), None)
+        input_param = next((p.name for p in parameters if p.name.endswith('_path')), None)
+        if output_param is None or input_param is None or input_param == output_param:
+            raise ValueError(f"{type(editor).__name__}.{method_name} 不是单输入、单输出的编辑操作")
+
+        signature = inspect.Signature([p for p in parameters if p.name not in (input_param, output_param)])
+        params = dict(signature.bind(*args, **kwargs).arguments)
+        self.nodes.append(ProjectNode(editor, method_name, params, input_param, output_param))
+        return self
+
+    # ----------------------------------------------------------------------
+    # 【2】编译：节点 → 尽量少的 ffmpeg 调用
+    # ----------------------------------------------------------------------
+    def compile(self, output_path: str, work_dir: Optional[str] = None, use_proxy: bool = False) -> List[RenderStep]:
+        """
+        把节点图编译为渲染步骤（不执行）
+        :param output_path: 最终输出路径
+        :param work_dir: 中间文件目录（只有存在无法融合的节点时才会用到）
+        :param use_proxy: 以代理文件作为输入（需要传入 proxies，会等待代理生成完成）
+        :return: RenderStep 列表
+        """
+        work_dir = work_dir or os.path.dirname(output_path) or "."
+        extension = os.path.splitext(output_path)[1] or ".mp4"
+        steps: List[RenderStep] = []
+        current_input, resolution = self._render_source(use_proxy)
+        stage = _FusedStage(current_input, resolution, self.reorder_expensive_filters)
+
+        def intermediate() -> str:
+            return os.path.join(work_dir, f"stage_{len(steps):03d}{extension}")
+
+        for index, node in enumerate(self.nodes):
+            args = node.capture()
+            if args is not None and stage.add(node, args):
+                continue
+
+            # 无法融合：先把已累积的节点渲染为中间文件，再单独执行该节点
+            if stage.nodes:
+                stage_output = intermediate()
+                steps.append(RenderStep(current_input, stage_output, args=stage.build(stage_output), nodes=stage.nodes))
+                current_input = stage_output
+            is_last = index == len(self.nodes) - 1
+            node_output = output_path if is_last else intermediate()
+            steps.append(RenderStep(current_input, node_output, node=node))
+            current_input = node_output
+            stage = _FusedStage(current_input, None, self.reorder_expensive_filters)
+
+        if stage.nodes or not steps:
+            steps.append(RenderStep(current_input, output_path, args=stage.build(output_path), nodes=stage.nodes))
+        return steps
+
+    def compile_piped(self, output_path: str, work_dir: Optional[str] = None,
+                      use_proxy: bool = False) -> List[RenderStep]:
+        """
+        把节点图编译为流式管道（不执行）：每个节点一个 ffmpeg 阶段，
+        中间阶段以 NUT（ffvhuff + PCM）写到标准输出、直接接入下一阶段的标准输入，只有最后一个阶段写磁盘。
+        无法捕获命令的节点仍然单独执行，其前后的管道通过中间文件衔接。
+        :param output_path: 最终输出路径
+        :param work_dir: 中间文件目录（只有存在无法捕获的节点时才会用到）
+        :param use_proxy: 以代理文件作为输入（需要传入 proxies，会等待代理生成完成）
+        :return: RenderStep 列表
+        """
+        if not self.nodes:
+            return self.compile(output_path, work_dir, use_proxy)
+        work_dir = work_dir or os.path.dirname(output_path) or "."
+        extension = os.path.splitext(output_path)[1] or ".mp4"
+        steps: List[RenderStep] = []
+        chain: List[Tuple[ProjectNode, List[str]]] = []
+        current_input = self._render_source(use_proxy)[0]
+
+        def flush(chain_output: str) -> None:
+            stages = []
+            for position, (_, args) in enumerate(chain):
+                is_last = position == len(chain) - 1
+                stages.append(_pipe_stage_args(args, current_input if position == 0 else 'pipe:0',
+                                               chain_output if is_last else None))
+            steps.append(RenderStep(current_input, chain_output, pipeline=stages, nodes=[n for n, _ in chain]))
+
+        for index, node in enumerate(self.nodes):
+            args = node.capture()
+            if args is not None and _pipe_stage_args(args, 'pipe:0', None) is not None:
+                chain.append((node, args))
+                continue
+
+            if chain:
+                stage_output = os.path.join(work_dir, f"stage_{len(steps):03d}{extension}")
+                flush(stage_output)
+                current_input, chain = stage_output, []
+            is_last = index == len(self.nodes) - 1
+            node_output = output_path if is_last else os.path.join(work_dir, f"stage_{len(steps):03d}{extension}")
+            steps.append(RenderStep(current_input, node_output, node=node))
+            current_input = node_output
+
+        if chain:
+            flush(output_path)
+        return steps
+
+    # ----------------------------------------------------------------------
+    # 【3】渲染
+    # ----------------------------------------------------------------------
+    def render(self, output_path: str, streaming: bool = False, use_proxy: Optional[bool] = None) -> bool:
+        """
+        编译并执行整个工程
+        :param output_path: 最终输出路径
+        :param streaming: True 时使用流式管道（compile_piped）：各节点分别由一个 ffmpeg 执行、同时运行，
+                          中间结果通过管道传递不落盘；默认把节点融合为尽量少的 ffmpeg 调用（compile）
+        :param use_proxy: 是否在代理上渲染。默认（None）：传入了 proxies 且工程中没有导出节点时使用代理，
+                          有导出节点时视为成片渲染，换回原始素材
+        :return: 是否成功
+        """
+        if use_proxy is None:
+            use_proxy = self.proxies is not None and not self.has_export()
+        if use_proxy and self.proxies is not None and self.proxies.get(self.input_path) is None:
+            print(f"[❌ 代理生成失败，无法试渲染：{self.input_path}]")
+            return False
+        safe_output = get_output_filepath(os.path.dirname(output_path), os.path.basename(output_path))
+        work_dir = tempfile.mkdtemp(prefix="project_", dir=os.path.dirname(safe_output) or None)
+        try:
+            if streaming:
+                steps = self.compile_piped(safe_output, work_dir, use_proxy)
+            else:
+                steps = self.compile(safe_output, work_dir, use_proxy)
+            for step in steps:
+                if step.args is not None:
+                    ok = self.engine.run([self.ffmpeg] + step.args, label="工程渲染失败")
+                elif step.pipeline is not None:
+                    ok = self.engine.run_pipeline([[self.ffmpeg] + args for args in step.pipeline],
+                                                  label="工程渲染失败")
+                else:
+                    ok = step.node.call(step.input_path, step.output_path)
+                if not ok:
+                    print(f"[❌ 工程渲染中断于：{[n.name for n in step.nodes]}]")
+                    return False
+            return True
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def has_export(self) -> bool:
+        """工程中是否包含导出节点（ExportDistributor 的方法）"""
+        return any(isinstance(node.editor, ExportDistributor) for node in self.nodes)
+
+    def _render_source(self, use_proxy: bool) -> Tuple[str, Optional[Tuple[int, int]]]:
+        """本次渲染的输入文件及其分辨率：原始素材，或（use_proxy 时）代理文件"""
+        if not use_proxy:
+            return self.input_path, self.source_resolution or get_video_resolution(self.input_path)
+        if self.proxies is None:
+            raise ValueError("未设置代理管理器（proxies），无法在代理上渲染")
+        proxy = self.proxies.get(self.input_path)
+        if proxy is None:
+            raise RuntimeError(f"代理生成失败：{self.input_path}")
+        if self.source_resolution:
+            return proxy, self.proxies.proxy_resolution(self.source_resolution)
+        return proxy, get_video_resolution(proxy)
+
+
+def _pipe_stage_args(args: List[str], input_path: str, output_path: Optional[str]) -> Optional[List[str]]:
+    """
+    把节点捕获的参数改写为管道中的一个阶段
+    :param args: 节点捕获的参数（主输入、输出为占位路径）
+    :param input_path: 主输入，"pipe:0" 表示从标准输入读取上一阶段的 NUT 流
+    :param output_path: 输出路径，None 表示以 NUT 写到标准输出（并丢弃原有的输出编码选项）
+    :return: 改写后的参数；参数结构不符合预期（如主输入不是 -i 的值）时返回 None
+    """
+    if not args or args[-1] != _OUTPUT_PLACEHOLDER:
+        return None
+    body = args[:-1]
+    input_positions = [i for i, arg in enumerate(body) if arg == '-i']
+    if not input_positions or _INPUT_PLACEHOLDER not in (body[i + 1] for i in input_positions if i + 1 < len(body)):
+        return None
+    after_inputs = input_positions[-1] + 2
+
+    result: List[str] = []
+    index = 0
+    while index < len(body):
+        key = body[index]
+        if not key.startswith('-'):
+            return None
+        value = None if key in _FLAG_OPTIONS or index + 1 >= len(body) else body[index + 1]
+        step = 1 if value is None else 2
+        if key == '-i' and value == _INPUT_PLACEHOLDER:
+            result.extend(['-f', 'nut', '-i', 'pipe:0'] if input_path == 'pipe:0' else ['-i', input_path])
+        elif not (output_path is None and index >= after_inputs and key in _PIPE_DROPPED_OPTIONS):
+            result.extend(body[index:index + step])
+        index += step
+
+    result.extend(PIPE_OUTPUT_ARGS + ['pipe:1'] if output_path is None else [output_path])
+    return result
+
+
+class _FusedStage:
+    """
+    融合阶段：把多个节点的滤镜合并为一个 filter_complex。
+    视频 / 音频各自维护当前输出标签，连续的 -vf / -af 先缓存为线性滤镜链，
+    遇到 filter_complex 节点或构建命令时再交给优化器处理并写入滤镜图。
+    """
+
+    def __init__(self, input_path: str, resolution: Optional[Tuple[int, int]], reorder_expensive: bool = False):
+        self.inputs = [input_path]
+        self.reorder_expensive = reorder_expensive
+        self.nodes: List[ProjectNode] = []
+        self.chains: List[str] = []
+        self.video = '0:v'  # 当前视频流：输入流说明符或滤镜图标签
+        self.audio = '0:a'
+        self.pending_video: List[str] = []
+        self.pending_audio: List[str] = []
+        self.output_options: Dict[str, Optional[str]] = {}
+        self.resolution = resolution
+        self._label_count = 0
+
+    # ---------------------------- 添加节点 ----------------------------
+    def add(self, node: ProjectNode, args: List[str]) -> bool:
+        """尝试把节点并入本阶段，无法融合时返回 False（本阶段状态不变）"""
+        parsed = _parse_args(args)
+        if parsed is None:
+            return False
+        inputs, video_filters, audio_filters, graph, maps, options = parsed
+        if not inputs or inputs[0] != _INPUT_PLACEHOLDER or _INPUT_PLACEHOLDER in inputs[1:]:
+            return False
+        if graph is None and (maps or len(inputs) > 1):
+            return False
+
+        snapshot = self._snapshot()
+        if graph is not None:
+            self._flush()
+            if not self._add_graph(graph, maps, inputs[1:], len(self.nodes)):
+                self._restore(snapshot)
+                return False
+
+        self.pending_video.extend(video_filters)
+        self.pending_audio.extend(audio_filters)
+        # 输出端的 -ss / -to / -t 转换为 trim 滤镜（融合后无法再作为输出选项）
+        trim = {key: options.pop(key) for key in ('-ss', '-to', '-t') if key in options}
+        if trim:
+            bounds = []
+            if '-ss' in trim:
+                bounds.append(f"start={trim['-ss']}")
+            if '-to' in trim:
+                bounds.append(f"end={trim['-to']}")
+            if '-t' in trim:
+                bounds.append(f"duration={trim['-t']}")
+            # 时间值可能是 HH:MM:SS，需加引号避免与参数分隔符冲突
+            bounds = [f"{key}='{value}'" for key, value in (bound.split('=', 1) for bound in bounds)]
+            self.pending_video.extend([f"trim={':'.join(bounds)}", "setpts=PTS-STARTPTS"])
+            self.pending_audio.extend([f"atrim={':'.join(bounds)}", "asetpts=PTS-STARTPTS"])
+        for key, value in options.items():
+            if key == '-y' or (key in _CODEC_OPTIONS and value == 'copy'):
+                continue
+            self.output_options.pop(key, None)  # 后面的节点覆盖前面的同名选项
+            self.output_options[key] = value
+        self.nodes.append(node)
+        return True
+
+    # ---------------------------- 构建命令 ----------------------------
+    def build(self, output_path: str) -> List[str]:
+        """生成本阶段的 ffmpeg 参数"""
+        self._flush()
+        args: List[str] = []
+        for path in self.inputs:
+            args.extend(['-i', path])
+        if self.chains:
+            args.extend(['-filter_complex', ';'.join(self.chains)])
+        args.extend(['-map', self._map_target(self.video, 'v'), '-map', self._map_target(self.audio, 'a')])
+        for key, value in self.output_options.items():
+            args.append(key)
+            if value is not None:
+                args.append(value)
+        args.append(output_path)
+        return args
+
+    @staticmethod
+    def _map_target(current: str, kind: str) -> str:
+        if _STREAM_REF_PATTERN.match(current):
+            return f"{current}?"  # 未经滤镜处理：直接映射输入流（不存在时忽略）
+        return f"[{current}]"
+
+    # ---------------------------- 内部实现 ----------------------------
+    def _new_label(self, kind: str) -> str:
+        self._label_count += 1
+        return f"{kind}{self._label_count}"
+
+    def _flush(self) -> None:
+        """把缓存的线性滤镜链（经优化后）写入滤镜图"""
+        if self.pending_video:
+            filters, self.resolution = optimize_video_filters(self.pending_video, self.resolution,
+                                                              self.reorder_expensive)
+            label = self._new_label('v')
+            self.chains.append(f"[{self.video}]{','.join(filters)}[{label}]")
+            self.video = label
+            self.pending_video = []
+        if self.pending_audio:
+            label = self._new_label('a')
+            self.chains.append(f"[{self.audio}]{','.join(self.pending_audio)}[{label}]")
+            self.audio = label
+            self.pending_audio = []
+
+    def _snapshot(self) -> tuple:
+        return (list(self.inputs), list(self.chains), self.video, self.audio, list(self.pending_video),
+                list(self.pending_audio), dict(self.output_options), self.resolution, self._label_count)
+
+    def _restore(self, snapshot: tuple) -> None:
+        (self.inputs, self.chains, self.video, self.audio, self.pending_video, self.pending_audio,
+         self.output_options, self.resolution, self._label_count) = snapshot
+
+    def _add_graph(self, graph: str, maps: List[str], extra_inputs: List[str], node_index: int) -> bool:
+        """把节点自己的 filter_complex 重写标签后并入滤镜图"""
+        input_offset = len(self.inputs)
+        prefix = f"n{node_index}_"
+        chains = split_top_level(graph, ';')
+        parsed_chains = []
+        for chain in chains:
+            match = re.match(r"^((?:\[[^\]]+\])*)(.*?)((?:\[[^\]]+\])*)$", chain.strip(), re.S)
+            ins, body, outs = (_LABEL_PATTERN.findall(match.group(i)) for i in (1, 2, 3))
+            body = match.group(2)
+            if not ins:
+                return False  # 未标注输入的滤镜链会绑定到“第一个未使用的输入流”，融合后语义会改变
+            parsed_chains.append([ins, body, outs])
+
+        # 映射关系：主输入 → 当前流；附加输入 → 新的输入序号；内部标签 → 加前缀避免冲突
+        def rename(label: str) -> str:
+            ref = _STREAM_REF_PATTERN.match(label)
+            if ref is None:
+                return prefix + label
+            index, kind = int(ref.group(1)), ref.group(2)
+            if index == 0:
+                return self.audio if kind == 'a' else self.video
+            if index > len(extra_inputs):
+                raise ValueError(label)
+            new_index = input_offset + index - 1
+            return f"{new_index}:{kind}" if kind else f"{new_index}"
+
+        try:
+            for chain in parsed_chains:
+                chain[0] = [rename(label) for label in chain[0]]
+                chain[2] = [prefix + label for label in chain[2]]
+            mapped = []
+            for target in maps:
+                if target.startswith('[') and not _STREAM_REF_PATTERN.match(target[1:-1]):
+                    mapped.append(prefix + target[1:-1])
+                elif target.rstrip('?') in ('0:v', '0:a'):
+                    mapped.append(None)  # 主输入流原样保留
+                else:
+                    return False
+        except ValueError:
+            return False
+
+        # 滤镜图标签只能被消费一次：当前流被多次引用时先用 split / asplit 分流
+        for current, split_filter in ((self.video, 'split'), (self.audio, 'asplit')):
+            if _STREAM_REF_PATTERN.match(current):
+                continue
+            uses = [(c, i) for c in parsed_chains for i, label in enumerate(c[0]) if label == current]
+            if len(uses) > 1:
+                branches = [f"{prefix}{current}_{i}" for i in range(len(uses))]
+                self.chains.append(f"[{current}]{split_filter}={len(uses)}" + "".join(f"[{b}]" for b in branches))
+                for (chain, position), branch in zip(uses, branches):
+                    chain[0][position] = branch
+
+        # 推断各输出标签是音频还是视频，并检查主画面是否经过了改变尺寸的滤镜
+        audio_labels = {self.audio}
+        main_labels = {self.video} | {label for c in parsed_chains for label in c[0] if label.startswith(f"{prefix}{self.video}_")}
+        geometry_changed = False
+        for ins, body, outs in parsed_chains:
+            is_audio = any(label in audio_labels or label.endswith(':a') for label in ins)
+            if is_audio:
+                audio_labels.update(outs)
+            if any(label in main_labels for label in ins):
+                main_labels.update(outs)
+                names = {_filter_name(part.split('@')[0]) for part in split_top_level(body, ',')}
+                geometry_changed = geometry_changed or bool(names & _GEOMETRY_FILTERS)
+
+        # 未映射任何标签时，最后一条滤镜链的未命名输出即为结果
+        if not maps:
+            last = parsed_chains[-1]
+            if last[2]:
+                return False
+            last[2] = [prefix + "out"]
+            is_audio = any(label in audio_labels or label.endswith(':a') for label in last[0])
+            mapped = [prefix + "out"]
+            if is_audio:
+                audio_labels.add(prefix + "out")
+
+        for ins, body, outs in parsed_chains:
+            self.chains.append("".join(f"[{label}]" for label in ins) + body + "".join(f"[{label}]" for label in outs))
+        for label in mapped:
+            if label is None:
+                continue
+            if label in audio_labels:
+                self.audio = label
+            else:
+                self.video = label
+                if geometry_changed:
+                    self.resolution = None
+        self.inputs.extend(extra_inputs)
+        return True
+
+
+# ======================================================================
+# 基于开销的滤镜优化器
+# ======================================================================
+def optimize_video_filters(filters: List[str], resolution: Optional[Tuple[int, int]],
+                           reorder_expensive: bool = False) -> Tuple[List[str], Optional[Tuple[int, int]]]:
+    """
+    优化一条线性视频滤镜链：
+    1. 合并相邻的 eq 滤镜（结果不变）
+    2. reorder_expensive=True 时：若链中存在缩小分辨率的 scale，且昂贵滤镜与 scale 之间只有 POINTWISE_FILTERS，
+       则把昂贵滤镜移动到 scale 之后，按像素数 × 滤镜单价估算开销，只有更便宜时才移动。
+       降噪 / 锐化 / 模糊在缩小后的画面上执行，效果只是近似（等效半径变大），不适合要求逐像素一致的成片
+    :param filters: 滤镜列表，如 ["hqdn3d=1.5:1.5:3:3", "eq=contrast=1.2", "scale=1080:1920"]
+    :param resolution: 滤镜链输入分辨率，未知时为 None（不做重排）
+    :param reorder_expensive: 是否移动昂贵滤镜（默认关闭）
+    :return: (优化后的滤镜列表, 输出分辨率)
+    """
+    filters = merge_adjacent_eq(list(filters))
+
+    # 计算每个滤镜的输入分辨率
+    sizes: List[Optional[Tuple[int, int]]] = []
+    current = resolution
+    for filter_str in filters:
+        sizes.append(current)
+        if _filter_name(filter_str) == 'scale':
+            current = _parse_scale(filter_str)
+    output_resolution = current
+    if resolution is None or not reorder_expensive:
+        return filters, output_resolution
+
+    index = len(filters) - 1
+    while index >= 0:
+        filter_str = filters[index]
+        cost = EXPENSIVE_FILTER_COST.get(_filter_name(filter_str))
+        if cost is not None and sizes[index] is not None:
+            target = _find_downscale(filters, sizes, index)
+            if target is not None:
+                before = sizes[index][0] * sizes[index][1] * cost
+                new_size = _parse_scale(filters[target])
+                after = new_size[0] * new_size[1] * cost
+                if after < before:
+                    # 弹出后 scale 前移一位，插入到 target 即位于 scale 之后
+                    filters.insert(target, filters.pop(index))
+                    sizes.pop(index)
+                    sizes.insert(target, new_size)
+        index -= 1
+    return filters, output_resolution
+
+
+def _find_downscale(filters: List[str], sizes: List[Optional[Tuple[int, int]]], index: int) -> Optional[int]:
+    """从 index 之后查找第一个缩小像素数的 scale，中间只能是逐像素滤镜"""
+    for position in range(index + 1, len(filters)):
+        name = _filter_name(filters[position])
+        if name == 'scale':
+            new_size = _parse_scale(filters[position])
+            old_size = sizes[position]
+            if new_size and old_size and new_size[0] * new_size[1] < old_size[0] * old_size[1]:
+                return position
+            return None
+        if name not in POINTWISE_FILTERS:
+            return None
+    return None
+
+
+def _filter_name(filter_str: str) -> str:
+    return filter_str.split('=', 1)[0].strip()
+
+
+def _parse_scale(filter_str: str) -> Optional[Tuple[int, int]]:
+    """解析 scale=W:H（仅支持明确的整数宽高）"""
+    value = filter_str.split('=', 1)[1] if '=' in filter_str else ''
+    match = re.match(r"^(?:w=)?(\d+):(?:h=)?(\d+)$", value)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _parse_args(args: List[str]):
+    """
+    解析单条 ffmpeg 参数列表
+    :return: (输入列表, 视频滤镜列表, 音频滤镜列表, filter_complex, -map 列表, 输出选项字典)，
+             含有输入选项等无法融合的结构时返回 None
+    """
+    inputs: List[str] = []
+    video_filters: List[str] = []
+    audio_filters: List[str] = []
+    graph: Optional[str] = None
+    maps: List[str] = []
+    options: Dict[str, Optional[str]] = {}
+    if not args or args[-1] != _OUTPUT_PLACEHOLDER:
+        return None
+
+    index, body = 0, args[:-1]
+    while index < len(body):
+        key = body[index]
+        if not key.startswith('-'):
+            return None
+        if key in _FLAG_OPTIONS:
+            value, index = None, index + 1
+        else:
+            if index + 1 >= len(body):
+                return None
+            value, index = body[index + 1], index + 2
+
+        if key == '-i':
+            if options:
+                return None  # 输入选项（如 -ss / -f concat）作用于输入，不能融合
+            inputs.append(value)
+        elif key in ('-vf', '-filter:v'):
+            video_filters.extend(split_top_level(value, ','))
+        elif key in ('-af', '-filter:a'):
+            audio_filters.extend(split_top_level(value, ','))
+        elif key == '-filter_complex':
+            graph = value
+        elif key == '-map':
+            maps.append(value)
+        else:
+            options[key] = value
+    return inputs, video_filters, audio_filters, graph, maps, options
@@ -0,0 +1,174 @@
+# proxy_manager.py
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ffmpeg_engine import FFmpegEngine, get_default_engine
+from render_tier import fit_scale_filter, render_tier
+
+# 代理文件默认目录（可通过环境变量 AUTOVIDEOCLIP_PROXY_DIR 指定）
+DEFAULT_PROXY_DIR = os.environ.get("AUTOVIDEOCLIP_PROXY_DIR") or \
+    os.path.join(tempfile.gettempdir(), "autovideoclip_proxies")
+# 代理默认长边像素数：4K 素材缩小到 960x540，解码开销约为原来的 1/16
+DEFAULT_PROXY_SIZE = 960
+
+
+class ProxyManager:
+    """
+    代理素材管理：为每个源视频在后台生成低分辨率、全帧内编码（每帧都是关键帧）的代理文件并缓存。
+    代理保持源视频的帧率与时间戳，剪辑点、时长等参数在代理和原始素材上含义相同，
+    因此同一份操作列表可以先在代理上反复试渲染，导出时再换回原始素材渲染成片（见 Project.render）。
+    代理文件名由源文件路径、大小、修改时间和代理尺寸决定，源文件变化后会重新生成。
+    示例：
+        proxies = ProxyManager()
+        proxies.prepare("inputs/4k_01.mp4")          # 后台生成，立即返回
+        proxy_path = proxies.get("inputs/4k_01.mp4")  # 等待生成完成，返回代理路径
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size: int = DEFAULT_PROXY_SIZE,
+                 ffmpeg_cmd: str = "ffmpeg", engine: Optional[FFmpegEngine] = None):
+        """
+        :param cache_dir: 代理文件目录，默认 DEFAULT_PROXY_DIR
+        :param max_size: 代理长边像素上限（不放大）
+        :param ffmpeg_cmd: ffmpeg 命令名称
+        :param engine: 共享的 ffmpeg 执行引擎，默认使用全局引擎（代理生成同样受并发进程数限制）
+        """
+        self.cache_dir = os.path.abspath(cache_dir or DEFAULT_PROXY_DIR)
+        self.max_size = int(max_size)
+        self.ffmpeg = ffmpeg_cmd
+        self.engine = engine if engine is not None else get_default_engine()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # ----------------------------------------------------------------------
+    # 【1】代理路径
+    # ----------------------------------------------------------------------
+    def proxy_path(self, source_path: str) -> str:
+        """
+        源视频对应的代理文件路径（不保证已生成）
+        :param source_path: 源视频路径
+        :return: 代理文件路径
+        """
+        source = os.path.abspath(source_path)
+        try:
+            st = os.stat(source)
+            identity = f"{source}:{st.st_size}:{st.st_mtime_ns}:{self.max_size}"
+        except OSError:
+            identity = f"{source}:missing:{self.max_size}"
+        digest = hashlib.blake2b(identity.encode('utf-8'), digest_size=12).hexdigest()
+        name = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(self.cache_dir, f"{name}.{digest}.proxy.mp4")
+
+    def proxy_resolution(self, resolution: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        根据源视频分辨率计算代理分辨率（与 fit_scale_filter 的缩放规则一致），无需探测代理文件
+        :param resolution: 源视频分辨率 (宽, 高)
+        :return: 代理分辨率 (宽, 高)
+        """
+        width, height = resolution
+        if width >= height:
+            new_width = min(self.max_size, width)
+            return new_width, max(2, round(height * new_width / width / 2) * 2)
+        new_height = min(self.max_size, height)
+        return max(2, round(width * new_height / height / 2) * 2), new_height
+
+    def has_proxy(self, source_path: str) -> bool:
+        """代理文件是否已生成"""
+        return os.path.isfile(self.proxy_path(source_path))
+
+    # ----------------------------------------------------------------------
+    # 【2】生成代理
+    # ----------------------------------------------------------------------
+    def proxy_args(self, source_path: str, output_path: str) -> List[str]:
+        """
+        生成代理的 ffmpeg 参数：等比缩小 + libx264 全帧内编码（-g 1）+ fastdecode，
+        任意位置都能直接解码，试渲染时的裁剪、跳转开销最低
+        """
+        return [
+            '-y',
+            '-i', source_path,
+            '-vf', fit_scale_filter(self.max_size),
+            '-c:v', 'libx264',
+            '-preset', 'ultrafast',
+            '-tune', 'fastdecode',
+            '-g', '1',
+            '-crf', '23',
+            '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac',
+            '-b:a', '128k',
+            '-movflags', '+faststart',
+            output_path
+        ]
+
+    def generate(self, source_path: str) -> bool:
+        """
+        同步生成代理（已存在时直接返回）。先写入临时文件，成功后再原子替换，
+        中途失败或被中断不会留下不完整的代理。
+        :param source_path: 源视频路径
+        :return: 是否成功
+        """
+        proxy = self.proxy_path(source_path)
+        if os.path.isfile(proxy):
+            return True
+        partial = f"{proxy}.{threading.get_ident()}.partial.mp4"
+        try:
+            # 代理本身始终按 final 档位编码，不受调用方 render_tier() 的影响
+            with render_tier("final"):
+                ok = self.engine.run([self.ffmpeg] + self.proxy_args(source_path, partial), label="代理生成失败")
+            if ok and os.path.isfile(partial):
+                os.replace(partial, proxy)
+                return True
+            return False
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    def prepare(self, source_path: str) -> Future:
+        """
+        在后台生成代理（引擎线程池），同一个源文件只会提交一次
+        :param source_path: 源视频路径
+        :return: Future，result() 为 True / False
+        """
+        proxy = self.proxy_path(source_path)
+        with self._lock:
+            future = self._pending.get(proxy)
+            if future is None or (future.done() and not future.result()):
+                future = self.engine.submit(self.generate, source_path)
+                self._pending[proxy] = future
+            return future
+
+    def prepare_all(self, source_paths: Iterable[str]) -> List[Future]:
+        """为多个源视频在后台生成代理"""
+        return [self.prepare(path) for path in source_paths]
+
+    # ----------------------------------------------------------------------
+    # 【3】获取代理
+    # ----------------------------------------------------------------------
+    def get(self, source_path: str, wait: bool = True) -> Optional[str]:
+        """
+        获取源视频的代理路径
+        :param source_path: 源视频路径
+        :param wait: True 时等待（必要时启动）代理生成；False 时代理未就绪直接返回 None
+        :return: 代理路径，生成失败或未就绪时返回 None
+        """
+        proxy = self.proxy_path(source_path)
+        if os.path.isfile(proxy):
+            return proxy
+        if not wait:
+            return None
+        return proxy if self.prepare(source_path).result() else None
+
+    def clear(self) -> None:
+        """删除所有代理文件"""
+        with self._lock:
+            self._pending.clear()
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.proxy.mp4'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
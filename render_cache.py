@@ -0,0 +1,333 @@
+# render_cache.py
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，只使用硬链接 / 复制
+    fcntl = None
+
+# 部分内容哈希读取的字节数：文件头部与尾部各读取这么多
+_HASH_CHUNK = 1024 * 1024
+
+# 以这些扩展名结尾、又不是输入文件的参数，视为额外的输出文件（多输出命令不缓存）
+_MEDIA_EXTENSIONS = {
+    '.mp4', '.mov', '.mkv', '.avi', '.flv', '.webm', '.ts', '.m4v', '.mpg', '.mpeg',
+    '.mp3', '.aac', '.m4a', '.wav', '.flac', '.ogg', '.opus',
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.srt', '.ass', '.nut', '.m3u8',
+}
+
+# 值为滤镜表达式等长字符串的选项：其值不会被当作输出文件
+_EXPRESSION_OPTIONS = {'-vf', '-af', '-filter_complex', '-filter:v', '-filter:a', '-metadata'}
+
+# Linux 上的 FICLONE ioctl（btrfs / xfs 等文件系统支持的写时复制克隆）
+_FICLONE = 0x40049409
+
+
+class RenderCache:
+    """
+    内容寻址的渲染缓存。
+    缓存键 = 输入文件指纹（大小 + 修改时间 + 头尾部分内容哈希）+ 完整 ffmpeg 参数 + ffmpeg 版本，
+    命中时通过硬链接（失败时尝试 reflink，最后才复制）直接生成输出文件，不再启动 ffmpeg。
+    缓存目录有容量上限，超出时按最近使用时间（LRU）淘汰。
+
+    注意：命中后的输出文件与缓存对象共用同一个 inode，
+    引擎再次写入该路径前会先断开硬链接；其他工具请不要原地修改输出文件。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 20 * 1024 ** 3):
+        """
+        :param cache_dir: 缓存目录，建议与输出目录位于同一文件系统（硬链接不能跨文件系统）
+        :param max_bytes: 缓存容量上限（字节），默认 20GB
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max(0, int(max_bytes))
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self._fingerprints: Dict[Tuple[str, int, int, int], str] = {}
+        self._versions: Dict[str, str] = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # ----------------------------------------------------------------------
+    # 【1】计算缓存键
+    # ----------------------------------------------------------------------
+    def key_for(self, full_cmd: List[str]) -> Optional[str]:
+        """
+        计算一条 ffmpeg 命令的缓存键
+        :param full_cmd: 完整命令列表，最后一个参数为输出文件
+        :return: 缓存键（十六进制字符串），命令不可缓存时返回 None
+                 （如输出到管道 / 图片序列、存在多个输出、输入文件不存在）
+        """
+        if len(full_cmd) < 2:
+            return None
+        output = full_cmd[-1]
+        if output.startswith('-') or output.startswith('pipe:') or '%' in output or output == os.devnull:
+            return None
+
+        normalized = []
+        args = full_cmd[1:-1]
+        for index, arg in enumerate(args):
+            previous = args[index - 1] if index > 0 else None
+            if previous == '-i':
+                fingerprint = self._concat_fingerprint(arg) if _is_concat_input(args, index) else self.fingerprint(arg)
+                if fingerprint is None:
+                    return None
+                normalized.append(fingerprint)
+            elif previous == '-f' and arg == 'tee':
+                return None
+            elif previous not in _EXPRESSION_OPTIONS and os.path.splitext(arg)[1].lower() in _MEDIA_EXTENSIONS:
+                # 不是输入的媒体路径：可能是第二个输出，也可能是被引用的文件，内容无法保证一致
+                if not os.path.isfile(arg) or previous is None or not previous.startswith('-'):
+                    return None
+                normalized.append(self.fingerprint(arg))
+            else:
+                normalized.append(arg)
+
+        payload = json.dumps({
+            'version': self._ffmpeg_version(full_cmd[0]),
+            'args': normalized,
+            'format': os.path.splitext(output)[1].lower(),
+        }, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def fingerprint(self, path: str) -> Optional[str]:
+        """
+        计算文件的快速指纹：大小 + 修改时间 + 头尾各 1MB 内容的哈希
+        同一文件（路径、inode、大小、修改时间均未变化）只计算一次
+        :return: 指纹字符串，文件不存在时返回 None
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        memo_key = (os.path.abspath(path), st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._fingerprints.get(memo_key)
+        if cached is not None:
+            return cached
+
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read(_HASH_CHUNK))
+                if st.st_size > 2 * _HASH_CHUNK:
+                    f.seek(-_HASH_CHUNK, os.SEEK_END)
+                    digest.update(f.read(_HASH_CHUNK))
+                elif st.st_size > _HASH_CHUNK:
+                    digest.update(f.read())
+        except OSError:
+            return None
+        fingerprint = f"{st.st_size}:{st.st_mtime_ns}:{digest.hexdigest()}"
+        with self._lock:
+            self._fingerprints[memo_key] = fingerprint
+        return fingerprint
+
+    def _concat_fingerprint(self, list_file: str) -> Optional[str]:
+        """concat 列表文件的指纹：按顺序组合列表中每个文件的指纹（列表文件名每次随机，不参与计算）"""
+        parts = []
+        try:
+            with open(list_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line.startswith('file '):
+                        parts.append(line)
+                        continue
+                    # 与 concat 分离器一致：解码引号 / 转义，相对路径相对于列表文件所在目录（而不是当前目录）
+                    path = _unescape_concat_path(line[5:].strip())
+                    if not os.path.isabs(path):
+                        path = os.path.join(os.path.dirname(os.path.abspath(list_file)), path)
+                    fingerprint = self.fingerprint(path)
+                    if fingerprint is None:
+                        return None
+                    parts.append(fingerprint)
+        except OSError:
+            return None
+        return "concat:" + hashlib.sha256("\n".join(parts).encode('utf-8')).hexdigest()
+
+    def _ffmpeg_version(self, ffmpeg_cmd: str) -> str:
+        """获取 ffmpeg 版本号（第一行输出），每个可执行文件只查询一次"""
+        with self._lock:
+            version = self._versions.get(ffmpeg_cmd)
+        if version is not None:
+            return version
+        try:
+            result = subprocess.run([ffmpeg_cmd, '-version'], stdin=subprocess.DEVNULL,
+                                    capture_output=True, text=True, timeout=10)
+            version = result.stdout.split('\n')[0].strip() if result.returncode == 0 else "unknown"
+        except Exception:
+            version = "unknown"
+        with self._lock:
+            self._versions[ffmpeg_cmd] = version
+        return version
+
+    # ----------------------------------------------------------------------
+    # 【2】读取 / 写入缓存
+    # ----------------------------------------------------------------------
+    def fetch(self, key: str, output_path: str) -> bool:
+        """
+        缓存命中时把缓存对象生成到 output_path（硬链接 → reflink → 复制）
+        :return: True 表示命中并已生成输出文件
+        """
+        entry = self._entry_path(key, output_path)
+        if not os.path.isfile(entry):
+            with self._lock:
+                self.stats['misses'] += 1
+            return False
+        try:
+            self.prepare_output(output_path)
+            _materialize(entry, output_path)
+            # 只更新访问时间作为 LRU 依据；修改时间保持不变，下游命令的输入指纹才能继续命中
+            st = os.stat(entry)
+            os.utime(entry, ns=(time.time_ns(), st.st_mtime_ns))
+        except OSError as e:
+            print(f"[⚠️ 渲染缓存读取失败，重新渲染：{e}]")
+            with self._lock:
+                self.stats['misses'] += 1
+            return False
+        with self._lock:
+            self.stats['hits'] += 1
+        return True
+
+    def store(self, key: str, output_path: str) -> None:
+        """把刚渲染完成的输出文件加入缓存，并在超出容量时淘汰最久未使用的条目"""
+        entry = self._entry_path(key, output_path)
+        if not os.path.isfile(output_path) or os.path.getsize(output_path) > self.max_bytes:
+            return
+        tmp = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            _materialize(output_path, tmp)
+            os.replace(tmp, entry)
+        except OSError as e:
+            print(f"[⚠️ 写入渲染缓存失败：{e}]")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            self.stats['stores'] += 1
+        self.evict()
+
+    @staticmethod
+    def prepare_output(output_path: str) -> None:
+        """
+        输出文件与缓存对象共用 inode 时先删除该路径，
+        避免 ffmpeg 以截断方式覆盖输出文件时把缓存对象一起改写
+        """
+        try:
+            if os.stat(output_path).st_nlink > 1:
+                os.remove(output_path)
+        except OSError:
+            pass
+
+    # ----------------------------------------------------------------------
+    # 【3】容量管理
+    # ----------------------------------------------------------------------
+    def usage(self) -> int:
+        """当前缓存占用的字节数"""
+        return sum(st.st_size for _, st in self._entries())
+
+    def evict(self) -> None:
+        """按最近访问时间从旧到新删除缓存条目，直到总大小不超过 max_bytes"""
+        entries = sorted(self._entries(), key=lambda item: item[1].st_atime_ns)
+        total = sum(st.st_size for _, st in entries)
+        for path, st in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= st.st_size
+            with self._lock:
+                self.stats['evictions'] += 1
+
+    def clear(self) -> None:
+        """清空缓存目录"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entries(self) -> List[Tuple[str, os.stat_result]]:
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    entries.append((path, os.stat(path)))
+                except OSError:
+                    pass
+        return entries
+
+    def _entry_path(self, key: str, output_path: str) -> str:
+        extension = os.path.splitext(output_path)[1].lower()
+        return os.path.join(self.cache_dir, key[:2], key + extension)
+
+
+def _is_concat_input(args: List[str], index: int) -> bool:
+    """判断 args[index]（某个 -i 的值）是否使用 concat 分离器读取，即同一输入的选项中含有 -f concat"""
+    position = index - 2
+    while position >= 1 and args[position] != '-i':
+        if args[position - 1] == '-f' and args[position] == 'concat':
+            return True
+        position -= 1
+    return False
+
+
+def _unescape_concat_path(token: str) -> str:
+    """
+    解码 concat 列表中 file 指令的路径（ffmpeg 的 token 规则）：单引号内原样保留，引号外反斜杠转义下一个字符，
+    如 'it'\\''s.mp4' → it's.mp4
+    """
+    chars, quoted, escaped = [], False, False
+    for ch in token:
+        if escaped:
+            chars.append(ch)
+            escaped = False
+        elif quoted:
+            if ch == "'":
+                quoted = False
+            else:
+                chars.append(ch)
+        elif ch == "'":
+            quoted = True
+        elif ch == '\\':
+            escaped = True
+        else:
+            chars.append(ch)
+    return ''.join(chars)
+
+
+def _materialize(src: str, dst: str) -> None:
+    """在 dst 生成与 src 内容相同的文件：优先硬链接，其次 reflink，最后普通复制（保留修改时间）"""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    if _reflink(src, dst):
+        shutil.copystat(src, dst)
+        return
+    shutil.copy2(src, dst)
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """尝试写时复制克隆（跨文件系统或不支持时返回 False）"""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
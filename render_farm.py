@@ -0,0 +1,182 @@
+# render_farm.py
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Iterable, List, Optional
+
+from ffmpeg_engine import FFmpegEngine
+from job_metrics import JobMetrics
+from job_queue import FileJobQueue, JobResult, RenderJob, default_worker_id
+from operations import OperationRunner, resolve_operation
+from resource_governor import ResourceGovernor
+
+# 执行者领取作业的轮询间隔与心跳间隔（秒）
+POLL_INTERVAL = 0.5
+HEARTBEAT_INTERVAL = 10.0
+
+
+class RenderCoordinator:
+    """
+    协调者：把编辑操作序列化为作业放入队列，由任意主机上的 RenderWorker 领取执行。
+    示例：
+        coordinator = RenderCoordinator("/mnt/shared/render_queue")
+        job_id = coordinator.submit("ExportDistributor.export_for_douyin",
+                                    input_path="/mnt/shared/in.mp4", output_path="/mnt/shared/out.mp4")
+        results = coordinator.wait([job_id])
+    输入 / 输出路径必须是所有执行者都能访问的共享存储路径。
+    """
+
+    def __init__(self, queue_dir: str):
+        """
+        :param queue_dir: 队列目录（见 FileJobQueue）
+        """
+        self.queue = FileJobQueue(queue_dir)
+
+    def submit(self, operation: str, **params) -> str:
+        """
+        提交一次编辑操作
+        :param operation: 操作名，如 "ColorCorrection.apply_denoise"
+        :param params: 方法的关键字参数（包含输入 / 输出路径）
+        :return: 作业 ID
+        """
+        resolve_operation(operation)  # 提交前校验操作名，避免错误作业进入队列
+        return self.queue.put(RenderJob(operation, params))
+
+    def submit_many(self, operation: str, calls: Iterable[Dict[str, Any]]) -> List[str]:
+        """批量提交同一个操作，calls 为每次调用的关键字参数"""
+        return [self.submit(operation, **params) for params in calls]
+
+    def wait(self, job_ids: Iterable[str], timeout: Optional[float] = None) -> Dict[str, JobResult]:
+        """等待作业完成，返回 {作业 ID: JobResult}（含执行者与耗时）"""
+        return self.queue.wait(job_ids, timeout=timeout)
+
+    def start_local_workers(self, count: int, ffmpeg_cmd: str = "ffmpeg",
+                            idle_timeout: Optional[float] = None) -> List[subprocess.Popen]:
+        """
+        在本机启动若干个执行者进程（测试或单机批处理使用）
+        :param count: 进程数
+        :param idle_timeout: 队列空闲多久（秒）后执行者自动退出，None 表示一直运行
+        :return: 子进程列表
+        """
+        cmd = [sys.executable, os.path.abspath(__file__), '--queue', self.queue.root, '--ffmpeg', ffmpeg_cmd]
+        if idle_timeout is not None:
+            cmd += ['--idle-timeout', str(idle_timeout)]
+        return [subprocess.Popen(cmd, stdin=subprocess.DEVNULL) for _ in range(count)]
+
+
+class RenderWorker:
+    """
+    执行者：从队列领取作业，通过现有编辑器类执行，并写回结果与耗时。
+    同一进程内的作业共享一个 FFmpegEngine（并发进程数由 max_processes 控制）。
+    """
+
+    def __init__(self, queue_dir: str, ffmpeg_cmd: str = "ffmpeg", engine: Optional[FFmpegEngine] = None,
+                 worker_id: Optional[str] = None, poll_interval: float = POLL_INTERVAL,
+                 heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        """
+        :param queue_dir: 队列目录（见 FileJobQueue）
+        :param ffmpeg_cmd: ffmpeg 命令名称
+        :param engine: ffmpeg 执行引擎，默认使用全局引擎
+        :param worker_id: 执行者标识，默认 "主机名:进程号"
+        """
+        self.queue = FileJobQueue(queue_dir)
+        self.runner = OperationRunner(ffmpeg_cmd, engine)
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._stop = threading.Event()
+
+    def execute(self, job: RenderJob) -> JobResult:
+        """执行一个作业（异常记录到结果中，不会中断执行者）"""
+        started = time.time()
+        stop_heartbeat = threading.Event()
+
+        def heartbeat():
+            while not stop_heartbeat.wait(self.heartbeat_interval):
+                self.queue.heartbeat(job)
+
+        beater = threading.Thread(target=heartbeat, daemon=True)
+        beater.start()
+        try:
+            ok = self.runner.run(job.operation, job.params) is not False
+            error = None if ok else "操作返回 False"
+        except Exception:
+            ok, error = False, traceback.format_exc(limit=5)
+        finally:
+            stop_heartbeat.set()
+            beater.join()
+        return JobResult(job.job_id, ok, self.worker_id, started, time.time(), error)
+
+    def run_once(self) -> Optional[JobResult]:
+        """
+        领取并执行一个作业
+        :return: 执行结果，队列为空时返回 None
+        """
+        job = self.queue.claim()
+        if job is None:
+            return None
+        result = self.execute(job)
+        self.queue.complete(job, result)
+        status = "✅" if result.ok else "❌"
+        print(f"[{status} {self.worker_id}] {job.operation} {job.job_id}（{result.duration:.2f}s）")
+        return result
+
+    def run(self, max_jobs: Optional[int] = None, idle_timeout: Optional[float] = None) -> int:
+        """
+        持续领取作业，直到 stop() 被调用、达到 max_jobs，或队列空闲超过 idle_timeout
+        :return: 执行的作业数
+        """
+        done = 0
+        idle_since = time.monotonic()
+        while not self._stop.is_set() and (max_jobs is None or done < max_jobs):
+            if self.run_once() is not None:
+                done += 1
+                idle_since = time.monotonic()
+            elif idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                break
+            else:
+                self._stop.wait(self.poll_interval)
+        return done
+
+    def stop(self) -> None:
+        """请求执行者在当前作业完成后退出"""
+        self._stop.set()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口：python render_farm.py --queue /mnt/shared/render_queue"""
+    parser = argparse.ArgumentParser(description="AutoVideoClip 渲染执行者")
+    parser.add_argument('--queue', required=True, help="队列目录（共享存储）")
+    parser.add_argument('--ffmpeg', default="ffmpeg", help="ffmpeg 命令名称")
+    parser.add_argument('--max-processes', type=int, default=None, help="本执行者同时运行的 ffmpeg 进程数")
+    parser.add_argument('--idle-timeout', type=float, default=None, help="队列空闲多久（秒）后退出")
+    parser.add_argument('--max-jobs', type=int, default=None, help="最多执行的作业数")
+    parser.add_argument('--governor', choices=('off', 'on', 'pin'), default='off',
+                        help="资源调度：on 按核心数与并行作业数分配线程数，pin 同时绑定 CPU")
+    parser.add_argument('--job-log', default=None, help="作业资源记录（JSON Lines）文件路径")
+    parser.add_argument('--metrics-textfile', default=None, help="Prometheus textfile 路径（按操作汇总的资源使用）")
+    args = parser.parse_args(argv)
+
+    engine = None
+    if args.max_processes or args.governor != 'off' or args.job_log or args.metrics_textfile:
+        governor = ResourceGovernor(pin=args.governor == 'pin') if args.governor != 'off' else None
+        metrics = JobMetrics(args.job_log, args.metrics_textfile) if args.job_log or args.metrics_textfile else None
+        engine = FFmpegEngine(max_processes=args.max_processes, governor=governor, metrics=metrics)
+    worker = RenderWorker(args.queue, ffmpeg_cmd=args.ffmpeg, engine=engine)
+    print(f"[🚀 执行者 {worker.worker_id} 开始领取作业：{worker.queue.root}]")
+    try:
+        done = worker.run(max_jobs=args.max_jobs, idle_timeout=args.idle_timeout)
+    except KeyboardInterrupt:
+        # 正在执行的作业留在 running/ 中，由协调者通过 requeue_stale() 重新入队
+        print(f"[🛑 执行者 {worker.worker_id} 被中断]")
+        return 130
+    print(f"[🛑 执行者 {worker.worker_id} 退出，共执行 {done} 个作业]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
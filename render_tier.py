@@ -0,0 +1,247 @@
+# render_tier.py
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# ======================================================================
+# 渲染档位：
+#   draft   草稿：ultrafast 编码、长边不超过 640、15fps，用于快速检查剪辑效果
+#   preview 预览：veryfast 编码、长边不超过 1280，兼顾速度与画质
+#   final   成片：不改写命令，保持各方法原有的编码设置（如导出的 -preset slow -crf 23）
+# ======================================================================
+TIER_SETTINGS: Dict[str, Optional[Dict[str, object]]] = {
+    "draft": {"preset": "ultrafast", "crf": "30", "max_size": 640, "fps": "15", "audio_bitrate": "96k"},
+    "preview": {"preset": "veryfast", "crf": "26", "max_size": 1280, "fps": None, "audio_bitrate": None},
+    "final": None,
+}
+
+# 支持 -preset / -crf 的编码器（未指定 -c:v 时 mp4 / mkv / mov 默认使用 libx264）
+_X26X_ENCODERS = {'libx264', 'libx265'}
+_DEFAULT_X264_EXTENSIONS = {'.mp4', '.mkv', '.mov', '.m4v', '.flv'}
+# 音频文件扩展名：输出没有视频流，不做视频相关改写
+_AUDIO_EXTENSIONS = {'.mp3', '.aac', '.m4a', '.wav', '.flac', '.ogg', '.opus'}
+_FLAG_OPTIONS = {'-y', '-n', '-an', '-vn', '-sn', '-dn', '-shortest', '-nostdin', '-nostats'}
+# 草稿 / 预览使用 CRF 控制质量，丢弃固定码率相关选项
+_RATE_OPTIONS = {'-b:v', '-maxrate', '-bufsize'}
+# 输出音频流的滤镜：filter_complex 中由它们产生的 -map 标签不追加缩放
+_AUDIO_FILTERS = {'amix', 'amerge', 'atrim', 'asetpts', 'adelay', 'afade', 'aresample', 'anull', 'acrossfade',
+                  'apad', 'aformat', 'asplit', 'volume', 'atempo', 'aecho', 'equalizer', 'highpass', 'lowpass',
+                  'loudnorm', 'dynaudnorm', 'pan', 'join', 'anullsrc', 'sine'}
+
+_current_tier: ContextVar[Optional[str]] = ContextVar("render_tier", default=None)
+_default_tier: str = os.environ.get("AUTOVIDEOCLIP_RENDER_TIER", "final")
+
+
+def _check_tier(tier: str) -> str:
+    if tier not in TIER_SETTINGS:
+        raise ValueError(f"未知的渲染档位：{tier}，可选值：{', '.join(TIER_SETTINGS)}")
+    return tier
+
+
+def set_default_tier(tier: str) -> None:
+    """
+    设置全局默认渲染档位（未在 render_tier() 上下文中的调用都使用该档位）
+    :param tier: "draft" / "preview" / "final"
+    """
+    global _default_tier
+    _default_tier = _check_tier(tier)
+
+
+def current_tier() -> str:
+    """当前上下文生效的渲染档位"""
+    return _current_tier.get() or _default_tier
+
+
+@contextmanager
+def render_tier(tier: str) -> Iterator[None]:
+    """
+    在上下文内执行的编辑器方法使用指定档位渲染（单次调用级别，优先于全局默认档位）
+        with render_tier("draft"):
+            corrector.apply_preset_style(input_path, output_path, style="cyberpunk")
+    :param tier: "draft" / "preview" / "final"
+    """
+    token = _current_tier.set(_check_tier(tier))
+    try:
+        yield
+    finally:
+        _current_tier.reset(token)
+
+
+def apply_tier(full_cmd: List[str], tier: Optional[str] = None) -> List[str]:
+    """
+    按渲染档位改写一条完整的 ffmpeg 命令（只改写输出端的编码参数，不影响输入）
+    - 视频流复制（-c:v copy）、无视频输出时不改写视频参数
+    - 只有 libx264 / libx265 设置 -preset / -crf
+    - 缩放滤镜追加在 -vf 末尾，或 filter_complex 中被 -map 的视频输出之后
+    - 一条命令有多个输出时（如 split 分支），逐个输出改写
+    :param full_cmd: 完整命令列表，最后一个参数为输出
+    :param tier: 档位，默认使用 current_tier()
+    :return: 改写后的新命令（final 档位返回原命令的副本）
+    """
+    settings = TIER_SETTINGS[_check_tier(tier or current_tier())]
+    cmd = list(full_cmd)
+    if settings is None or len(cmd) < 2:
+        return cmd
+
+    head, outputs = split_outputs(cmd)
+    if len(outputs) == 1:
+        return _apply_output(cmd, settings)
+    rewritten = []
+    for options, output in outputs:
+        # 滤镜图位于公共部分，各输出的改写（追加缩放分支）依次累积在其中
+        body = _apply_output(head + options + [output], settings)
+        head, options = body[:len(head)], body[len(head):-1]
+        rewritten.append(options + [output])
+    return head + [arg for output_args in rewritten for arg in output_args]
+
+
+def _apply_output(cmd: List[str], settings: Dict[str, object]) -> List[str]:
+    """改写单个输出（cmd 的最后一个参数）的编码参数"""
+    output = cmd[-1]
+    options = _output_options(cmd)
+    video_codec = options.get('-c:v', options.get('-vcodec', options.get('-c')))
+    extension = os.path.splitext(output)[1].lower()
+    has_video = '-vn' not in options and extension not in _AUDIO_EXTENSIONS
+    encodes_video = has_video and video_codec != 'copy'
+    is_x26x = video_codec in _X26X_ENCODERS or (video_codec is None and extension in _DEFAULT_X264_EXTENSIONS)
+
+    body = cmd[:-1]
+    if encodes_video and is_x26x:
+        body = _drop_options(body, _RATE_OPTIONS)
+        body = _set_option(body, '-preset', settings['preset'])
+        body = _set_option(body, '-crf', settings['crf'])
+    if encodes_video and settings['max_size']:
+        body = _append_scale(body, settings['max_size'])
+    if encodes_video and settings['fps']:
+        body = _set_option(body, '-r', settings['fps'])
+    audio_codec = options.get('-c:a', options.get('-acodec', options.get('-c')))
+    if settings['audio_bitrate'] and '-b:a' in options and audio_codec != 'copy':
+        body = _set_option(body, '-b:a', settings['audio_bitrate'])
+    return body + [output]
+
+
+def split_outputs(cmd: List[str]) -> Tuple[List[str], List[Tuple[List[str], str]]]:
+    """
+    把命令拆分为公共部分（ffmpeg、输入及 -filter_complex）和各个输出
+    :return: (公共部分, [(输出选项, 输出路径), ...])
+    """
+    start = _output_start(cmd[:-1])
+    head, outputs, options = cmd[:start], [], []
+    index = start
+    while index < len(cmd):
+        key = cmd[index]
+        if key in _FLAG_OPTIONS:
+            options.append(key)
+            index += 1
+        elif key.startswith('-') and index + 1 < len(cmd):
+            if key == '-filter_complex':
+                head += cmd[index:index + 2]
+            else:
+                options += cmd[index:index + 2]
+            index += 2
+        else:
+            outputs.append((options, key))
+            options = []
+            index += 1
+    return head, outputs
+
+
+def _output_start(body: List[str]) -> int:
+    """输出选项的起始位置：最后一个 -i 的值之后（body 为不含输出路径的命令）"""
+    positions = [i for i, arg in enumerate(body) if arg == '-i']
+    return positions[-1] + 2 if positions else 1
+
+
+def _output_options(cmd: List[str]) -> Dict[str, Optional[str]]:
+    """解析输出端的选项（不含输出路径），后出现的同名选项覆盖前面的"""
+    options: Dict[str, Optional[str]] = {}
+    body = cmd[:-1]
+    index = _output_start(body)
+    while index < len(body):
+        key = body[index]
+        if key in _FLAG_OPTIONS or index + 1 >= len(body):
+            options[key] = None
+            index += 1
+        else:
+            options[key] = body[index + 1]
+            index += 2
+    return options
+
+
+def _drop_options(body: List[str], keys: set) -> List[str]:
+    """删除输出端的若干带值选项"""
+    start = _output_start(body)
+    result = body[:start]
+    index = start
+    while index < len(body):
+        key = body[index]
+        if key in _FLAG_OPTIONS or index + 1 >= len(body):
+            result.append(key)
+            index += 1
+        else:
+            if key not in keys:
+                result.extend(body[index:index + 2])
+            index += 2
+    return result
+
+
+def _set_option(body: List[str], key: str, value: str) -> List[str]:
+    """设置输出端选项：已存在时替换取值，否则追加"""
+    body = list(body)
+    start = _output_start(body)
+    for index in range(start, len(body) - 1):
+        if body[index] == key:
+            body[index + 1] = value
+            return body
+    return body + [key, value]
+
+
+def fit_scale_filter(max_size: int) -> str:
+    """
+    等比缩放滤镜：长边不超过 max_size，且不放大
+    :param max_size: 长边上限（像素）
+    :return: scale 滤镜字符串
+    """
+    # 宽高取偶数（-2），满足 yuv420p 编码要求；表达式中的逗号由单引号保护
+    return (f"scale='if(gte(iw,ih),min({max_size},iw),-2)':"
+            f"'if(gte(iw,ih),-2,min({max_size},ih))'")
+
+
+def _append_scale(body: List[str], max_size: int) -> List[str]:
+    """在视频滤镜链末尾追加等比缩放：长边不超过 max_size，且不放大"""
+    scale = fit_scale_filter(max_size)
+    body = list(body)
+    for index in range(len(body) - 1):
+        if body[index] in ('-vf', '-filter:v'):
+            body[index + 1] = f"{body[index + 1]},{scale}"
+            return body
+
+    if '-filter_complex' in body:
+        graph_index = body.index('-filter_complex') + 1
+        last_chain = body[graph_index].split(';')[-1]
+        if '-map' not in body and not last_chain.endswith(']') and not _is_audio_chain(last_chain):
+            # 未标注输出的滤镜图（如 [1][0]overlay=...）直接输出到文件：在最后一个滤镜之后追加
+            body[graph_index] = f"{body[graph_index]},{scale}"
+            return body
+        for index in range(len(body) - 1):
+            target = body[index + 1]
+            if body[index] == '-map' and target.startswith('[') and target.endswith(']'):
+                label = target[1:-1]
+                # 只改写视频输出：跳过由音频滤镜（或 v=0 的 concat）产生的标签
+                producer = next((chain for chain in body[graph_index].split(';') if chain.endswith(target)), '')
+                if _is_audio_chain(producer[:-len(target)]):
+                    continue
+                body[graph_index] = f"{body[graph_index]};[{label}]{scale}[{label}_tier]"
+                body[index + 1] = f"[{label}_tier]"
+                return body
+        return body  # 未找到被映射的视频标签：不改写
+
+    return body + ['-vf', scale]
+
+
+def _is_audio_chain(chain: str) -> bool:
+    """滤镜链的最后一个滤镜是否输出音频（音频滤镜或 v=0 的 concat）"""
+    last_filter = chain.split(',')[-1].split(']')[-1]
+    filter_name = last_filter.split('=')[0]
+    return filter_name in _AUDIO_FILTERS or (filter_name == 'concat' and 'v=0' in last_filter)
@@ -0,0 +1,230 @@
+# resource_governor.py
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional
+
+from render_tier import split_outputs
+
+# ======================================================================
+# 资源调度：ffmpeg 默认认为自己独占整台机器（编码、滤镜线程数都按全部核心计算），
+# 多个作业并行时 CPU 严重超订。ResourceGovernor 根据核心数、系统负载和同时运行的作业数，
+# 为每个作业分配线程预算，并可选把 ffmpeg 进程绑定到互不重叠的 CPU 集合。
+# ======================================================================
+
+# 滤镜线程数 = 编码线程数 / _FILTER_THREAD_RATIO（滤镜与编码同时运行，分开计算会超订）
+_FILTER_THREAD_RATIO = 2
+# x264 lookahead 线程数 = 编码线程数 / _LOOKAHEAD_THREAD_RATIO（与 x264 的默认比例一致）
+_LOOKAHEAD_THREAD_RATIO = 6
+
+# 当前线程中即将启动的 ffmpeg 应绑定的 CPU（由 ResourceGovernor.lease() 设置）
+_pinned_cpus: ContextVar[Optional[FrozenSet[int]]] = ContextVar("pinned_cpus", default=None)
+
+
+def available_cpus() -> List[int]:
+    """当前进程可以使用的 CPU 编号（遵循已有的 CPU 亲和性 / 容器限制）"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def system_load() -> float:
+    """最近 1 分钟的系统平均负载，不支持的平台返回 0"""
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return 0.0
+
+
+def pinned_cpus() -> Optional[FrozenSet[int]]:
+    """当前上下文中 ffmpeg 进程应绑定的 CPU 集合，未绑定时返回 None"""
+    return _pinned_cpus.get()
+
+
+def affinity_preexec() -> Optional[Callable[[], None]]:
+    """
+    供 subprocess 的 preexec_fn 使用：在子进程 exec 之前设置 CPU 亲和性
+    :return: 设置函数；未绑定或平台不支持时返回 None
+    """
+    cpus = pinned_cpus()
+    if cpus is None or not hasattr(os, 'sched_setaffinity'):
+        return None
+    return lambda: os.sched_setaffinity(0, cpus)
+
+
+class ThreadBudget:
+    """一个作业的线程预算"""
+
+    __slots__ = ('threads', 'filter_threads', 'lookahead_threads', 'cpus')
+
+    def __init__(self, threads: int, filter_threads: int, lookahead_threads: int,
+                 cpus: Optional[FrozenSet[int]] = None):
+        """
+        :param threads: 编码线程数（-threads）
+        :param filter_threads: 滤镜线程数（-filter_threads / -filter_complex_threads）
+        :param lookahead_threads: x264 lookahead 线程数
+        :param cpus: 绑定的 CPU 集合，None 表示不绑定
+        """
+        self.threads = threads
+        self.filter_threads = filter_threads
+        self.lookahead_threads = lookahead_threads
+        self.cpus = cpus
+
+    def __repr__(self) -> str:
+        return (f"ThreadBudget(threads={self.threads}, filter_threads={self.filter_threads}, "
+                f"lookahead_threads={self.lookahead_threads}, cpus={sorted(self.cpus) if self.cpus else None})")
+
+    def apply(self, full_cmd: List[str]) -> List[str]:
+        """
+        把线程预算写入一条完整的 ffmpeg 命令（命令中已显式设置的线程参数保持不变）
+        - 全局：-filter_threads，有 -filter_complex 时再加 -filter_complex_threads
+        - 每个输出：-threads；libx264 追加 lookahead-threads，libx265 设置线程池大小 pools
+        :return: 改写后的新命令
+        """
+        cmd = list(full_cmd)
+        if len(cmd) < 2:
+            return cmd
+        head, outputs = split_outputs(cmd)
+        globals_ = []
+        if '-filter_threads' not in head:
+            globals_ += ['-filter_threads', str(self.filter_threads)]
+        if '-filter_complex' in head and '-filter_complex_threads' not in head:
+            globals_ += ['-filter_complex_threads', str(self.filter_threads)]
+        result = head[:1] + globals_ + head[1:]
+        for options, output in outputs:
+            result += self._apply_output(options) + [output]
+        return result
+
+    def _apply_output(self, options: List[str]) -> List[str]:
+        """为单个输出的选项追加线程参数"""
+        values = _option_values(options)
+        options = list(options)
+        if '-threads' not in values:
+            options += ['-threads', str(self.threads)]
+        codec = values.get('-c:v', values.get('-vcodec', values.get('-c')))
+        if codec == 'libx264':
+            options = _merge_codec_params(options, '-x264-params', f"lookahead-threads={self.lookahead_threads}")
+        elif codec == 'libx265':
+            options = _merge_codec_params(options, '-x265-params', f"pools={self.threads}")
+        return options
+
+
+class ResourceGovernor:
+    """
+    按机器核心数与当前作业组合分配 ffmpeg 线程预算：
+    - 可用核心 = CPU 数 - 保留核心 - 本调度器之外的系统负载
+    - 同时运行的作业数 = min(进程上限, 正在等待或运行的作业数)
+    - 每个作业的编码线程 = 可用核心 / 同时运行的作业数（至少 1）
+    启用 pin 后，每个作业绑定到互不重叠的 CPU 集合（仅支持 sched_setaffinity 的平台）。
+    用法：FFmpegEngine(governor=ResourceGovernor())，引擎在每条命令启动前申请预算。
+    """
+
+    def __init__(self, cpus: Optional[Iterable[int]] = None, pin: bool = False, reserve: int = 0,
+                 load_aware: bool = True):
+        """
+        :param cpus: 可使用的 CPU 编号，默认为当前进程的 CPU 亲和性集合
+        :param pin: 是否把每个 ffmpeg 进程绑定到分配给它的 CPU
+        :param reserve: 保留给其他程序（如界面、数据库）的核心数
+        :param load_aware: 是否扣除本调度器之外的系统负载（os.getloadavg）
+        """
+        self.cpus = sorted(set(cpus)) if cpus is not None else available_cpus()
+        self.pin = pin and hasattr(os, 'sched_setaffinity')
+        self.reserve = max(0, int(reserve))
+        self.load_aware = load_aware
+        self._lock = threading.Lock()
+        self._demand = 0           # 正在等待进程名额或正在运行的作业数（按权重）
+        self._leased_threads = 0   # 已分配出去的编码线程总数
+        self._busy_cpus: Dict[int, int] = {}
+
+    @property
+    def usable_cores(self) -> int:
+        """当前可分配的核心数"""
+        cores = len(self.cpus) - self.reserve
+        if self.load_aware:
+            # 平均负载中包含本调度器启动的 ffmpeg，只扣除超出部分
+            cores -= int(max(0.0, system_load() - self._leased_threads))
+        return max(1, cores)
+
+    def budget(self, concurrency: int, weight: int = 1) -> ThreadBudget:
+        """
+        计算单个作业的线程预算（不登记，不绑定 CPU）
+        :param concurrency: 同时运行的作业数
+        :param weight: 作业占用的份额（如管道作业的阶段数，各阶段平分预算）
+        """
+        share = max(1, self.usable_cores // max(1, concurrency))
+        threads = max(1, share // max(1, weight))
+        return ThreadBudget(threads, max(1, threads // _FILTER_THREAD_RATIO),
+                            max(1, threads // _LOOKAHEAD_THREAD_RATIO))
+
+    @contextmanager
+    def waiting(self, weight: int = 1) -> Iterator[None]:
+        """登记一个等待进程名额的作业（在获取名额之前进入，作业结束后退出）"""
+        with self._lock:
+            self._demand += weight
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._demand -= weight
+
+    @contextmanager
+    def lease(self, max_processes: int, weight: int = 1) -> Iterator[ThreadBudget]:
+        """
+        为即将启动的作业分配线程预算（在获取进程名额之后进入，子进程结束后退出）
+        在上下文内启动的 ffmpeg 通过 affinity_preexec() 绑定到分配的 CPU
+        :param max_processes: 引擎的进程上限
+        :param weight: 作业占用的进程名额数
+        :return: ThreadBudget
+        """
+        with self._lock:
+            concurrency = max(1, min(max_processes, max(self._demand, weight)) // max(1, weight))
+            budget = self.budget(concurrency, weight)
+            if self.pin:
+                budget.cpus = self._take_cpus(budget.threads * weight)
+            self._leased_threads += budget.threads * weight
+        token = _pinned_cpus.set(budget.cpus)
+        try:
+            yield budget
+        finally:
+            _pinned_cpus.reset(token)
+            with self._lock:
+                self._leased_threads -= budget.threads * weight
+                for cpu in budget.cpus or ():
+                    self._busy_cpus[cpu] -= 1
+
+    def _take_cpus(self, count: int) -> FrozenSet[int]:
+        """选出占用最少的 count 个 CPU（调用方持有锁）"""
+        ranked = sorted(self.cpus, key=lambda cpu: (self._busy_cpus.get(cpu, 0), cpu))
+        chosen = frozenset(ranked[:max(1, count)])
+        for cpu in chosen:
+            self._busy_cpus[cpu] = self._busy_cpus.get(cpu, 0) + 1
+        return chosen
+
+
+def _option_values(options: List[str]) -> Dict[str, Optional[str]]:
+    """把输出选项列表解析为 {选项: 取值}（无值选项取值为 None）"""
+    values: Dict[str, Optional[str]] = {}
+    index = 0
+    while index < len(options):
+        key = options[index]
+        if index + 1 < len(options) and not options[index + 1].startswith('-'):
+            values[key] = options[index + 1]
+            index += 2
+        else:
+            values[key] = None
+            index += 1
+    return values
+
+
+def _merge_codec_params(options: List[str], key: str, param: str) -> List[str]:
+    """向 -x264-params / -x265-params 追加一项（已设置同名参数时保持不变）"""
+    name = param.split('=')[0]
+    options = list(options)
+    for index in range(len(options) - 1):
+        if options[index] == key:
+            existing = options[index + 1]
+            if name not in [item.split('=')[0] for item in existing.split(':')]:
+                options[index + 1] = f"{existing}:{param}"
+            return options
+    return options + [key, param]
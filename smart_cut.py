@@ -0,0 +1,98 @@
+# smart_cut.py
+import os
+import tempfile
+from typing import List, Tuple
+
+from ffmpeg_engine import FFmpegEngine, defer_cleanup
+from media_probe import probe, probe_keyframes
+from render_tier import render_tier
+
+# 可以重新编码出与原视频流拼接兼容的片段的编码器（源编码 → ffmpeg 编码器）
+SMART_CUT_ENCODERS = {'h264': 'libx264', 'hevc': 'libx265'}
+# 时间比较的容差（秒）：切点与关键帧相差不超过该值时视为重合
+_EPSILON = 0.001
+
+
+def plan_smart_cut(keyframes: List[float], start: float, end: float) -> List[Tuple[float, float, bool]]:
+    """
+    规划智能剪切：切点所在的不完整 GOP 重新编码，中间完整的 GOP 直接流复制
+    :param keyframes: 关键帧时间（秒，升序）
+    :param start: 剪切起点（秒）
+    :param end: 剪切终点（秒）
+    :return: [(起点, 终点, 是否流复制), ...]；区间内关键帧不足时整段重新编码
+    """
+    first_key = next((k for k in keyframes if k >= start - _EPSILON), None)
+    last_key = next((k for k in reversed(keyframes) if k <= end + _EPSILON), None)
+    if first_key is None or last_key is None or last_key - first_key <= _EPSILON:
+        return [(start, end, False)]
+
+    segments = []
+    if first_key - start > _EPSILON:
+        segments.append((start, first_key, False))   # 起点到第一个关键帧：重新编码
+    segments.append((first_key, last_key, True))     # 关键帧之间：流复制
+    if end - last_key > _EPSILON:
+        segments.append((last_key, end, False))      # 最后一个关键帧到终点：重新编码
+    return segments
+
+
+def smart_cut(engine: FFmpegEngine, ffmpeg_cmd: str, input_path: str, output_path: str,
+              start: float, end: float, label: str = "智能剪切失败") -> bool:
+    """
+    帧精确的智能剪切：在输入端 -ss 跳转（不从文件开头解码），只重新编码切点处不完整的 GOP，
+    中间部分流复制；各视频片段以 MPEG-TS（参数集随流携带）衔接，再与整段重新编码的音频一起无损封装。
+    源视频编码不在 SMART_CUT_ENCODERS 中、或无法获取关键帧时，退化为输入端跳转 + 整段重新编码（同样帧精确）。
+    :param start: 剪切起点（秒）
+    :param end: 剪切终点（秒）
+    :return: 是否成功
+    """
+    info = probe(input_path)
+    video = info.video if info is not None else None
+    encoder = SMART_CUT_ENCODERS.get(video.codec_name) if video is not None else None
+    keyframes = probe_keyframes(input_path) if encoder else None
+    segments = plan_smart_cut(keyframes, start, end) if keyframes else [(start, end, False)]
+    if not any(copy for _, _, copy in segments):
+        cmd = [ffmpeg_cmd, '-y', '-ss', f"{start:.6f}", '-i', input_path, '-t', f"{end - start:.6f}"]
+        if encoder:
+            cmd += ['-c:v', encoder, '-crf', '18']
+        return engine.run(cmd + (['-c:a', 'aac'] if info is None or info.has_audio else []) + [output_path],
+                          label=label)
+
+    work_dir = tempfile.mkdtemp(prefix="smartcut_", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        commands, parts = [], []
+        for index, (seg_start, seg_end, copy) in enumerate(segments):
+            part = os.path.join(work_dir, f"part_{index:02d}.ts")
+            cmd = [ffmpeg_cmd, '-y', '-ss', f"{seg_start:.6f}", '-i', input_path, '-t', f"{seg_end - seg_start:.6f}",
+                   '-map', '0:v:0', '-avoid_negative_ts', 'make_zero']
+            if copy:
+                cmd += ['-c:v', 'copy']
+            else:
+                # 与原视频流保持相同的编码、像素格式和分辨率，拼接后解码器可以无缝切换
+                cmd += ['-c:v', encoder, '-crf', '18', '-preset', 'fast']
+                cmd += ['-pix_fmt', video.pix_fmt] if video.pix_fmt else []
+            commands.append(cmd + [part])
+            parts.append(part)
+
+        audio_file = None
+        if info.has_audio:
+            # 音频整段重新编码（很快），保证采样级精确、没有片段边界处的间隙
+            audio_file = os.path.join(work_dir, "audio.m4a")
+            commands.append([ffmpeg_cmd, '-y', '-ss', f"{start:.6f}", '-i', input_path, '-t', f"{end - start:.6f}",
+                             '-vn', '-c:a', 'aac', '-b:a', '192k', audio_file])
+
+        list_file = os.path.join(work_dir, "parts.txt")
+        with open(list_file, 'w', encoding='utf-8') as f:
+            for part in parts:
+                f.write(f"file '{part}'\n")
+
+        concat = [ffmpeg_cmd, '-y', '-f', 'concat', '-safe', '0', '-i', list_file]
+        if audio_file is not None:
+            concat += ['-i', audio_file, '-map', '0:v', '-map', '1:a']
+        # 流复制的片段保持原分辨率 / 帧率，重新编码的片段不能被 draft / preview 档位缩小，否则拼接后的流损坏
+        with render_tier("final"):
+            if not all(engine.run_many(commands, label=label)):
+                return False
+            return engine.run(concat + ['-c', 'copy', output_path], label=label)
+    finally:
+        # 捕获模式下（Project / 异步 API）等命令真正执行之后再删除临时片段
+        defer_cleanup(work_dir)
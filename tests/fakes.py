@@ -0,0 +1,66 @@
+# fakes.py
+import os
+import stat
+import sys
+import threading
+from typing import Any, Callable, List, Optional
+
+from ffmpeg_engine import FFmpegEngine
+
+# 测试共用的替身（本环境不一定安装了 ffmpeg）
+
+# 最简单的模拟 ffmpeg：把完整参数写入输出文件（最后一个参数）
+ECHO_FFMPEG = """
+import sys
+open(sys.argv[-1], "w").write(" ".join(sys.argv[1:]))
+"""
+
+
+def write_fake_ffmpeg(work_dir: str, body: str = ECHO_FFMPEG) -> str:
+    """
+    在 work_dir 中写出一个可执行的模拟 ffmpeg 脚本（由当前 Python 解释器执行）
+    :param body: 脚本内容（Python 代码），默认 ECHO_FFMPEG
+    :return: 脚本路径，可作为 ffmpeg_cmd 传给各编辑器
+    """
+    script = os.path.join(work_dir, "fake_ffmpeg")
+    with open(script, 'w', encoding='utf-8') as f:
+        f.write(f"#!{sys.executable}\n{body}")
+    os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+    return script
+
+
+class RecordingEngine(FFmpegEngine):
+    """
+    只记录最终执行的命令（档位改写 / 线程预算之后），不启动 ffmpeg
+    - fail：返回 True 的命令视为执行失败
+    - gate：执行前等待该事件（模拟耗时的渲染），默认不等待
+    - observe：每条命令执行时调用一次，返回值依次保存在 observed 中（如当前绑定的 CPU）
+    concat 分离器的列表文件内容保存在 concat_lists 中（执行之后临时文件会被删除）。
+    """
+
+    def __init__(self, max_processes: int = 2, fail: Optional[Callable[[List[str]], bool]] = None,
+                 gate: Optional[threading.Event] = None, observe: Optional[Callable[[List[str]], Any]] = None,
+                 **kwargs):
+        super().__init__(max_processes=max_processes, **kwargs)
+        self.fail = fail
+        self.gate = gate
+        self.observe = observe
+        self.commands: List[List[str]] = []
+        self.concat_lists: List[str] = []
+        self.observed: List[Any] = []
+
+    def _execute(self, full_cmd, label):
+        if self.gate is not None:
+            self.gate.wait()
+        self.commands.append(list(full_cmd))
+        if '-f' in full_cmd and full_cmd[full_cmd.index('-f') + 1] == 'concat':
+            with open(full_cmd[full_cmd.index('-i') + 1], encoding='utf-8') as f:
+                self.concat_lists.append(f.read())
+        if self.observe is not None:
+            self.observed.append(self.observe(full_cmd))
+        return not (self.fail and self.fail(full_cmd))
+
+
+def option(cmd: List[str], key: str) -> Optional[str]:
+    """命令中某个选项的取值（没有该选项时返回 None）"""
+    return cmd[cmd.index(key) + 1] if key in cmd else None
@@ -0,0 +1,115 @@
+# test_async_api.py
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import write_fake_ffmpeg
+from ffmpeg_engine import FFmpegEngine
+from video_editor import VideoEditor
+from video_trimmer import VideoTrimmer
+from color_correction import ColorCorrection
+from export_distributor import ExportDistributor
+
+# 模拟 ffmpeg：记录 pid；参数中包含 "__hang__" 时长时间运行；读取 concat 列表文件；最后写出输出文件
+FAKE_FFMPEG = """
+import os, sys, time
+args = sys.argv[1:]
+output = args[-1]
+with open(os.path.join(os.path.dirname(output), "pids.txt"), "a") as f:
+    f.write(f"{os.getpid()}\\n")
+if any("__hang__" in arg for arg in args):
+    time.sleep(30)
+time.sleep(0.2)
+if "concat" in args:
+    open(args[args.index("-i") + 1]).read()
+open(output, "w").write(" ".join(args))
+"""
+
+
+def _last_pid_alive(work_dir: str) -> bool:
+    with open(os.path.join(work_dir, "pids.txt")) as f:
+        pid = int(f.read().split()[-1])
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+async def _run_checks(work_dir: str, ffmpeg: str) -> None:
+    engine = FFmpegEngine(max_processes=4)
+    editor = VideoEditor(ffmpeg, engine=engine)
+    trimmer = VideoTrimmer(ffmpeg, engine=engine)
+    corrector = ColorCorrection(ffmpeg, engine=engine)
+    exporter = ExportDistributor(ffmpeg, engine=engine)
+    source = os.path.join(work_dir, "source.mp4")
+    open(source, 'w').close()
+
+    # 测试1: xxx_async 协程版本与同步方法返回值一致，输出文件已生成
+    print("🔹 测试协程版本: cut_video_async / export_for_douyin_async")
+    output = os.path.join(work_dir, "cut.mp4")
+    assert await editor.cut_video_async(source, output, "00:00:01", "00:00:02") is True
+    assert os.path.exists(output)
+    assert await exporter.run_async("export_for_douyin", source, os.path.join(work_dir, "douyin.mp4"))
+    print("✅ 协程版本执行成功！")
+
+    # 测试2: 大量并发作业只在等待期间挂起，不为每个作业创建线程
+    print("🔹 测试 40 个并发作业（进程上限 4）")
+    threads_before = threading.active_count()
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        corrector.adjust_brightness_async(source, os.path.join(work_dir, f"bright_{i}.mp4"), brightness=0.01 * i)
+        for i in range(40)
+    ])
+    elapsed = time.perf_counter() - started
+    assert all(results), results
+    assert threading.active_count() - threads_before < 40
+    assert elapsed >= 0.2 * 40 / 4 * 0.9, elapsed
+    print(f"✅ 40 个作业全部完成，耗时 {elapsed:.1f}s，新增线程 {threading.active_count() - threads_before} 个")
+
+    # 测试3: 超时后杀掉 ffmpeg 子进程并返回 False
+    print("🔹 测试作业超时")
+    started = time.perf_counter()
+    ok = await editor.run_async("add_watermark", source, os.path.join(work_dir, "__hang__.png"),
+                                os.path.join(work_dir, "timeout.mp4"), timeout=1.0)
+    assert ok is False and time.perf_counter() - started < 5
+    assert not _last_pid_alive(work_dir)
+    print("✅ 超时作业已终止，子进程已退出！")
+
+    # 测试4: 取消任务时杀掉 ffmpeg 子进程
+    print("🔹 测试取消作业")
+    task = asyncio.ensure_future(corrector.apply_hue_shift_async(source, os.path.join(work_dir, "__hang___hue.mp4")))
+    await asyncio.sleep(1.0)
+    task.cancel()
+    try:
+        await task
+        raise AssertionError("任务没有被取消")
+    except asyncio.CancelledError:
+        pass
+    assert not _last_pid_alive(work_dir)
+    print("✅ 取消作业后子进程已退出！")
+
+    # 测试5: 临时文件（concat 列表）在命令执行完之后才删除
+    print("🔹 测试 merge_videos_async 的临时文件清理时机")
+    merged = os.path.join(work_dir, "merged.mp4")
+    assert await trimmer.merge_videos_async([source, source], merged)
+    assert not [name for name in os.listdir(work_dir) if name.startswith("merge_")]
+    print("✅ concat 列表文件在合并完成后才被清理！")
+
+
+def test_async_api():
+    print("⚡" + " " * 10 + "开始测试 异步 API ..." + " " * 10 + "⚡")
+    work_dir = tempfile.mkdtemp(prefix="avc_async_api_")
+    try:
+        asyncio.run(_run_checks(work_dir, write_fake_ffmpeg(work_dir, FAKE_FFMPEG)))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print("⚡" + " " * 8 + "异步 API 测试完成。" + " " * 8 + "⚡\n")
+
+
+if __name__ == "__main__":
+    test_async_api()
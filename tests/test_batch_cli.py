@@ -0,0 +1,72 @@
+# test_batch_cli.py
+import json
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import RecordingEngine
+import batch_cli
+from batch_cli import BatchRunner, load_manifest
+
+
+def test_batch_cli():
+    print("📋" + " " * 10 + "开始测试 批处理命令行（清单 / 并发 / 续跑）..." + " " * 10 + "📋")
+    work_dir = tempfile.mkdtemp(prefix="batch_test_")
+    jobs = [{"operation": "ExportDistributor.export_for_douyin",
+             "params": {"input_path": "in.mp4", "output_path": os.path.join(work_dir, f"out_{i}.mp4")}}
+            for i in range(6)]
+    jobs.append({"id": "broken", "operation": "ColorCorrection.adjust_brightness",
+                 "params": {"input_path": "in.mp4", "output_path": os.path.join(work_dir, "broken.mp4"),
+                            "brightness": 0.1}})
+    manifest = os.path.join(work_dir, "jobs.json")
+    with open(manifest, 'w', encoding='utf-8') as f:
+        json.dump({"jobs": jobs}, f)
+
+    # 测试1: 清单解析：稳定 ID，无效操作整体报错
+    print("🔹 测试清单解析")
+    parsed = load_manifest(manifest)
+    assert len(parsed) == 7 and parsed[-1].job_id == "broken"
+    assert [job.job_id for job in parsed] == [job.job_id for job in load_manifest(manifest)]
+    bad = os.path.join(work_dir, "bad.json")
+    with open(bad, 'w', encoding='utf-8') as f:
+        json.dump([{"operation": "VideoEditor.no_such_method", "params": {}}], f)
+    try:
+        load_manifest(bad)
+        assert False, "无效操作应报错"
+    except ValueError:
+        pass
+    print(f"✅ 解析 {len(parsed)} 个作业")
+
+    # 测试2: 并发执行，失败写入日志，统计正确
+    print("🔹 测试并发执行与日志")
+    journal = os.path.join(work_dir, "jobs.journal.jsonl")
+    engine = RecordingEngine(fail=lambda cmd: 'broken' in cmd[-1])  # 输出名含 "broken" 的命令失败
+    stats = BatchRunner(journal, concurrency=3, engine=engine).run(parsed)
+    assert (stats['ok'], stats['failed'], stats['skipped']) == (6, 1, 0)
+    assert stats['by_operation']['ExportDistributor.export_for_douyin']['count'] == 6
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write('{"job_id": "trunc')  # 模拟中断时写了一半的行
+    batch_cli.print_summary(stats)
+    print("✅ 统计正确！")
+
+    # 测试3: 续跑：只重新执行失败的作业
+    print("🔹 测试续跑")
+    engine.commands.clear()
+    stats = BatchRunner(journal, concurrency=3, engine=engine).run(parsed)
+    assert (stats['ok'], stats['failed'], stats['skipped']) == (0, 1, 6)
+    assert [os.path.basename(cmd[-1]) for cmd in engine.commands] == ["broken.mp4"]
+    # 半行之后写入的第一条记录仍然可以读出（不会与半行粘在一起而丢失）
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write('{"job_id": "trunc')
+    resumed = batch_cli.BatchJournal(journal)
+    for job_id in ("a", "b", "c"):
+        resumed.append(batch_cli.JobResult(job_id, True, "test", 0.0, 1.0))
+    assert {"a", "b", "c"} <= resumed.completed()
+    engine.shutdown()
+    print("✅ 已完成的作业被跳过！")
+
+    print("📋" + " " * 8 + "批处理命令行测试完成。" + " " * 8 + "📋\n")
+
+
+if __name__ == "__main__":
+    test_batch_cli()
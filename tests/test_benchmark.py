@@ -0,0 +1,66 @@
+# test_benchmark.py
+import json
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import write_fake_ffmpeg
+import benchmark
+from media_factory import DEFAULT_MEDIA_CACHE
+from benchmark import BenchmarkHistory, BenchmarkMedia, ClipSpec, benchmark_operations, build_params
+
+
+def test_benchmark():
+    print("⏱️" + " " * 10 + "开始测试 性能基准 ..." + " " * 10 + "⏱️")
+    work_dir = tempfile.mkdtemp(prefix="avc_bench_")
+
+    # 测试1: 每个渲染操作都能在合成素材上生成参数
+    print("🔹 测试基准参数生成")
+    clip = ClipSpec.parse("1080p:60")
+    assert (clip.width, clip.height, clip.duration, str(clip)) == (1920, 1080, 60.0, "1080p:60")
+    media = BenchmarkMedia(clip, work_dir)
+    operations = benchmark_operations()
+    for operation in operations:
+        params = build_params(operation, media, work_dir)
+        assert all(not name.startswith('output') or str(value).startswith(work_dir) or isinstance(value, dict)
+                   for name, value in params.items())
+    assert build_params("AudioEditor.apply_echo_effect", media, work_dir)['input_path'] == media.audio
+    assert build_params("VideoEditor.cut_video", media, work_dir)['end_time'] == "36"
+    assert "ColorCorrection.build_grade_filter" not in operations
+    print(f"✅ {len(operations)} 个操作的参数生成正确！")
+
+    # 测试2: 与历史基线（最近几次的中位数）比较，超过阈值才算回归
+    print("🔹 测试回归判定")
+    # 默认历史与素材缓存都不能放在 outputs/（main.py 每次运行测试都会清空它）
+    assert os.path.basename(os.path.dirname(benchmark.DEFAULT_HISTORY)) == "benchmarks"
+    assert BenchmarkMedia(clip).factory.cache_dir == os.path.abspath(DEFAULT_MEDIA_CACHE)
+    history = BenchmarkHistory(os.path.join(work_dir, "history.json"))
+    for wall_time in (1.0, 1.2, 0.9):
+        history.append({"VideoEditor.cut_video@720p:10": {'ok': True, 'wall_time': wall_time, 'cpu_time': 2.0}})
+    history.save()
+    history = BenchmarkHistory(history.path)
+    slow = {"VideoEditor.cut_video@720p:10": {'ok': True, 'wall_time': 1.25, 'cpu_time': 2.1}}
+    assert history.regressions(slow, threshold=0.10) == [("VideoEditor.cut_video@720p:10", 'wall_time', 1.0, 1.25)]
+    assert history.regressions(slow, threshold=0.30) == []
+    print("✅ 回归判定正确！")
+
+    # 测试3: 命令行完整运行（模拟 ffmpeg）：生成素材、逐用例独立进程计量、写入历史
+    print("🔹 测试命令行运行")
+    ffmpeg = write_fake_ffmpeg(work_dir)
+    history_path = os.path.join(work_dir, "cli_history.json")
+    argv = ['--clips', '720p:2', '--methods', 'ColorCorrection.adjust_brightness', 'VideoEditor.cut_video',
+            '--media-dir', os.path.join(work_dir, "media"), '--ffmpeg', ffmpeg, '--history', history_path]
+    assert benchmark.main(argv) == 0
+    results = json.load(open(history_path, encoding='utf-8'))['runs'][0]['results']
+    assert sorted(results) == ["ColorCorrection.adjust_brightness@720p:2", "VideoEditor.cut_video@720p:2"]
+    assert all(result['ok'] and result['wall_time'] > 0 and result['realtime_factor'] > 0
+               for result in results.values())
+    print("✅ 命令行运行正确！")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("⏱️" + " " * 8 + "性能基准测试完成。" + " " * 8 + "⏱️\n")
+
+
+if __name__ == "__main__":
+    test_benchmark()
@@ -0,0 +1,72 @@
+# test_chunked_export.py
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import RecordingEngine, option
+import chunked_encoder
+from chunked_encoder import plan_chunks
+from media_probe import MediaInfo, StreamInfo
+from export_distributor import ExportDistributor
+
+
+def test_chunked_export():
+    print("🧩" + " " * 10 + "开始测试 分段并行导出..." + " " * 10 + "🧩")
+
+    # 测试1: 切点都落在关键帧上，且各段时长接近
+    print("🔹 测试关键帧切分计划")
+    keyframes = [i * 2.0 for i in range(1800)]  # 1 小时视频，每 2 秒一个关键帧
+    chunks = plan_chunks(keyframes, 3600.0, 8)
+    assert len(chunks) == 8 and chunks[0][0] == 0.0 and chunks[-1][1] is None
+    assert all(start in keyframes for start, _ in chunks)
+    assert all(abs(length - 450.0) <= 2.0 for _, length in chunks[:-1]), chunks
+    assert plan_chunks(keyframes, 15.0, 8) == [(0.0, None)]  # 太短：不切分
+    assert len(plan_chunks([0.0, 50.0], 100.0, 8)) == 2     # 关键帧稀疏：只在可用处切分
+    print(f"✅ 切分为 {len(chunks)} 段: {[start for start, _ in chunks]}")
+
+    # 测试2: 分段命令使用一致的码率控制参数，音频整体编码，最后 -c copy 拼接
+    print("🔹 测试分段导出命令")
+    engine = RecordingEngine()
+    exporter = ExportDistributor(engine=engine)
+    work_dir = tempfile.mkdtemp(prefix="avc_chunked_")
+    source = os.path.join(work_dir, "long.mp4")
+    output = os.path.join(work_dir, "douyin.mp4")
+    info = MediaInfo(source, duration=3600.0, streams=[StreamInfo(0, 'video'), StreamInfo(1, 'audio')])
+    original_probe, original_keyframes = chunked_encoder.probe, chunked_encoder.probe_keyframes
+    chunked_encoder.probe = lambda path: info
+    chunked_encoder.probe_keyframes = lambda path: keyframes
+    try:
+        assert exporter.export_for_platform(source, output, "1080:1920", "8M", chunked=True)
+        video_cmds = [cmd for cmd in engine.commands if '-an' in cmd]
+        audio_cmds = [cmd for cmd in engine.commands if '-vn' in cmd]
+        concat_cmd = engine.commands[-1]
+        assert len(video_cmds) == 4 and len(audio_cmds) == 1  # max_processes=2 → 4 段
+        assert all(option(cmd, '-b:v') == '8M' and option(cmd, '-crf') == '23' and
+                   option(cmd, '-preset') == 'slow' and option(cmd, '-vf') == 'scale=1080:1920'
+                   for cmd in video_cmds)
+        assert [option(cmd, '-ss') for cmd in video_cmds] == ['0.000000', '900.000000', '1800.000000', '2700.000000']
+        assert option(video_cmds[-1], '-t') is None
+        assert option(concat_cmd, '-c') == 'copy' and concat_cmd[-1] == output
+        assert option(concat_cmd, '-movflags') == '+faststart' and concat_cmd.count('-map') == 2
+        assert engine.concat_lists[0].count("file '") == 4
+        assert not [name for name in os.listdir(work_dir) if name.startswith("chunks_")]  # 分段目录已清理
+        print(f"✅ {len(video_cmds)} 个视频分段 + 1 个音频作业 + 1 次无损拼接")
+
+        # 测试3: 无法获取关键帧时退化为一次普通编码
+        print("🔹 测试退化为普通导出")
+        chunked_encoder.probe_keyframes = lambda path: None
+        engine.commands.clear()
+        assert exporter.export_custom(source, output, resolution="1920:1080", chunked=True)
+        assert len(engine.commands) == 1 and option(engine.commands[0], '-vf') == 'scale=1920:1080'
+        print("✅ 退化为单次编码！")
+    finally:
+        chunked_encoder.probe, chunked_encoder.probe_keyframes = original_probe, original_keyframes
+        engine.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("🧩" + " " * 8 + "分段并行导出测试完成。" + " " * 8 + "🧩\n")
+
+
+if __name__ == "__main__":
+    test_chunked_export()
@@ -3,6 +3,7 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from color_correction import ColorCorrection
+from utils import split_top_level
 
 def test_color_correction():
     print("🎨" + " " * 10 + "开始测试 ColorCorrection ..." + " " * 10 + "🎨")
@@ -25,6 +26,7 @@ def test_color_correction():
     output_preset_douyin = os.path.join("outputs", "test_preset_douyin.mp4")
     output_preset_cyberpunk = os.path.join("outputs", "test_preset_cyberpunk.mp4")
     output_preset_fresh = os.path.join("outputs", "test_preset_fresh.mp4")
+    output_graded = os.path.join("outputs", "test_graded.mp4")
 
     os.makedirs("outputs", exist_ok=True)
 
@@ -147,6 +149,38 @@ def test_color_correction():
     else:
         print("❌ 清新预设风格失败！")
 
+    # 测试18: 滤镜链融合（亮度 → 对比度 → 色相 → 锐化，只编码一次）
+    print("🔹 测试滤镜链融合: 亮度 +0.1 → 对比度 1.2 → 色相 30 → 锐化")
+    grade = corrector.chain().adjust_brightness(0.1).adjust_contrast(1.2).apply_hue_shift(30).apply_sharpen()
+    fused_filter = grade.build_filter()
+    assert fused_filter == "eq=contrast=1.2:brightness=0.12,hue=h=30,unsharp=5:5:1.0:5:5:0.0", fused_filter
+    print("✅ 相邻 eq 参数已合并: " + fused_filter)
+    if grade.render(input_video, output_graded):
+        print("✅ 融合调色成功！输出文件: " + output_graded)
+    else:
+        print("❌ 融合调色失败！")
+
+    # 测试19: 含 gamma 的 eq 之后不能再合并线性参数
+    print("🔹 测试滤镜链融合边界: 电影感(含 gamma) → 饱和度")
+    fused_filter = corrector.build_grade_filter([("apply_cinematic_look", {}), ("adjust_saturation", {"saturation": 1.5})])
+    assert fused_filter.count("eq=") == 2, fused_filter
+    print("✅ gamma 之后的 eq 保持独立: " + fused_filter)
+
+    # 测试20: 融合时只按顶层逗号切分，引号、括号内及转义的逗号属于同一个滤镜
+    print("🔹 测试滤镜链融合: 含引号 / 转义逗号的滤镜保持完整")
+    curves = "curves=r='0/0 0.5/0.6':g='0/0,1/1'"
+    geq = "geq=lum='if(gt(X,W/2),lum(X,Y),0)'"
+    drawtext = "drawtext=text=Warm\\,eq=brightness=0.2"
+    assert split_top_level(",".join([curves, geq, drawtext]), ',') == [curves, geq, drawtext]
+
+    class CurvesCorrection(ColorCorrection):
+        def adjust_curves(self, input_path, output_path, **kwargs):
+            return self._run_ffmpeg(['-i', input_path, '-vf', f"{curves},{geq},{drawtext}", output_path])
+
+    fused_filter = CurvesCorrection().build_grade_filter([("adjust_curves", {}), ("adjust_brightness", {"brightness": 0.1})])
+    assert fused_filter == f"{curves},{geq},{drawtext},eq=brightness=0.1", fused_filter
+    print("✅ 曲线点列表、条件表达式与转义文本未被拆开: " + fused_filter)
+
     print("🎨" + " " * 8 + "ColorCorrection 测试完成。" + " " * 8 + "🎨\n")
 
 if __name__ == "__main__":
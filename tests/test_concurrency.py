@@ -0,0 +1,118 @@
+# test_concurrency.py
+import inspect
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from ffmpeg_engine import FFmpegEngine, FFmpegJobMixin
+from video_editor import VideoEditor
+from video_trimmer import VideoTrimmer
+from audio_editor import AudioEditor
+from color_correction import ColorCorrection
+from video_compositor import VideoCompositor
+from export_distributor import ExportDistributor
+
+EDITOR_CLASSES = [VideoEditor, VideoTrimmer, AudioEditor, ColorCorrection, VideoCompositor, ExportDistributor]
+ROUNDS = 4  # 每个公开方法并发调用的次数
+
+
+class RecordingEngine(FFmpegEngine):
+    """只记录命令、不真正启动 ffmpeg 的引擎，用于检查并发调用时命令是否串号"""
+
+    def __init__(self):
+        super().__init__(max_processes=8)
+        self.commands = []
+        self._lock = threading.Lock()
+
+    def _execute(self, full_cmd, label):
+        with self._lock:
+            self.commands.append(list(full_cmd))
+        return True
+
+
+def _build_kwargs(method, token: str, work_dir: str) -> dict:
+    """根据参数名为每次调用生成带唯一标记（token）的参数"""
+    def media(name: str) -> str:
+        return os.path.join(work_dir, f"{token}_{name}")
+
+    values = {
+        'segments': [("1", "2"), ("3", "4")],
+        'speed_map': [("00:00:01", "00:00:02", 2.0)],
+        'speed': 2.0,
+        'start_time': "00:00:01",
+        'end_time': "00:00:02",
+        'effect_expr': "eq=brightness=0.1",
+        'title_text': token,
+        'subtitle_text': token,
+        'resolution': "1080:1920",
+        'bitrate': "5M",
+        'platform': "douyin",
+        'video_paths': [media("a.mp4"), media("b.mp4")],
+        'audio_paths': [media("a.mp3"), media("b.mp3")],
+        'operations': [("adjust_brightness", {"brightness": 0.1}), ("apply_sharpen", {})],
+        'video_args': ['-c:v', 'libx264', '-crf', '23'],
+        'audio_args': ['-c:a', 'aac'],
+        'outputs_by_platform': {'douyin': media("douyin.mp4"), 'bilibili': media("bilibili.mp4")},
+    }
+    kwargs = {}
+    for name, param in list(inspect.signature(method).parameters.items())[1:]:
+        if param.default is not inspect.Parameter.empty:
+            continue
+        if name in values:
+            kwargs[name] = values[name]
+        elif name.endswith('_path'):
+            kwargs[name] = media(name + ".mp4")
+        else:
+            raise AssertionError(f"{method.__qualname__} 的参数 {name} 没有测试取值")
+    return kwargs
+
+
+def test_concurrency():
+    print("🧵" + " " * 10 + "开始测试 并发安全（共享实例 + 线程池）..." + " " * 10 + "🧵")
+    engine = RecordingEngine()
+    work_dir = tempfile.mkdtemp(prefix="avc_concurrency_")
+
+    # 每个类只创建一个实例，所有线程共享
+    calls = []
+    for cls in EDITOR_CLASSES:
+        editor = cls(engine=engine)
+        for name, _ in inspect.getmembers(cls, inspect.isfunction):
+            if name.startswith('_') or hasattr(FFmpegJobMixin, name):
+                continue
+            for _ in range(ROUNDS):
+                token = f"job{len(calls):05d}"
+                method = getattr(editor, name)
+                calls.append((token, f"{cls.__name__}.{name}", method,
+                              _build_kwargs(getattr(cls, name), token, work_dir)))
+
+    # 测试1: 所有公开方法在线程池中并发执行，不抛出异常
+    print(f"🔹 并发执行 {len(calls)} 次公开方法调用（{len(EDITOR_CLASSES)} 个共享实例）")
+    errors = []
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        futures = [(qualname, pool.submit(method, **kwargs)) for _, qualname, method, kwargs in calls]
+        for qualname, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(f"{qualname}: {e!r}")
+    assert not errors, errors
+    print("✅ 全部调用执行完成，无异常！")
+
+    # 测试2: 每条命令只包含本次调用的参数（没有共享状态导致的串号）
+    print(f"🔹 校验 {len(engine.commands)} 条 ffmpeg 命令的参数隔离")
+    token_pattern = re.compile(r"job\d{5}")
+    for cmd in engine.commands:
+        tokens = set(token_pattern.findall(" ".join(cmd)))
+        assert len(tokens) == 1, f"命令中出现多个作业的参数: {cmd}"
+    print("✅ 所有命令参数互相隔离！")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("🧵" + " " * 8 + "并发安全测试完成。" + " " * 8 + "🧵\n")
+
+
+if __name__ == "__main__":
+    test_concurrency()
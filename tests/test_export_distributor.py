@@ -3,6 +3,7 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from export_distributor import ExportDistributor
+from ffmpeg_engine import capture_commands
 
 def test_export_distributor():
     print("📤" + " " * 10 + "开始测试 ExportDistributor ..." + " " * 10 + "📤")
@@ -76,6 +77,23 @@ def test_export_distributor():
     else:
         print("❌ 自定义导出失败！")
 
+    # 测试8: 一次解码导出所有平台（相同分辨率共用缩放分支）
+    print("🔹 测试一次解码导出 5 个平台")
+    outputs_by_platform = {
+        "douyin": output_douyin, "xiaohongshu": output_xiaohongshu, "wechat_video": output_wechat,
+        "bilibili": output_bilibili, "youtube": output_youtube,
+    }
+    with capture_commands() as commands:
+        assert distributor.export_all_platforms(input_video, outputs_by_platform)
+    cmd = commands[0]
+    graph = cmd[cmd.index('-filter_complex') + 1]
+    assert len(commands) == 1 and cmd.count('-i') == 1 and graph.count('scale=') == 2, graph
+    assert [cmd[i + 1] for i, arg in enumerate(cmd) if arg == '-b:v'] == ['8M', '6M', '6M', '8M', '12M']
+    if distributor.export_all_platforms(input_video, outputs_by_platform):
+        print("✅ 多平台导出成功！滤镜图: " + graph)
+    else:
+        print("❌ 多平台导出失败！")
+
     print("📤" + " " * 8 + "ExportDistributor 测试完成。" + " " * 8 + "📤\n")
 
 if __name__ == "__main__":
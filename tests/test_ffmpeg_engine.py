@@ -0,0 +1,76 @@
+# test_ffmpeg_engine.py
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from ffmpeg_engine import FFmpegEngine, FFmpegJobMixin
+
+# 用 Python 解释器模拟一个耗时 0.2 秒的 ffmpeg 进程，测试不依赖 inputs 目录中的素材
+SLEEP_CMD = [sys.executable, '-c', 'import time; time.sleep(0.2)']
+FAIL_CMD = [sys.executable, '-c', 'import sys; sys.exit(1)']
+
+
+class _DemoEditor(FFmpegJobMixin):
+    """最小化的编辑器，用于验证 submit / submit_batch 接口"""
+
+    def __init__(self, engine: FFmpegEngine):
+        self.engine = engine
+
+    def render(self, name: str, fail: bool = False) -> bool:
+        return self.engine.run(FAIL_CMD if fail else SLEEP_CMD, label=f"渲染 {name} 失败")
+
+
+def test_ffmpeg_engine():
+    print("⚙️" + " " * 10 + "开始测试 FFmpegEngine ..." + " " * 10 + "⚙️")
+    engine = FFmpegEngine(max_processes=2)
+
+    # 测试1: 进程并发上限（6 个 0.2 秒作业，2 个名额 → 至少 3 轮）
+    print("🔹 测试进程并发上限: 6 个作业 / 2 个进程名额")
+    start = time.time()
+    futures = [engine.submit_command(SLEEP_CMD) for _ in range(6)]
+    results = [f.result() for f in futures]
+    elapsed = time.time() - start
+    assert all(results), results
+    assert elapsed >= 0.55, f"并发数超出上限，耗时仅 {elapsed:.2f} 秒"
+    print(f"✅ 并发上限生效！耗时 {elapsed:.2f} 秒")
+
+    # 测试2: run_many 按输入顺序返回结果，失败命令返回 False
+    print("🔹 测试 run_many 结果顺序")
+    results = engine.run_many([SLEEP_CMD, FAIL_CMD, SLEEP_CMD])
+    assert results == [True, False, True], results
+    print("✅ run_many 结果顺序正确！")
+
+    # 测试3: 编辑器实例通过 submit_batch 批量提交作业
+    print("🔹 测试编辑器 submit_batch 批量提交")
+    editor = _DemoEditor(engine)
+    futures = editor.submit_batch("render", [("a",), {"name": "b"}, {"name": "c", "fail": True}])
+    assert [f.result() for f in futures] == [True, True, False]
+    print("✅ submit_batch 批量提交成功！")
+
+    # 测试4: 作业内部嵌套调用 run_many 不会死锁
+    print("🔹 测试作业内部嵌套并行")
+    nested = engine.submit(engine.run_many, [SLEEP_CMD] * 4)
+    assert nested.result(timeout=10) == [True] * 4
+    print("✅ 嵌套并行执行成功！")
+
+    # 测试5: 管道串联多条命令，中间结果不落盘，各阶段同时运行
+    print("🔹 测试 run_pipeline 管道串联")
+    output = os.path.join(tempfile.mkdtemp(prefix="avc_pipeline_"), "out.txt")
+    produce = [sys.executable, '-c', 'import sys, time; time.sleep(0.3); sys.stdout.write("frame\\n" * 3)']
+    upper = [sys.executable, '-c', 'import sys, time; time.sleep(0.3); sys.stdout.write(sys.stdin.read().upper())']
+    write = [sys.executable, '-c', f'import sys, time; time.sleep(0.3); open({output!r}, "w").write(sys.stdin.read())']
+    start = time.time()
+    assert engine.run_pipeline([produce, upper, write])
+    elapsed = time.time() - start
+    assert open(output).read() == "FRAME\n" * 3
+    assert elapsed < 0.85, f"管道阶段没有同时运行，耗时 {elapsed:.2f} 秒"
+    assert not engine.run_pipeline([produce, FAIL_CMD, write])
+    print(f"✅ 管道执行成功！3 个阶段耗时 {elapsed:.2f} 秒")
+
+    engine.shutdown()
+    print("⚙️" + " " * 8 + "FFmpegEngine 测试完成。" + " " * 8 + "⚙️\n")
+
+
+if __name__ == "__main__":
+    test_ffmpeg_engine()
@@ -0,0 +1,81 @@
+# test_job_metrics.py
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import write_fake_ffmpeg
+from ffmpeg_engine import FFmpegEngine
+from job_metrics import JobMetrics, parse_output_time
+from operations import OperationRunner
+from color_correction import ColorCorrection
+from video_trimmer import VideoTrimmer
+
+# 模拟 ffmpeg：消耗少量 CPU，输出统计行到标准错误，并把完整参数写入输出文件（最后一个参数）
+FAKE_FFMPEG = """
+import sys
+sum(i * i for i in range(200000))
+sys.stderr.write("frame=  150 fps=30 size=    512kB time=00:00:05.00 bitrate= 838.9kbits/s speed=2.0x\\n")
+open(sys.argv[-1], "w").write(" ".join(sys.argv[1:]))
+"""
+
+
+def test_job_metrics():
+    print("📈" + " " * 10 + "开始测试 作业资源计量 ..." + " " * 10 + "📈")
+    work_dir = tempfile.mkdtemp(prefix="avc_metrics_")
+    ffmpeg = write_fake_ffmpeg(work_dir, FAKE_FFMPEG)
+    source = os.path.join(work_dir, "source.mp4")
+    with open(source, 'wb') as f:
+        f.write(b"\0" * 4096)
+    log_path = os.path.join(work_dir, "jobs.jsonl")
+    textfile = os.path.join(work_dir, "metrics", "autovideoclip.prom")
+    metrics = JobMetrics(log_path, textfile)
+    engine = FFmpegEngine(max_processes=4, metrics=metrics)
+
+    # 测试1: 每条命令记录耗时、CPU、峰值内存、读写字节数与输出时长，并标注发起的操作
+    print("🔹 测试单条命令计量")
+    assert parse_output_time("time=00:00:01.00 ...\rtime=00:01:02.50 bitrate=") == 62.5
+    corrector = ColorCorrection(ffmpeg, engine)
+    output = os.path.join(work_dir, "denoise.mp4")
+    assert corrector.apply_denoise(source, output)
+    record = metrics.records()[-1]
+    assert record.operation == "ColorCorrection.apply_denoise" and record.ok
+    assert record.read_bytes == 4096 and record.write_bytes == os.path.getsize(output)
+    assert record.output_seconds == 5.0 and record.wall_seconds > 0
+    if hasattr(os, 'wait4'):
+        assert record.user_cpu_seconds > 0 and record.max_rss_bytes > 0
+    print(f"✅ {record}，CPU {record.user_cpu_seconds}s，峰值内存 {record.max_rss_bytes} 字节")
+
+    # 测试2: 线程池提交、并行子命令、按名称执行、异步执行都能标注到正确的操作
+    print("🔹 测试操作标注")
+    trimmer = VideoTrimmer(ffmpeg, engine)
+    assert trimmer.submit("trim_by_segments", source, os.path.join(work_dir, "trim.mp4"),
+                          [("1", "2"), ("3", "4")], strategy="seek").result()
+    assert OperationRunner(ffmpeg, engine).run("ColorCorrection.adjust_brightness", {
+        "input_path": source, "output_path": os.path.join(work_dir, "bright.mp4"), "brightness": 0.1})
+    assert asyncio.run(corrector.apply_sharpen_async(source, os.path.join(work_dir, "sharp.mp4")))
+    totals = metrics.totals()
+    assert totals["VideoTrimmer.trim_by_segments"]['jobs_ok'] == 3     # 2 个片段 + 拼接
+    assert totals["ColorCorrection.adjust_brightness"]['jobs_ok'] == 1
+    assert totals["ColorCorrection.apply_sharpen"]['jobs_ok'] == 1
+    print(f"✅ 共 {len(totals)} 个操作：{', '.join(sorted(totals))}")
+
+    # 测试3: 结构化日志与 Prometheus textfile
+    print("🔹 测试日志与指标导出")
+    lines = [json.loads(line) for line in open(log_path, encoding='utf-8')]
+    assert len(lines) == len(metrics.records()) and lines[0]['operation'] == "ColorCorrection.apply_denoise"
+    text = open(textfile, encoding='utf-8').read()
+    assert 'autovideoclip_jobs_total{operation="VideoTrimmer.trim_by_segments",status="ok"} 3' in text
+    assert '# TYPE autovideoclip_job_user_cpu_seconds_total counter' in text
+    assert 'autovideoclip_job_read_bytes_total{operation="ColorCorrection.apply_denoise"} 4096' in text
+    print("✅ 日志与指标导出正确！")
+
+    engine.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("📈" + " " * 8 + "作业资源计量测试完成。" + " " * 8 + "📈\n")
+
+
+if __name__ == "__main__":
+    test_job_metrics()
@@ -0,0 +1,70 @@
+# test_media_factory.py
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import write_fake_ffmpeg
+from ffmpeg_engine import FFmpegEngine
+from media_factory import MediaFactory, MediaSpec
+
+# 模拟 ffmpeg：记录每次调用，并把完整参数写入输出文件（最后一个参数）
+FAKE_FFMPEG = """
+import os, sys
+with open(os.path.join(os.path.dirname(sys.argv[0]), "calls.log"), "a") as log:
+    log.write(" ".join(sys.argv[1:]) + "\\n")
+open(sys.argv[-1], "w").write(" ".join(sys.argv[1:]))
+"""
+
+
+def _calls(work_dir: str) -> list:
+    log = os.path.join(work_dir, "calls.log")
+    return open(log).read().splitlines() if os.path.exists(log) else []
+
+
+def test_media_factory():
+    print("🏗️" + " " * 10 + "开始测试 合成素材工厂 ..." + " " * 10 + "🏗️")
+    work_dir = tempfile.mkdtemp(prefix="avc_media_")
+    engine = FFmpegEngine(max_processes=4)
+    factory = MediaFactory(os.path.join(work_dir, "cache"), write_fake_ffmpeg(work_dir, FAKE_FFMPEG), engine)
+
+    # 测试1: 规格决定 lavfi 来源、编码参数与缓存文件名
+    print("🔹 测试素材规格")
+    spec = MediaSpec.video(60, 1920, 1080, fps=60, video_codec='libx265', audio_layout='5.1', audio_source='noise')
+    args = spec.ffmpeg_args("out.mp4")
+    assert "testsrc2=size=1920x1080:rate=60:duration=60" in args and any(a.startswith("anoisesrc=") for a in args)
+    assert args[args.index('-c:v') + 1] == 'libx265' and args[args.index('-ac') + 1] == '6'
+    assert args[args.index('-g') + 1] == '120' and '+bitexact' in args
+    silent = MediaSpec.video(5, audio_layout='none').ffmpeg_args("out.mp4")
+    assert '-c:a' not in silent and args.count('-f') == 2 and silent.count('-f') == 1
+    assert MediaSpec.audio(5).audio_codec == 'libmp3lame' and MediaSpec.audio(5, extension='.wav').audio_codec == 'pcm_s16le'
+    assert spec.key() == MediaSpec.video(60, 1920, 1080, fps=60, video_codec='libx265', audio_layout='5.1',
+                                         audio_source='noise').key() != MediaSpec.video(60, 1920, 1080).key()
+    print("✅ 素材规格正确: " + spec.filename())
+
+    # 测试2: 按规格缓存：相同规格只生成一次
+    print("🔹 测试缓存")
+    first = factory.video(duration=2)
+    assert first and factory.video(duration=2) == first and len(_calls(work_dir)) == 1
+    assert factory.audio(duration=2) != first and len(_calls(work_dir)) == 2
+    print("✅ 相同规格只生成一次！")
+
+    # 测试3: 补齐 inputs 目录：只生成缺失的文件，已有文件不覆盖
+    print("🔹 测试补齐测试素材")
+    inputs_dir = os.path.join(work_dir, "inputs")
+    os.makedirs(inputs_dir)
+    with open(os.path.join(inputs_dir, "logo.png"), 'w') as f:
+        f.write("hand-placed")
+    status = factory.ensure_test_inputs(inputs_dir)
+    assert all(status.values()) and "cat_01.mp4" in status and "bgm.mp3" in status
+    assert open(os.path.join(inputs_dir, "logo.png")).read() == "hand-placed"
+    assert not [name for name in os.listdir(factory.cache_dir) if ".partial" in name]
+    print(f"✅ 已补齐 {len(status)} 个测试素材！")
+
+    engine.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("🏗️" + " " * 8 + "合成素材工厂测试完成。" + " " * 8 + "🏗️\n")
+
+
+if __name__ == "__main__":
+    test_media_factory()
@@ -0,0 +1,109 @@
+# test_media_probe.py
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from media_probe import MediaInfo, clear_probe_cache, probe, set_probe_cache_dir
+
+# 模拟 ffprobe 的 JSON 输出：一路 1080x1920 视频 + 一路 AAC 音频
+FAKE_OUTPUT = {
+    "streams": [
+        {"index": 0, "codec_type": "video", "codec_name": "h264", "width": 1080, "height": 1920,
+         "avg_frame_rate": "30000/1001", "r_frame_rate": "30/1", "pix_fmt": "yuv420p", "start_time": "0.033"},
+        {"index": 1, "codec_type": "audio", "codec_name": "aac", "sample_rate": "44100", "channels": 2,
+         "start_time": "0.000000", "bit_rate": "128000"},
+    ],
+    "format": {"format_name": "mov,mp4,m4a,3gp,3g2,mj2", "duration": "12.500000", "start_time": "0.000000",
+               "size": "1024", "bit_rate": "8000000"},
+}
+
+
+def _write_fake_ffprobe(work_dir: str, counter: str) -> str:
+    """生成一个可执行的假 ffprobe：每次调用在计数文件中追加一个字符，并输出固定 JSON"""
+    script = os.path.join(work_dir, "fake_ffprobe")
+    with open(script, 'w', encoding='utf-8') as f:
+        f.write(f"#!{sys.executable}\n")
+        f.write(f"open({counter!r}, 'a').write('x')\n")
+        f.write(f"print({json.dumps(json.dumps(FAKE_OUTPUT))})\n")
+    os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+    return script
+
+
+def test_media_probe():
+    print("🔍" + " " * 10 + "开始测试 media_probe（统一媒体探测）..." + " " * 10 + "🔍")
+    work_dir = tempfile.mkdtemp(prefix="avc_media_probe_")
+    counter = os.path.join(work_dir, "calls.txt")
+    ffprobe = _write_fake_ffprobe(work_dir, counter)
+    media = os.path.join(work_dir, "clip.mp4")
+    with open(media, 'wb') as f:
+        f.write(b"\0" * 1024)
+
+    def calls():
+        return len(open(counter).read()) if os.path.exists(counter) else 0
+
+    clear_probe_cache()
+
+    # 测试1: 解析格式与流信息
+    print("🔹 测试解析 ffprobe JSON")
+    info = probe(media, ffprobe_cmd=ffprobe)
+    assert isinstance(info, MediaInfo)
+    assert info.duration == 12.5 and info.resolution == (1080, 1920)
+    assert round(info.fps, 2) == 29.97 and info.has_audio and info.audio.sample_rate == 44100
+    assert info.video.start_time == 0.033
+    assert not hasattr(info, '__dict__')
+    print(f"✅ 解析成功: {info}")
+
+    # 测试2: 同一文件多次查询只调用一次 ffprobe
+    print("🔹 测试内存缓存")
+    for _ in range(5):
+        assert probe(media, ffprobe_cmd=ffprobe) is info
+    assert calls() == 1, calls()
+    print("✅ 6 次查询只调用 1 次 ffprobe！")
+
+    # 测试3: 文件被修改后重新探测
+    print("🔹 测试文件修改后缓存失效")
+    with open(media, 'ab') as f:
+        f.write(b"\0")
+    probe(media, ffprobe_cmd=ffprobe)
+    assert calls() == 2, calls()
+    print("✅ 文件大小 / 修改时间变化后重新探测！")
+
+    # 测试4: 磁盘缓存在内存缓存清空后（如新进程）仍然有效
+    print("🔹 测试磁盘缓存")
+    set_probe_cache_dir(os.path.join(work_dir, "probe_cache"))
+    try:
+        clear_probe_cache()
+        probe(media, ffprobe_cmd=ffprobe)
+        clear_probe_cache()
+        restored = probe(media, ffprobe_cmd=ffprobe)
+        assert calls() == 3, calls()
+        assert restored.to_dict() == probe(media, ffprobe_cmd=ffprobe).to_dict()
+        assert restored.resolution == (1080, 1920)
+    finally:
+        set_probe_cache_dir(None)
+    print("✅ 磁盘缓存命中，无需再次调用 ffprobe！")
+
+    # 测试5: 文件不存在时返回 None，不启动 ffprobe
+    print("🔹 测试不存在的文件")
+    assert probe(os.path.join(work_dir, "missing.mp4"), ffprobe_cmd=ffprobe) is None
+    assert calls() == 3
+    print("✅ 不存在的文件直接返回 None！")
+
+    # 测试6: 真实文件探测
+    print("🔹 测试真实视频探测")
+    real_info = probe(os.path.join("inputs", "cat_01.mp4"))
+    if real_info is not None:
+        print(f"✅ 探测成功: 时长 {real_info.duration}s，分辨率 {real_info.resolution}，音频 {real_info.has_audio}")
+    else:
+        print("❌ 探测失败！")
+
+    clear_probe_cache()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("🔍" + " " * 8 + "media_probe 测试完成。" + " " * 8 + "🔍\n")
+
+
+if __name__ == "__main__":
+    test_media_probe()
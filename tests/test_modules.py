@@ -24,6 +24,25 @@ from test_video_compositor import test_video_compositor
 from test_export_distributor import test_export_distributor
 from test_audio_editor import test_audio_editor
 from test_color_correction import test_color_correction
+from test_ffmpeg_engine import test_ffmpeg_engine
+from test_concurrency import test_concurrency
+from test_project import test_project
+from test_render_cache import test_render_cache
+from test_media_probe import test_media_probe
+from test_start_pts import test_start_pts
+from test_async_api import test_async_api
+from test_progress import test_progress
+from test_render_tier import test_render_tier
+from test_proxy import test_proxy
+from test_chunked_export import test_chunked_export
+from test_render_farm import test_render_farm
+from test_smart_cut import test_smart_cut
+from test_resource_governor import test_resource_governor
+from test_benchmark import test_benchmark
+from test_media_factory import test_media_factory
+from test_job_metrics import test_job_metrics
+from test_batch_cli import test_batch_cli
+from test_watch_folder import test_watch_folder
 
 
 class TestRunner:
@@ -94,6 +113,25 @@ class TestRunner:
             (test_export_distributor, "ExportDistributor - 导出分发器"),
             (test_audio_editor, "AudioEditor - 音频编辑器"),
             (test_color_correction, "ColorCorrection - 色彩校正器"),
+            (test_ffmpeg_engine, "FFmpegEngine - 执行引擎"),
+            (test_concurrency, "Concurrency - 并发安全"),
+            (test_project, "Project - 惰性工程图"),
+            (test_render_cache, "RenderCache - 渲染缓存"),
+            (test_media_probe, "media_probe - 媒体探测"),
+            (test_start_pts, "起始时间戳检测"),
+            (test_async_api, "异步 API"),
+            (test_progress, "进度上报"),
+            (test_render_tier, "渲染档位"),
+            (test_proxy, "代理工作流"),
+            (test_chunked_export, "分段并行导出"),
+            (test_render_farm, "分布式渲染"),
+            (test_smart_cut, "智能剪切"),
+            (test_resource_governor, "资源调度"),
+            (test_benchmark, "性能基准"),
+            (test_media_factory, "合成素材工厂"),
+            (test_job_metrics, "作业资源计量"),
+            (test_batch_cli, "批处理命令行"),
+            (test_watch_folder, "监视文件夹"),
         ]
 
         print(f"\n📋 计划执行 {len(tests_to_run)} 个测试模块:\n")
@@ -0,0 +1,91 @@
+# test_progress.py
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import write_fake_ffmpeg
+from ffmpeg_engine import FFmpegEngine
+from ffmpeg_progress import ProgressParser, report_progress
+from color_correction import ColorCorrection
+from export_distributor import ExportDistributor
+
+# 模拟 ffmpeg：收到 -progress pipe:1 时每 0.05 秒输出一个进度块（共 4 个），最后写出输出文件
+FAKE_FFMPEG = """
+import sys, time
+args = sys.argv[1:]
+if "-progress" in args:
+    for i in range(1, 5):
+        print(f"frame={i * 30}\\nfps=60.00\\nbitrate=2048.0kbits/s\\ntotal_size={i * 1000}\\n"
+              f"out_time_us={i * 1000000}\\nout_time=00:00:0{i}.000000\\nspeed=2.00x\\n"
+              f"progress={'end' if i == 4 else 'continue'}", flush=True)
+        time.sleep(0.05)
+sys.stderr.write("x" * 200000)  # 大量日志输出，确保不会因管道写满而阻塞
+open(args[-1], "w").write(" ".join(args))
+"""
+
+
+def test_progress():
+    print("📈" + " " * 10 + "开始测试 进度上报（-progress）..." + " " * 10 + "📈")
+    work_dir = tempfile.mkdtemp(prefix="avc_progress_")
+    ffmpeg = write_fake_ffmpeg(work_dir, FAKE_FFMPEG)
+    engine = FFmpegEngine(max_processes=2)
+    corrector = ColorCorrection(ffmpeg, engine=engine)
+    exporter = ExportDistributor(ffmpeg, engine=engine)
+    source = os.path.join(work_dir, "source.mp4")
+    open(source, 'w').close()
+
+    # 测试1: 解析 -progress 输出块
+    print("🔹 测试进度块解析")
+    parser = ProgressParser("测试")
+    lines = ["frame=90", "fps=29.97", "bitrate=N/A", "total_size=4096", "out_time_us=3000000", "speed=1.5x"]
+    assert all(parser.feed(line) is None for line in lines)
+    event = parser.feed("progress=continue")
+    assert (event.frame, event.fps, event.bitrate, event.total_size, event.out_time, event.speed) == \
+           (90, 29.97, None, 4096, 3.0, 1.5)
+    assert event.percent(12.0) == 25.0 and event.eta(12.0) == 6.0 and not event.finished
+    print(f"✅ 解析成功: {event}")
+
+    # 测试2: 同步调用在 report_progress 上下文中回调进度
+    print("🔹 测试同步方法的进度回调")
+    events = []
+    output = os.path.join(work_dir, "bright.mp4")
+    with report_progress(events.append):
+        assert corrector.adjust_brightness(source, output, brightness=0.1)
+    assert [e.frame for e in events] == [30, 60, 90, 120] and events[-1].finished
+    assert events[-1].out_time == 4.0 and events[-1].speed == 2.0
+    print(f"✅ 收到 {len(events)} 次进度报告: {events[-1]}")
+
+    # 测试3: 未设置回调时命令不附带 -progress
+    print("🔹 测试默认不附带 -progress")
+    assert corrector.adjust_brightness(source, output, brightness=0.2)
+    assert "-progress" not in open(output).read()
+    print("✅ 默认命令保持不变！")
+
+    # 测试4: submit() 提交到线程池的作业同样回调进度
+    print("🔹 测试 submit() 的进度回调")
+    events = []
+    with report_progress(events.append):
+        future = exporter.submit("export_for_douyin", source, os.path.join(work_dir, "douyin.mp4"))
+    assert future.result() and len(events) == 4
+    print("✅ 线程池作业进度回调成功！")
+
+    # 测试5: 异步迭代器
+    print("🔹 测试 stream_progress 异步迭代")
+
+    async def consume():
+        stream = corrector.stream_progress("apply_sharpen", source, os.path.join(work_dir, "sharp.mp4"))
+        frames = [event.frame async for event in stream]
+        return frames, await stream
+
+    frames, ok = asyncio.run(consume())
+    assert ok is True and frames == [30, 60, 90, 120], frames
+    print(f"✅ 异步迭代收到帧数: {frames}")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("📈" + " " * 8 + "进度上报测试完成。" + " " * 8 + "📈\n")
+
+
+if __name__ == "__main__":
+    test_progress()
@@ -0,0 +1,106 @@
+# test_project.py
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from project import Project, optimize_video_filters
+
+
+def test_project():
+    print("🗂️" + " " * 10 + "开始测试 Project（惰性工程图）..." + " " * 10 + "🗂️")
+    input_video = os.path.join("inputs", "cat_01.mp4")
+    watermark = os.path.join("inputs", "watermark.png")
+    output_final = os.path.join("outputs", "test_project_douyin.mp4")
+
+    os.makedirs("outputs", exist_ok=True)
+
+    # 测试1: 剪辑 → 调色 → 标题 → 水印 → 导出，编译为一次 ffmpeg 调用
+    print("🔹 测试工程编译: 多段剪辑 → 调色 → 标题 → 水印 → 抖音导出")
+    project = Project(input_video, source_resolution=(3840, 2160))
+    project.trimmer.trim_by_segments([("5", "10"), ("15", "20")])
+    project.color.adjust_brightness(0.1)
+    project.color.adjust_contrast(1.2)
+    project.compositor.add_title("测试标题")
+    project.editor.add_watermark(watermark, position="top-right")
+    project.exporter.export_for_douyin()
+    steps = project.compile(output_final)
+    assert len(steps) == 1 and steps[0].args is not None, steps
+    graph = steps[0].args[steps[0].args.index('-filter_complex') + 1]
+    assert "eq=contrast=1.2:brightness=0.12" in graph, graph
+    assert steps[0].args.count('-i') == 2
+    print(f"✅ {len(project.nodes)} 个节点编译为 1 次 ffmpeg 调用！")
+
+    # 测试2: 启用重排时高开销滤镜移动到导出缩小分辨率之后（默认不重排）
+    print("🔹 测试开销优化: 降噪 → 调色 → 导出缩放（4K → 1080x1920）")
+    project = Project(input_video, source_resolution=(3840, 2160), reorder_expensive_filters=True)
+    project.color.apply_denoise()
+    project.color.apply_cinematic_look()
+    project.exporter.export_for_douyin()
+    graph = project.compile(output_final)[0].args
+    graph = graph[graph.index('-filter_complex') + 1]
+    assert graph.index("scale=1080:1920") < graph.index("hqdn3d"), graph
+    print("✅ hqdn3d 已移动到 scale 之后: " + graph)
+    project.reorder_expensive_filters = False
+    graph = project.compile(output_final)[0].args
+    graph = graph[graph.index('-filter_complex') + 1]
+    assert graph.index("hqdn3d") < graph.index("scale=1080:1920"), graph
+    print("✅ 默认保持原有滤镜顺序！")
+
+    # 测试3: 文字 / 叠加 / 与时间有关的滤镜之前的降噪不能移动
+    print("🔹 测试开销优化边界: drawtext / trim / fade 阻止重排")
+    blocked = [["unsharp=5:5:1.0:5:5:0.0", "drawtext=text='a'", "scale=640:360"],
+               ["hqdn3d=4:3:6:4", "trim=start=5", "setpts=PTS-STARTPTS", "scale=1080:1920"],
+               ["unsharp=5:5:1.0", "fade=t=in:d=1", "scale=540:960"]]
+    for chain in blocked:
+        filters, _ = optimize_video_filters(chain, (3840, 2160), reorder_expensive=True)
+        assert filters == chain, filters
+    chain = ["unsharp=5:5:1.0:5:5:0.0", "hue=h=30", "scale=640:360"]
+    filters, size = optimize_video_filters(chain, (1920, 1080), reorder_expensive=True)
+    assert filters == ["hue=h=30", "scale=640:360", "unsharp=5:5:1.0:5:5:0.0"] and size == (640, 360), filters
+    assert optimize_video_filters(chain, (1920, 1080)) == (chain, (640, 360))
+    print("✅ 重排规则正确！")
+
+    # 测试4: 需要读取输入时长的节点单独渲染，其余节点仍然融合
+    print("🔹 测试不可融合节点: 淡入淡出（依赖时长）")
+    project = Project(input_video, source_resolution=(1920, 1080))
+    project.editor.cut_video("00:00:02", "00:00:12")
+    project.trimmer.apply_fade_transition("1.0")
+    project.exporter.export_for_bilibili()
+    steps = project.compile(output_final)
+    assert [step.args is None for step in steps] == [False, True, False], steps
+    print(f"✅ 编译为 {len(steps)} 步: {steps}")
+
+    # 测试5: 流式管道编译：中间阶段以 NUT 写到标准输出，只有最后一个阶段写磁盘
+    print("🔹 测试流式管道编译: 多段剪辑 → 预设风格 → 标题")
+    project = Project(input_video, source_resolution=(1920, 1080))
+    project.trimmer.trim_by_segments([("5", "10"), ("15", "20")])
+    project.color.apply_preset_style(style="cyberpunk")
+    project.compositor.add_title("测试标题")
+    steps = project.compile_piped(output_final)
+    assert len(steps) == 1 and len(steps[0].pipeline) == 3, steps
+    first, middle, last = steps[0].pipeline
+    assert first[:2] == ['-i', input_video] and first[-3:] == ['-f', 'nut', 'pipe:1']
+    assert middle[:4] == ['-f', 'nut', '-i', 'pipe:0'] and middle[-1] == 'pipe:1'
+    assert last[-1] == output_final and 'nut' not in last[4:]
+    print(f"✅ 编译为 {len(steps[0].pipeline)} 个同时运行的管道阶段！")
+
+    # 测试6: 实际渲染
+    print("🔹 测试工程渲染")
+    project = Project(input_video)
+    project.trimmer.trim_by_segments([("5", "10"), ("15", "20")])
+    project.color.apply_denoise()
+    project.compositor.add_title("测试标题")
+    project.exporter.export_for_douyin()
+    if project.render(output_final):
+        print("✅ 工程渲染成功！输出文件: " + output_final)
+    else:
+        print("❌ 工程渲染失败！")
+    if project.render(output_final, streaming=True):
+        print("✅ 流式管道渲染成功！输出文件: " + output_final)
+    else:
+        print("❌ 流式管道渲染失败！")
+
+    print("🗂️" + " " * 8 + "Project 测试完成。" + " " * 8 + "🗂️\n")
+
+
+if __name__ == "__main__":
+    test_project()
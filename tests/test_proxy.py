@@ -0,0 +1,68 @@
+# test_proxy.py
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import write_fake_ffmpeg
+from ffmpeg_engine import FFmpegEngine
+from project import Project
+from proxy_manager import ProxyManager
+
+
+def test_proxy():
+    print("🪶" + " " * 10 + "开始测试 代理工作流..." + " " * 10 + "🪶")
+    work_dir = tempfile.mkdtemp(prefix="avc_proxy_")
+    ffmpeg = write_fake_ffmpeg(work_dir)
+    engine = FFmpegEngine(max_processes=2)
+    source = os.path.join(work_dir, "source_4k.mp4")
+    open(source, 'w').write("4k")
+    proxies = ProxyManager(os.path.join(work_dir, "proxies"), max_size=960, ffmpeg_cmd=ffmpeg, engine=engine)
+
+    # 测试1: 后台生成全帧内编码的低分辨率代理
+    print("🔹 测试后台生成代理")
+    assert proxies.get(source, wait=False) is None
+    assert proxies.prepare(source).result()
+    proxy = proxies.get(source, wait=False)
+    command = open(proxy).read()
+    assert "-g 1" in command and "min(960" in command and source in command
+    assert not [name for name in os.listdir(proxies.cache_dir) if name.endswith('.partial.mp4')]
+    print("✅ 代理已生成: " + os.path.basename(proxy))
+
+    # 测试2: 已生成的代理直接复用；源文件变化后使用新的代理路径
+    print("🔹 测试代理缓存与失效")
+    assert proxies.prepare(source).result() and proxies.get(source) == proxy
+    time.sleep(0.01)
+    open(source, 'w').write("4k, edited")
+    assert proxies.proxy_path(source) != proxy and not proxies.has_proxy(source)
+    assert proxies.get(source) == proxies.proxy_path(source)
+    print("✅ 缓存与失效正确！")
+
+    # 测试3: 试渲染（无导出节点）在代理上执行
+    print("🔹 测试工程试渲染使用代理")
+    project = Project(source, ffmpeg, engine, source_resolution=(3840, 2160), proxies=proxies)
+    project.color.adjust_brightness(0.1)
+    project.color.apply_denoise()
+    draft = os.path.join(work_dir, "draft.mp4")
+    assert project.render(draft)
+    assert proxies.get(source) in open(draft).read()
+    print("✅ 试渲染输入: " + os.path.basename(proxies.get(source)))
+
+    # 测试4: 加入导出节点后，同一份节点列表自动换回原始素材渲染成片
+    print("🔹 测试导出时换回原始素材")
+    project.exporter.export_for_douyin()
+    final = os.path.join(work_dir, "final.mp4")
+    assert project.render(final)
+    command = open(final).read()
+    assert f"-i {source} " in command and ".proxy.mp4" not in command and "scale=1080:1920" in command
+    assert project.render(final, use_proxy=True) and ".proxy.mp4" in open(final).read()
+    print("✅ 成片渲染使用原始素材！")
+
+    engine.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("🪶" + " " * 8 + "代理工作流测试完成。" + " " * 8 + "🪶\n")
+
+
+if __name__ == "__main__":
+    test_proxy()
@@ -0,0 +1,114 @@
+# test_render_cache.py
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from ffmpeg_engine import FFmpegEngine
+from render_cache import RenderCache
+
+# 用 Python 模拟 ffmpeg：把输入内容 + 参数写入输出文件，并在计数文件中记录一次执行
+FAKE_FFMPEG = (
+    "import sys\n"
+    "args = sys.argv[1:]\n"
+    "data = open(args[args.index('-i') + 1], 'rb').read()\n"
+    "open(args[-1], 'wb').write(data + ' '.join(args[:-1]).encode())\n"
+    "open(args[0], 'a').write('x')\n"
+)
+
+
+def test_render_cache():
+    print("🗄️" + " " * 10 + "开始测试 RenderCache（渲染缓存）..." + " " * 10 + "🗄️")
+    work_dir = tempfile.mkdtemp(prefix="avc_render_cache_")
+    counter = os.path.join(work_dir, "runs.txt")
+    source = os.path.join(work_dir, "source.mp4")
+    with open(source, 'wb') as f:
+        f.write(b"frame" * 1000)
+
+    cache = RenderCache(os.path.join(work_dir, "cache"))
+    engine = FFmpegEngine(max_processes=2, cache=cache)
+
+    def render(input_path, output_path, vf="eq=brightness=0.1"):
+        return engine.run([sys.executable, '-c', FAKE_FFMPEG, counter, '-i', input_path, '-vf', vf, output_path])
+
+    def runs():
+        return len(open(counter).read()) if os.path.exists(counter) else 0
+
+    # 测试1: 第一次渲染未命中，第二次渲染（不同输出路径）直接命中
+    print("🔹 测试相同输入 + 相同参数命中缓存")
+    assert render(source, os.path.join(work_dir, "graded_1.mp4"))
+    assert render(source, os.path.join(work_dir, "graded_2.mp4"))
+    assert runs() == 1, runs()
+    assert open(os.path.join(work_dir, "graded_2.mp4"), 'rb').read() == open(os.path.join(work_dir, "graded_1.mp4"), 'rb').read()
+    assert os.stat(os.path.join(work_dir, "graded_2.mp4")).st_nlink > 1
+    print(f"✅ 第二次渲染命中缓存（硬链接生成），统计: {cache.stats}")
+
+    # 测试2: 下游步骤在上游命中后继续命中（修改时间保持不变）
+    print("🔹 测试流水线重跑: 上游命中 → 下游命中")
+    assert render(os.path.join(work_dir, "graded_1.mp4"), os.path.join(work_dir, "final_1.mp4"), "scale=640:360")
+    assert render(source, os.path.join(work_dir, "graded_3.mp4"))
+    assert render(os.path.join(work_dir, "graded_3.mp4"), os.path.join(work_dir, "final_2.mp4"), "scale=640:360")
+    assert runs() == 2, runs()
+    print("✅ 只改变导出参数时上游步骤不会重新渲染！")
+
+    # 测试3: 参数或输入内容变化时重新渲染，且覆盖输出不会改写缓存对象
+    print("🔹 测试参数 / 输入变化时不命中")
+    cached_copy = open(os.path.join(work_dir, "graded_2.mp4"), 'rb').read()
+    assert render(source, os.path.join(work_dir, "graded_2.mp4"), "eq=brightness=0.2")
+    assert runs() == 3, runs()
+    with open(source, 'ab') as f:
+        f.write(b"more")
+    assert render(source, os.path.join(work_dir, "graded_4.mp4"))
+    assert runs() == 4, runs()
+    assert open(os.path.join(work_dir, "graded_1.mp4"), 'rb').read() == cached_copy
+    print("✅ 参数 / 输入变化后重新渲染，缓存对象未被覆盖！")
+
+    # 测试4: 超出容量上限时按 LRU 淘汰
+    print("🔹 测试容量上限与 LRU 淘汰")
+    cache.max_bytes = os.path.getsize(os.path.join(work_dir, "graded_4.mp4")) + 10
+    cache.evict()
+    assert cache.usage() <= cache.max_bytes
+    assert cache.stats['evictions'] > 0
+    print(f"✅ 淘汰完成，当前占用 {cache.usage()} 字节，统计: {cache.stats}")
+
+    # 测试5: 管道输出 / 多个输出的命令不缓存
+    print("🔹 测试不可缓存的命令")
+    assert cache.key_for(['ffmpeg', '-i', source, '-f', 'nut', 'pipe:1']) is None
+    assert cache.key_for(['ffmpeg', '-i', source, os.path.join(work_dir, "a.mp4"), os.path.join(work_dir, "b.mp4")]) is None
+    assert cache.key_for(['ffmpeg', '-i', os.path.join(work_dir, "missing.mp4"), os.path.join(work_dir, "c.mp4")]) is None
+    print("✅ 不可缓存的命令正确跳过！")
+
+    # 测试6: concat 列表中的相对路径相对于列表文件所在目录解析（与 concat 分离器一致），并解码 '\\'' 转义
+    print("🔹 测试 concat 列表的相对路径")
+    list_dir, decoy_dir = os.path.join(work_dir, "lists"), os.path.join(work_dir, "decoy")
+    os.makedirs(list_dir)
+    os.makedirs(decoy_dir)
+    for directory in (list_dir, decoy_dir):
+        for name in ("clip.mp4", "it's.mp4"):
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(directory.encode())
+    list_file = os.path.join(list_dir, "parts.txt")
+    with open(list_file, 'w', encoding='utf-8') as f:
+        f.write("file 'clip.mp4'\nfile 'it'\\''s.mp4'\n")
+    concat = ['ffmpeg', '-f', 'concat', '-safe', '0', '-i', list_file, '-c', 'copy', os.path.join(work_dir, "m.mp4")]
+    original_cwd = os.getcwd()
+    os.chdir(decoy_dir)  # 当前目录中有同名文件
+    try:
+        key = cache.key_for(concat)
+        assert key is not None
+        with open(os.path.join(decoy_dir, "clip.mp4"), 'ab') as f:
+            f.write(b"decoy changed")
+        assert cache.key_for(concat) == key
+        with open(os.path.join(list_dir, "it's.mp4"), 'ab') as f:
+            f.write(b"listed file changed")
+        assert cache.key_for(concat) != key
+    finally:
+        os.chdir(original_cwd)
+    print("✅ 相对路径按列表文件目录解析！")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("🗄️" + " " * 8 + "RenderCache 测试完成。" + " " * 8 + "🗄️\n")
+
+
+if __name__ == "__main__":
+    test_render_cache()
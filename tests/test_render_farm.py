@@ -0,0 +1,99 @@
+# test_render_farm.py
+import os
+import shutil
+import sys
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import write_fake_ffmpeg
+from job_queue import FileJobQueue, JobResult, RenderJob
+from operations import list_operations, resolve_operation
+from render_farm import RenderCoordinator, RenderWorker
+from color_correction import ColorCorrection
+
+
+def test_render_farm():
+    print("🏭" + " " * 10 + "开始测试 分布式渲染（协调者 / 执行者）..." + " " * 10 + "🏭")
+    work_dir = tempfile.mkdtemp(prefix="avc_farm_")
+    ffmpeg = write_fake_ffmpeg(work_dir)
+    queue_dir = os.path.join(work_dir, "queue")
+    source = os.path.join(work_dir, "source.mp4")
+    open(source, 'w').close()
+
+    # 测试1: 操作名解析
+    print("🔹 测试操作名解析")
+    assert resolve_operation("ColorCorrection.apply_denoise") == (ColorCorrection, "apply_denoise")
+    assert "ExportDistributor.export_for_douyin" in list_operations()
+    for bad in ("Nothing.run", "ColorCorrection._run_ffmpeg", "ColorCorrection.missing"):
+        try:
+            resolve_operation(bad)
+            raise AssertionError(f"{bad} 应该解析失败")
+        except ValueError:
+            pass
+    print("✅ 操作名解析正确！")
+
+    # 测试2: 一个作业只能被领取一次；心跳超时的作业重新入队
+    print("🔹 测试作业领取与重新入队")
+    queue = FileJobQueue(os.path.join(work_dir, "claims"))
+    job_id = queue.put(RenderJob("ColorCorrection.apply_denoise", {"input_path": "a", "output_path": "b"}))
+    claimed = queue.claim()
+    assert claimed.job_id == job_id and queue.claim() is None
+    os.utime(os.path.join(queue.root, "running", f"{job_id}.json"), (0, 0))
+    assert queue.requeue_stale(max_age=60) == [job_id] and queue.counts()['pending'] == 1
+    print("✅ 领取与重新入队正确！")
+
+    # 测试2.1: 重新入队后旧执行者与新执行者同时完成同一作业（进程号相同，如不同主机上），完成记录仍然完整
+    print("🔹 测试并发完成同一作业")
+    errors = []
+
+    def complete(worker):
+        try:
+            for _ in range(30):
+                queue.complete(claimed, JobResult(job_id, True, worker, 0.0, 1.0))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=complete, args=(f"host{i}:1",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+    assert FileJobQueue._read(os.path.join(queue.root, "done", f"{job_id}.json"))['result']['ok']
+    assert not [name for name in os.listdir(os.path.join(queue.root, "done")) if name.endswith(".tmp")]
+    print("✅ 完成记录未被并发写入破坏！")
+
+    # 测试3: 本机多个执行者进程并行执行作业，并回报执行者与耗时
+    print("🔹 测试本机执行者进程")
+    coordinator = RenderCoordinator(queue_dir)
+    job_ids = coordinator.submit_many("ColorCorrection.adjust_brightness", [
+        {"input_path": source, "output_path": os.path.join(work_dir, f"bright_{i}.mp4"), "brightness": i / 10}
+        for i in range(6)])
+    job_ids.append(coordinator.submit("VideoTrimmer.trim_by_segments", input_path=source,
+                                      output_path=os.path.join(work_dir, "trim.mp4"), segments=[["1", "2"], ["3", "4"]]))
+    workers = coordinator.start_local_workers(2, ffmpeg_cmd=ffmpeg, idle_timeout=1.0)
+    results = coordinator.wait(job_ids, timeout=60)
+    for process in workers:
+        process.wait(timeout=30)
+    assert len(results) == len(job_ids) and all(result.ok for result in results.values()), results
+    assert "eq=brightness=0.5" in open(os.path.join(work_dir, "bright_5.mp4")).read()
+    assert all(result.duration >= 0 and result.worker for result in results.values())
+    print(f"✅ {len(results)} 个作业由 {len({r.worker for r in results.values()})} 个执行者完成")
+
+    # 测试4: 执行失败的作业记录错误信息，执行者继续运行
+    print("🔹 测试失败作业")
+    bad_id = coordinator.queue.put(RenderJob("ColorCorrection.adjust_brightness", {"input_path": source}))
+    good_id = coordinator.submit("ColorCorrection.apply_sharpen", input_path=source,
+                                 output_path=os.path.join(work_dir, "sharp.mp4"))
+    worker = RenderWorker(queue_dir, ffmpeg_cmd=ffmpeg)
+    assert worker.run(idle_timeout=0) == 2
+    bad, good = coordinator.queue.result(bad_id), coordinator.queue.result(good_id)
+    assert not bad.ok and "output_path" in bad.error and good.ok
+    print("✅ 失败作业已记录: " + bad.error.strip().splitlines()[-1])
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("🏭" + " " * 8 + "分布式渲染测试完成。" + " " * 8 + "🏭\n")
+
+
+if __name__ == "__main__":
+    test_render_farm()
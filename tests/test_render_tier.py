@@ -0,0 +1,89 @@
+# test_render_tier.py
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import RecordingEngine, option
+from render_tier import apply_tier, render_tier, set_default_tier
+from video_editor import VideoEditor
+from color_correction import ColorCorrection
+from export_distributor import ExportDistributor
+
+
+def test_render_tier():
+    print("🎚️" + " " * 10 + "开始测试 渲染档位（draft / preview / final）..." + " " * 10 + "🎚️")
+    engine = RecordingEngine()
+    editor = VideoEditor(engine=engine)
+    corrector = ColorCorrection(engine=engine)
+    exporter = ExportDistributor(engine=engine)
+    input_video = os.path.join("inputs", "cat_01.mp4")
+    output = os.path.join("outputs", "test_tier.mp4")
+
+    # 测试1: 默认 final 档位不改写命令（导出保持 -preset slow -crf 23 -b:v）
+    print("🔹 测试 final 档位保持原有编码设置")
+    exporter.export_for_douyin(input_video, output)
+    final_cmd = engine.commands[-1]
+    assert option(final_cmd, '-preset') == 'slow' and option(final_cmd, '-crf') == '23'
+    assert option(final_cmd, '-b:v') == '8M' and option(final_cmd, '-vf') == 'scale=1080:1920'
+    print("✅ final 档位命令未改变！")
+
+    # 测试2: draft 档位：ultrafast、缩小分辨率、降低帧率与音频码率
+    print("🔹 测试 draft 档位")
+    with render_tier("draft"):
+        exporter.export_for_douyin(input_video, output)
+    draft_cmd = engine.commands[-1]
+    assert option(draft_cmd, '-preset') == 'ultrafast' and option(draft_cmd, '-crf') == '30'
+    assert '-b:v' not in draft_cmd and option(draft_cmd, '-r') == '15' and option(draft_cmd, '-b:a') == '96k'
+    assert option(draft_cmd, '-vf').startswith('scale=1080:1920,scale=') and 'min(640' in option(draft_cmd, '-vf')
+    print("✅ draft 命令: " + " ".join(draft_cmd[1:]))
+
+    # 测试3: preview 档位 + 编辑方法（未指定编码器时默认 libx264）
+    print("🔹 测试 preview 档位作用于调色方法")
+    with render_tier("preview"):
+        corrector.apply_sharpen(input_video, output)
+    preview_cmd = engine.commands[-1]
+    assert option(preview_cmd, '-preset') == 'veryfast' and 'min(1280' in option(preview_cmd, '-vf')
+    assert option(preview_cmd, '-r') is None
+    print("✅ preview 命令: " + " ".join(preview_cmd[1:]))
+
+    # 测试4: 流复制（-c copy）不受档位影响；filter_complex 只缩放被映射的视频输出
+    print("🔹 测试流复制与 filter_complex 的改写规则")
+    with render_tier("draft"):
+        editor.cut_video(input_video, output, "00:00:01", "00:00:05")
+    assert engine.commands[-1] == apply_tier(engine.commands[-1], "final")
+    assert option(engine.commands[-1], '-preset') is None
+    graph_cmd = apply_tier(['ffmpeg', '-i', 'a.mp4', '-filter_complex', '[0:v]null[outv];[0:a]anull[outa]',
+                            '-map', '[outv]', '-map', '[outa]', 'o.mp4'], "draft")
+    assert '[outv]scale=' in option(graph_cmd, '-filter_complex') and '[outv_tier]' in graph_cmd
+    assert '[outa]' in graph_cmd
+    split_cmd = apply_tier(['ffmpeg', '-i', 'a.mp4', '-filter_complex', '[0:v]split=2[v0][v1]',
+                            '-map', '[v0]', '-c:v', 'libx264', '-b:v', '8M', 'o1.mp4',
+                            '-map', '[v1]', '-c:v', 'libx264', '-b:v', '6M', 'o2.mp4'], "draft")
+    assert split_cmd.count('ultrafast') == 2 and '-b:v' not in split_cmd and '[v1_tier]' in split_cmd
+    assert split_cmd.index('o1.mp4') < split_cmd.index('[v1_tier]')
+    print("✅ 改写规则正确！")
+
+    # 测试5: 全局默认档位，以及提交到线程池的作业继承调用时的档位
+    print("🔹 测试全局默认档位与 submit()")
+    set_default_tier("draft")
+    try:
+        corrector.adjust_brightness(input_video, output, brightness=0.1)
+        assert option(engine.commands[-1], '-preset') == 'ultrafast'
+        with render_tier("final"):
+            future = corrector.submit("adjust_brightness", input_video, output, brightness=0.1)
+        assert future.result() and option(engine.commands[-1], '-preset') is None
+    finally:
+        set_default_tier("final")
+    try:
+        with render_tier("fastest"):
+            pass
+        raise AssertionError("未知档位没有报错")
+    except ValueError:
+        pass
+    print("✅ 全局 / 单次调用档位均生效！")
+
+    engine.shutdown()
+    print("🎚️" + " " * 8 + "渲染档位测试完成。" + " " * 8 + "🎚️\n")
+
+
+if __name__ == "__main__":
+    test_render_tier()
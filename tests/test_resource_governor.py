@@ -0,0 +1,54 @@
+# test_resource_governor.py
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import RecordingEngine, option
+from resource_governor import ResourceGovernor, pinned_cpus
+
+
+def test_resource_governor():
+    print("🧮" + " " * 10 + "开始测试 资源调度（线程预算 / CPU 绑定）..." + " " * 10 + "🧮")
+    governor = ResourceGovernor(cpus=range(16), load_aware=False)
+
+    # 测试1: 线程预算随同时运行的作业数变化
+    print("🔹 测试线程预算")
+    alone, busy = governor.budget(1), governor.budget(8)
+    assert (alone.threads, alone.filter_threads, alone.lookahead_threads) == (16, 8, 2)
+    assert (busy.threads, busy.filter_threads, busy.lookahead_threads) == (2, 1, 1)
+    assert ResourceGovernor(cpus=range(16), reserve=4, load_aware=False).budget(3).threads == 4
+    with governor.waiting(6):  # 另有 6 个作业在排队，进程上限 4：同时运行 4 个
+        with governor.lease(max_processes=4) as budget:
+            assert budget.threads == 4
+    print(f"✅ 单作业 {alone}，8 个作业并行时 {busy}")
+
+    # 测试2: 写入命令：全局滤镜线程、每个输出的编码线程，已有设置不覆盖
+    print("🔹 测试命令改写")
+    cmd = busy.apply(['ffmpeg', '-i', 'in.mp4', '-filter_complex', '[0:v]split=2[a][b]',
+                      '-map', '[a]', '-c:v', 'libx264', '-x264-params', 'keyint=60', 'a.mp4',
+                      '-map', '[b]', '-c:v', 'libx265', '-threads', '6', 'b.mp4'])
+    assert cmd[1:5] == ['-filter_threads', '1', '-filter_complex_threads', '1']
+    first, second = cmd[:cmd.index('a.mp4') + 1], cmd[cmd.index('a.mp4') + 1:]
+    assert option(first, '-threads') == '2' and option(first, '-x264-params') == 'keyint=60:lookahead-threads=1'
+    assert option(second, '-threads') == '6' and option(second, '-x265-params') == 'pools=2'
+    print("✅ 命令改写正确！")
+
+    # 测试3: 引擎按预算改写命令；启用绑定时各作业的 CPU 集合互不重叠
+    print("🔹 测试引擎集成与 CPU 绑定")
+    engine = RecordingEngine(max_processes=4, governor=ResourceGovernor(cpus=range(16), pin=True, load_aware=False),
+                             observe=lambda cmd: pinned_cpus())
+    assert engine.run(['ffmpeg', '-i', 'in.mp4', '-vf', 'eq=contrast=1.2', 'out.mp4'])
+    assert option(engine.commands[0], '-threads') == '16' and option(engine.commands[0], '-filter_threads') == '8'
+    pinned = engine.governor
+    if pinned.pin:
+        assert engine.observed[0] == frozenset(range(16))
+        with pinned.waiting(2), pinned.lease(4) as a, pinned.lease(4) as b:
+            assert a.cpus and b.cpus and not a.cpus & b.cpus
+        assert pinned_cpus() is None
+    engine.shutdown()
+    print("✅ 引擎按预算执行命令！")
+
+    print("🧮" + " " * 8 + "资源调度测试完成。" + " " * 8 + "🧮\n")
+
+
+if __name__ == "__main__":
+    test_resource_governor()
@@ -26,6 +26,25 @@ from test_modules import (
     test_export_distributor,
     test_audio_editor,
     test_color_correction,
+    test_ffmpeg_engine,
+    test_concurrency,
+    test_project,
+    test_render_cache,
+    test_media_probe,
+    test_start_pts,
+    test_async_api,
+    test_progress,
+    test_render_tier,
+    test_proxy,
+    test_chunked_export,
+    test_render_farm,
+    test_smart_cut,
+    test_resource_governor,
+    test_benchmark,
+    test_media_factory,
+    test_job_metrics,
+    test_batch_cli,
+    test_watch_folder,
     run_tests
 )
 
@@ -93,7 +112,26 @@ class TestRunner:
             'audio_editor': ('AudioEditor - 音频编辑器', test_audio_editor),
             'color_correction': ('ColorCorrection - 色彩校正器', test_color_correction),
             'video_compositor': ('VideoCompositor - 视频合成器', test_video_compositor),
-            'export_distributor': ('ExportDistributor - 导出分发器', test_export_distributor)
+            'export_distributor': ('ExportDistributor - 导出分发器', test_export_distributor),
+            'ffmpeg_engine': ('FFmpegEngine - 执行引擎', test_ffmpeg_engine),
+            'concurrency': ('Concurrency - 并发安全', test_concurrency),
+            'project': ('Project - 惰性工程图', test_project),
+            'render_cache': ('RenderCache - 渲染缓存', test_render_cache),
+            'media_probe': ('media_probe - 媒体探测', test_media_probe),
+            'start_pts': ('起始时间戳检测', test_start_pts),
+            'async_api': ('异步 API', test_async_api),
+            'progress': ('进度上报', test_progress),
+            'render_tier': ('渲染档位', test_render_tier),
+            'proxy': ('代理工作流', test_proxy),
+            'chunked_export': ('分段并行导出', test_chunked_export),
+            'render_farm': ('分布式渲染', test_render_farm),
+            'smart_cut': ('智能剪切', test_smart_cut),
+            'resource_governor': ('资源调度', test_resource_governor),
+            'benchmark': ('性能基准', test_benchmark),
+            'media_factory': ('合成素材工厂', test_media_factory),
+            'job_metrics': ('作业资源计量', test_job_metrics),
+            'batch_cli': ('批处理命令行', test_batch_cli),
+            'watch_folder': ('监视文件夹', test_watch_folder)
         }
 
         print(f"\n📋 计划执行 {len(selected_tests)} 个测试模块:\n")
@@ -140,7 +178,26 @@ class TestRunner:
             "AudioEditor - 音频编辑器",
             "ColorCorrection - 色彩校正器",
             "VideoCompositor - 视频合成器",
-            "ExportDistributor - 导出分发器"
+            "ExportDistributor - 导出分发器",
+            "FFmpegEngine - 执行引擎",
+            "Concurrency - 并发安全",
+            "Project - 惰性工程图",
+            "RenderCache - 渲染缓存",
+            "media_probe - 媒体探测",
+            "起始时间戳检测",
+            "异步 API",
+            "进度上报",
+            "渲染档位",
+            "代理工作流",
+            "分段并行导出",
+            "分布式渲染",
+            "智能剪切",
+            "资源调度",
+            "性能基准",
+            "合成素材工厂",
+            "作业资源计量",
+            "批处理命令行",
+            "监视文件夹"
         ]
 
         for i, test_name in enumerate(test_names, 1):
@@ -151,18 +208,18 @@ class TestRunner:
         # 运行所有测试
         try:
             run_tests()
-            total_success = 6  # 假设所有6个测试都运行了
+            total_success = len(test_names)  # 假设所有测试都运行了
             total_failure = 0
         except Exception as e:
             total_success = 0
-            total_failure = 6
+            total_failure = len(test_names)
             print(f"❌ 运行所有测试时发生错误: {e}")
             import traceback
             traceback.print_exc()
 
         # 运行总结
         self.end_time = time.time()
-        self.print_summary(total_success, total_failure, 6)
+        self.print_summary(total_success, total_failure, len(test_names))
 
     def print_summary(self, total_success, total_failure, total_planned):
         """打印测试总结"""
@@ -0,0 +1,90 @@
+# test_smart_cut.py
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import RecordingEngine, option
+import smart_cut
+from smart_cut import plan_smart_cut
+from media_probe import MediaInfo, StreamInfo
+from render_tier import render_tier
+from utils import parse_time
+from video_editor import VideoEditor
+
+
+def test_smart_cut():
+    print("✂️" + " " * 10 + "开始测试 智能剪切（帧精确 + 流复制）..." + " " * 10 + "✂️")
+
+    # 测试1: 切点所在的不完整 GOP 重新编码，中间流复制
+    print("🔹 测试剪切规划")
+    keyframes = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+    assert parse_time("00:01:05.5") == 65.5 and parse_time("01:30") == 90.0 and parse_time("7") == 7.0
+    assert plan_smart_cut(keyframes, 3.2, 8.5) == [(3.2, 4.0, False), (4.0, 8.0, True), (8.0, 8.5, False)]
+    assert plan_smart_cut(keyframes, 2.0, 6.0) == [(2.0, 6.0, True)]     # 切点正好在关键帧上：全部流复制
+    assert plan_smart_cut(keyframes, 4.5, 5.5) == [(4.5, 5.5, False)]    # 区间内没有完整 GOP：整段重新编码
+    print("✅ 规划正确！")
+
+    # 测试2: 生成的命令：输入端跳转、片段编码与原视频一致、最后无损封装
+    print("🔹 测试智能剪切命令")
+    engine = RecordingEngine(max_processes=4)
+    editor = VideoEditor(engine=engine)
+    work_dir = tempfile.mkdtemp(prefix="avc_smartcut_")
+    source = os.path.join(work_dir, "source.mp4")
+    output = os.path.join(work_dir, "cut.mp4")
+    info = MediaInfo(source, duration=12.0, streams=[StreamInfo(0, 'video', 'h264', 1920, 1080, pix_fmt='yuv420p'),
+                                                     StreamInfo(1, 'audio', 'aac')])
+    original_probe, original_keyframes = smart_cut.probe, smart_cut.probe_keyframes
+    smart_cut.probe = lambda path: info
+    smart_cut.probe_keyframes = lambda path: keyframes
+    try:
+        assert editor.cut_video(source, output, "00:00:03.2", "00:00:08.5", smart=True)
+        parts = [cmd for cmd in engine.commands if cmd[-1].endswith('.ts')]
+        assert all(cmd.index('-ss') < cmd.index('-i') for cmd in engine.commands[:-1])  # 输入端跳转
+        assert [option(cmd, '-c:v') for cmd in parts] == ['libx264', 'copy', 'libx264']
+        assert all(option(cmd, '-pix_fmt') == 'yuv420p' for cmd in parts if option(cmd, '-c:v') != 'copy')
+        assert [option(cmd, '-ss') for cmd in parts] == ['3.200000', '4.000000', '8.000000']
+        concat = engine.commands[-1]
+        assert option(concat, '-f') == 'concat' and option(concat, '-c') == 'copy' and concat[-1] == output
+        assert not [name for name in os.listdir(work_dir) if name.startswith("smartcut_")]
+        print(f"✅ {len(parts)} 个视频片段（仅 2 个短片段重新编码）+ 音频 + 无损封装")
+
+        # 测试2.1: draft 档位下片段仍按原分辨率 / 帧率编码（与流复制的片段拼接兼容）
+        print("🔹 测试 draft 档位下的智能剪切")
+        def without_work_dir(commands):  # 每次剪切的临时目录不同，比较时只保留文件名
+            return [[os.path.basename(arg) if arg.startswith(work_dir) else arg for arg in cmd] for cmd in commands]
+
+        final_commands = without_work_dir(engine.commands)
+        engine.commands.clear()
+        with render_tier("draft"):
+            assert editor.cut_video(source, output, "00:00:03.2", "00:00:08.5", smart=True)
+        assert without_work_dir(engine.commands) == final_commands
+        print("✅ 片段命令未被档位改写！")
+
+        # 测试3: 不支持的编码退化为输入端跳转 + 整段重新编码
+        print("🔹 测试不支持的编码")
+        info.streams[0].codec_name = 'prores'
+        engine.commands.clear()
+        assert editor.cut_video(source, output, "3.2", "8.5", smart=True)
+        cmd = engine.commands[0]
+        assert len(engine.commands) == 1 and cmd.index('-ss') < cmd.index('-i') and option(cmd, '-t') == '5.300000'
+        print("✅ 退化为单次帧精确重新编码！")
+    finally:
+        smart_cut.probe, smart_cut.probe_keyframes = original_probe, original_keyframes
+        engine.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # 测试4: 真实素材的智能剪切（需要 ffmpeg）
+    print("🔹 测试真实素材的智能剪切 (1.5s ~ 4.5s)")
+    input_video = os.path.join("inputs", "cat_01.mp4")
+    output_smart = os.path.join("outputs", "test_smart_cut.mp4")
+    if VideoEditor().cut_video(input_video, output_smart, "00:00:01.5", "00:00:04.5", smart=True):
+        print("✅ 智能剪切成功！输出文件: " + output_smart)
+    else:
+        print("❌ 智能剪切失败！")
+
+    print("✂️" + " " * 8 + "智能剪切测试完成。" + " " * 8 + "✂️\n")
+
+
+if __name__ == "__main__":
+    test_smart_cut()
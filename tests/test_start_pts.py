@@ -0,0 +1,83 @@
+# test_start_pts.py
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import utils
+from media_probe import clear_probe_cache
+
+LONG_VIDEO_SECONDS = 2 * 60 * 60  # 基准测试使用的合成视频时长：2 小时
+MAX_BOUNDED_SECONDS = 1.0        # 起始时间戳检测的耗时上限（与文件时长无关）
+
+
+def _make_long_video(path: str) -> bool:
+    """用 lavfi 生成一个 2 小时的低分辨率合成视频（带音频），编码很快"""
+    cmd = [
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', f'color=c=black:s=32x32:r=10:d={LONG_VIDEO_SECONDS}',
+        '-f', 'lavfi', '-i', f'sine=f=440:r=8000:d={LONG_VIDEO_SECONDS}',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '250',
+        '-c:a', 'aac', '-b:a', '16k',
+        path
+    ]
+    return subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True).returncode == 0
+
+
+def test_start_pts():
+    print("⏱️" + " " * 10 + "开始测试 起始时间戳检测 ..." + " " * 10 + "⏱️")
+
+    # 测试1: 回退路径只读取文件开头，并取开头数据包中的最小时间戳
+    print("🔹 测试回退命令: -read_intervals 限制读取范围")
+    captured = []
+
+    def fake_run(cmd, **kwargs):
+        captured.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout="0.100000\n0.033000\nN/A\n0.066000\n", stderr="")
+
+    original_run = utils.subprocess.run
+    utils.subprocess.run = fake_run
+    try:
+        assert utils.read_first_packet_pts("any.mp4", is_video=True) == 0.033
+    finally:
+        utils.subprocess.run = original_run
+    cmd = captured[0]
+    assert cmd[cmd.index('-read_intervals') + 1] == f"%+{utils.START_PTS_READ_SECONDS}", cmd
+    print("✅ 只读取开头 " + str(utils.START_PTS_READ_SECONDS) + " 秒的数据包！")
+
+    # 测试2: 基准测试（需要 ffmpeg）：2 小时的文件上检测耗时仍然是毫秒级
+    print(f"🔹 基准测试: {LONG_VIDEO_SECONDS // 3600} 小时合成视频的起始时间戳检测")
+    if not utils.check_ffmpeg_installed():
+        print("⚠️ 未安装 ffmpeg，跳过基准测试")
+    else:
+        work_dir = tempfile.mkdtemp(prefix="avc_start_pts_")
+        long_video = os.path.join(work_dir, "long.mp4")
+        try:
+            assert _make_long_video(long_video), "生成合成视频失败"
+            for is_video in (True, False):
+                clear_probe_cache()
+                started = time.perf_counter()
+                start_pts = utils.get_start_pts(long_video, is_video=is_video)
+                probe_elapsed = time.perf_counter() - started
+
+                started = time.perf_counter()
+                packet_pts = utils.read_first_packet_pts(long_video, is_video=is_video)
+                packet_elapsed = time.perf_counter() - started
+
+                kind = "视频" if is_video else "音频"
+                assert abs(start_pts - packet_pts) < 0.1, (start_pts, packet_pts)
+                assert probe_elapsed < MAX_BOUNDED_SECONDS, probe_elapsed
+                assert packet_elapsed < MAX_BOUNDED_SECONDS, packet_elapsed
+                print(f"✅ {kind}起始时间戳 {start_pts:.3f}s，"
+                      f"探测耗时 {probe_elapsed * 1000:.0f}ms，读取数据包耗时 {packet_elapsed * 1000:.0f}ms")
+        finally:
+            clear_probe_cache()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("⏱️" + " " * 8 + "起始时间戳检测测试完成。" + " " * 8 + "⏱️\n")
+
+
+if __name__ == "__main__":
+    test_start_pts()
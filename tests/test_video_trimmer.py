@@ -1,8 +1,15 @@
 # test_video_trimmer.py
 import os
+import shutil
 import sys
+import tempfile
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from video_trimmer import VideoTrimmer
+from fakes import RecordingEngine, option
+import video_trimmer
+from video_trimmer import VideoTrimmer, atempo_chain, plan_speed_pieces
+from ffmpeg_engine import capture_commands
+from media_probe import MediaInfo, StreamInfo
+from render_tier import render_tier
 
 def test_video_trimmer():
     print("✂️" + " " * 10 + "开始测试 VideoTrimmer ..." + " " * 10 + "✂️")
@@ -13,6 +20,7 @@ def test_video_trimmer():
     output_zoom = os.path.join("outputs", "test_zoom.mp4")
     output_blur = os.path.join("outputs", "test_blur.mp4")
     output_vintage = os.path.join("outputs", "test_vintage.mp4")
+    output_speed = os.path.join("outputs", "test_speed_segments.mp4")
 
     os.makedirs("outputs", exist_ok=True)
 
@@ -54,6 +62,77 @@ def test_video_trimmer():
     else:
         print("❌ 复古色调失败！")
 
+    # 测试6: 大量时间段的多段剪辑：逐段输入端跳转 + 并行编码 + 拼接
+    print("🔹 测试大量时间段的多段剪辑 (200 段)")
+    many_segments = [(f"{i * 0.1:.1f}", f"{i * 0.1 + 0.05:.2f}") for i in range(200)]
+    with capture_commands() as commands:
+        assert trimmer.trim_by_segments(input_video, output_segments, many_segments)
+    assert len(commands) == 201 and all(cmd.index('-ss') < cmd.index('-i') for cmd in commands[:-1])
+    assert all('-filter_complex' not in cmd for cmd in commands)
+    if trimmer.trim_by_segments(input_video, output_segments, segments, strategy="seek"):
+        print("✅ 逐段跳转剪辑成功！输出文件: " + output_segments)
+    else:
+        print("❌ 逐段跳转剪辑失败！")
+
+    # 测试7: 合并参数不一致的视频：只重新编码不符合多数片段规格的片段，最后流复制拼接
+    print("🔹 测试合并参数不一致的视频")
+    work_dir = tempfile.mkdtemp(prefix="avc_merge_")
+    def clip(name, width, height, audio=True):
+        streams = [StreamInfo(0, 'video', 'h264', width, height, pix_fmt='yuv420p', frame_rate=30.0, time_base='1/15360')]
+        if audio:
+            streams.append(StreamInfo(1, 'audio', 'aac', sample_rate=48000, channels=2))
+        return MediaInfo(os.path.join(work_dir, name), duration=5.0, streams=streams)
+    infos = {info.path: info for info in (clip("a.mp4", 1920, 1080), clip("b.mp4", 1280, 720),
+                                          clip("c.mp4", 1920, 1080), clip("d.mp4", 1920, 1080, audio=False))}
+    original_probe = video_trimmer.probe
+    video_trimmer.probe = lambda path: infos.get(path)
+    try:
+        with capture_commands() as commands:
+            assert trimmer.merge_videos(list(infos), os.path.join(work_dir, "merged.mp4"))
+        normalized, concat = commands[:-1], commands[-1]
+        assert [cmd[cmd.index('-i') + 1] for cmd in normalized] == [os.path.join(work_dir, "b.mp4"),
+                                                                   os.path.join(work_dir, "d.mp4")]
+        assert "scale=1920:1080" in normalized[0][normalized[0].index('-vf') + 1]
+        assert all(cmd[cmd.index('-video_track_timescale') + 1] == '15360' for cmd in normalized)
+        assert any(arg.startswith("anullsrc=r=48000") for arg in normalized[1])
+        assert concat[concat.index('-c') + 1] == 'copy'
+        assert not [name for name in os.listdir(work_dir) if name.startswith("merge_")]
+        print(f"✅ 4 个片段中只有 {len(normalized)} 个重新编码，其余流复制！")
+
+        # draft 档位下规格化的片段仍与流复制的片段一致（不缩小、不降帧率），拼接结果有效
+        engine = RecordingEngine()
+        with render_tier("draft"):
+            assert VideoTrimmer(engine=engine).merge_videos(list(infos), os.path.join(work_dir, "merged.mp4"))
+        engine.shutdown()
+        drafted = engine.commands[:-1]
+        assert len(drafted) == 2 and all(option(cmd, '-r') != '15' and option(cmd, '-preset') != 'ultrafast'
+                                         for cmd in drafted)
+        assert 'min(640' not in option(drafted[0], '-vf') and option(engine.commands[-1], '-c') == 'copy'
+        print("✅ draft 档位下合并的片段参数一致！")
+    finally:
+        video_trimmer.probe = original_probe
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # 测试8: 分段变速：一个滤镜图完成所有区间，atempo 超出范围时串联，速度渐变
+    print("🔹 测试分段变速 [(2, 4, 6.0), (6, 8, 0.25)]")
+    assert atempo_chain(6.0) == [2.0, 2.0, 1.5] and atempo_chain(0.25) == [0.5, 0.5] and atempo_chain(1.0) == []
+    speed_map = [("2", "4", 6.0), ("00:00:06", "00:00:08", 0.25)]
+    assert plan_speed_pieces(speed_map, duration=10.0) == [(0.0, 2.0, 1.0), (2.0, 4.0, 6.0), (4.0, 6.0, 1.0),
+                                                           (6.0, 8.0, 0.25), (8.0, 10.0, 1.0)]
+    ramped = plan_speed_pieces(speed_map, ramp=0.8, duration=10.0)
+    assert all(a[1] == b[0] for a, b in zip(ramped, ramped[1:])) and ramped[-1][1] == 10.0
+    assert 1.0 < ramped[2][2] < ramped[3][2] < 6.0   # 进入 6 倍速区间时逐级加速
+    with capture_commands() as commands:
+        assert trimmer.adjust_speed_segments(input_video, output_speed, speed_map)
+        assert not trimmer.adjust_speed_segments(input_video, output_speed, [("4", "2", 2.0)])
+    graph = commands[0][commands[0].index('-filter_complex') + 1]
+    assert len(commands) == 1 and "atempo=2,atempo=2,atempo=1.5" in graph and "atempo=0.5,atempo=0.5" in graph
+    assert "setpts=(PTS-STARTPTS)/6" in graph and "concat=n=5:v=1:a=1" in graph
+    if trimmer.adjust_speed_segments(input_video, output_speed, speed_map, ramp=0.5):
+        print("✅ 分段变速成功！输出文件: " + output_speed)
+    else:
+        print("❌ 分段变速失败！")
+
     print("✂️" + " " * 8 + "VideoTrimmer 测试完成。" + " " * 8 + "✂️\n")
 
 if __name__ == "__main__":
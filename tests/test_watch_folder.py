@@ -0,0 +1,148 @@
+# test_watch_folder.py
+import os
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fakes import RecordingEngine
+from operations import OperationRunner
+from watch_folder import FolderWatcher, IngestPipeline
+
+PIPELINE = [
+    {"operation": "VideoTrimmer.trim_by_segments", "params": {"segments": [["0", "5"]]}},
+    {"operation": "ColorCorrection.apply_preset_style", "params": {"style": "douyin"}},
+    {"operation": "ExportDistributor.export_all_platforms",
+     "params": {"outputs_by_platform": {"douyin": "{output_dir}/{stem}_douyin.mp4",
+                                        "bilibili": "{output_dir}/{stem}_bilibili.mp4"}}},
+]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _write(path, data):
+    with open(path, 'ab') as f:
+        f.write(data)
+
+
+def _wait_idle(watcher, timeout=10.0):
+    deadline = time.time() + timeout
+    while not watcher.idle():
+        assert time.time() < deadline, "处理超时"
+        time.sleep(0.01)
+
+
+def test_watch_folder():
+    print("👀" + " " * 10 + "开始测试 监视文件夹（上传检测 / 背压 / 不重复处理）..." + " " * 10 + "👀")
+    root = tempfile.mkdtemp(prefix="watch_test_")
+    inbox, outputs = os.path.join(root, "inbox"), os.path.join(root, "outputs")
+    os.makedirs(inbox)
+    engine = RecordingEngine(max_processes=4, gate=threading.Event())
+    engine.gate.set()
+
+    # 测试1: 流水线展开：上一步的输出作为下一步的输入，占位符替换
+    print("🔹 测试流水线展开")
+    pipeline = IngestPipeline(PIPELINE, outputs, OperationRunner(engine=engine))
+    trim, style, export = pipeline.jobs_for(os.path.join(inbox, "a.mp4"), "/work")
+    assert trim.params['input_path'] == os.path.join(inbox, "a.mp4")
+    assert trim.params['output_path'] == os.path.join("/work", "step0.mp4")
+    assert style.params['input_path'] == trim.params['output_path']
+    assert export.params['input_path'] == style.params['output_path']
+    assert export.params['outputs_by_platform']['douyin'] == f"{outputs}/a_douyin.mp4"
+    print("✅ 流水线展开正确！")
+
+    # 测试2: 仍在增长的文件不处理，稳定 settle_seconds 后才派发
+    print("🔹 测试上传完成检测")
+    clock = _Clock()
+    watcher = FolderWatcher(inbox, pipeline, settle_seconds=2.0, clock=clock)
+    _write(os.path.join(inbox, "a.mp4"), b"x" * 100)
+    _write(os.path.join(inbox, "b.mp4.part"), b"x" * 100)
+    assert watcher.poll() == 0
+    clock.now = 1.5
+    _write(os.path.join(inbox, "a.mp4"), b"x" * 100)  # 仍在上传
+    assert watcher.poll() == 0
+    clock.now = 3.0
+    assert watcher.poll() == 0 and not watcher.idle()
+    clock.now = 6.0
+    assert watcher.poll() == 1
+    _wait_idle(watcher)
+    assert watcher.processed == 1 and len(engine.commands) == 3
+    assert not [d for d in os.listdir(outputs) if d.startswith("ingest_")]
+    print("✅ 文件稳定后才处理！")
+
+    # 测试3: 不重复处理（本次运行内、重启后）
+    print("🔹 测试不重复处理")
+    clock.now = 20.0
+    assert watcher.poll() == 0
+    restarted = FolderWatcher(inbox, pipeline, settle_seconds=0.0, clock=clock)
+    restarted.scan()
+    assert restarted.poll() == 0 and len(engine.commands) == 3
+    print("✅ 已处理的素材不会再次处理！")
+
+    # 测试4: 背压：1 个工作线程、队列长度 1，多余的素材留到有空位时再派发
+    print("🔹 测试背压")
+    engine.gate.clear()
+    for name in ("c.mp4", "d.mp4", "e.mp4"):
+        _write(os.path.join(inbox, name), b"y" * 10)
+    busy = FolderWatcher(inbox, pipeline, workers=1, queue_size=1, settle_seconds=0.0, clock=clock)
+    busy.scan()
+    assert busy.poll() == 2 and busy.poll() == 0
+    engine.gate.set()
+    deadline = time.time() + 10.0
+    while busy.processed < 3:
+        assert time.time() < deadline, "处理超时"
+        busy.poll()
+        time.sleep(0.01)
+    _wait_idle(busy)
+    assert busy.processed == 3 and len(engine.commands) == 12
+    for each in (watcher, restarted, busy):
+        each.stop()
+        each.run(once=True)
+    print("✅ 背压生效，所有素材处理完成！")
+
+    # 测试5: 不同子目录中的同名素材输出到不同文件
+    print("🔹 测试子目录中的同名素材")
+    nested = os.path.join(root, "nested")
+    for sub in ("day1", "day2"):
+        os.makedirs(os.path.join(nested, sub))
+        _write(os.path.join(nested, sub, "clip.mp4"), sub.encode())
+    single = IngestPipeline(PIPELINE[1:2], outputs, OperationRunner(engine=engine))
+    jobs = [single.jobs_for(os.path.join(nested, sub, "clip.mp4"), "/work", os.path.join(sub, "clip.mp4"))[0]
+            for sub in ("day1", "day2")]
+    assert len({job.job_id for job in jobs}) == 2
+    engine.commands.clear()
+    nested_watcher = FolderWatcher(nested, single, settle_seconds=0.0, clock=clock)
+    nested_watcher.scan()
+    assert nested_watcher.poll() == 2
+    _wait_idle(nested_watcher)
+    assert sorted(cmd[-1] for cmd in engine.commands) == [os.path.join(outputs, "day1", "clip.mp4"),
+                                                          os.path.join(outputs, "day2", "clip.mp4")]
+    nested_watcher.stop()
+    nested_watcher.run(once=True)
+    print("✅ 同名素材的输出互不覆盖！")
+
+    # 测试6: 日志无法写入时计数仍然归零，run(once=True) 不会卡住
+    print("🔹 测试日志写入失败")
+    broken_inbox = os.path.join(root, "broken_inbox")
+    os.makedirs(broken_inbox)
+    _write(os.path.join(broken_inbox, "f.mp4"), b"z")
+    broken = FolderWatcher(broken_inbox, pipeline, journal_path=os.path.join(root, "missing", "journal.jsonl"),
+                           poll_interval=0.01, settle_seconds=0.0)
+    finished = threading.Thread(target=broken.run, kwargs={'once': True}, daemon=True)
+    finished.start()
+    finished.join(10.0)
+    assert not finished.is_alive() and broken.processed == 1
+    engine.shutdown()
+    print("✅ 日志写入失败不影响退出！")
+
+    print("👀" + " " * 8 + "监视文件夹测试完成。" + " " * 8 + "👀\n")
+
+
+if __name__ == "__main__":
+    test_watch_folder()
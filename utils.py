@@ -4,7 +4,8 @@ import os
 import shutil
 #from typing import List
 import subprocess
-from typing import Optional
+from typing import List, Optional, Tuple
+from media_probe import probe
 
 
 def check_ffmpeg_installed() -> bool:
@@ -26,8 +27,10 @@ def ensure_dir_exists(directory: str):
     检查输出目录是否存在，如果不存在则创建该目录。
     :param directory: 要确保存在的目录路径
     """
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+    # exist_ok=True：多个线程同时创建同一目录时不会因竞争抛出 FileExistsError
+    # directory 为空字符串表示当前目录，无需创建
+    if directory:
+        os.makedirs(directory, exist_ok=True)
 
 
 def get_output_filepath(output_dir: str, filename: str) -> str:
@@ -78,54 +81,106 @@ def get_video_duration(video_path: str) -> Optional[float]:
     :param video_path: 视频文件路径
     :return: 时长（秒）或None（失败时）
     """
-    cmd = [
-        'ffprobe',
-        '-v', 'error',  # 只显示错误信息
-        '-show_entries', 'format=duration',
-        '-of', 'default=noprint_wrappers=1:nokey=1',
-        video_path
-    ]
+    info = probe(video_path)
+    if info is None or info.duration is None:
+        print(f"获取视频时长失败: {video_path}")
+        return None
+    return info.duration
 
-    try:
-        result = subprocess.run(
-            cmd,
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-        )
-        return float(result.stdout.strip())
-    except Exception as e:
-        print(f"获取视频时长失败: {e}")
+# 获取视频分辨率（宽, 高）
+def get_video_resolution(video_path: str) -> Optional[Tuple[int, int]]:
+    """
+    获取视频第一路视频流的分辨率
+    :param video_path: 视频文件路径
+    :return: (宽, 高) 或 None（失败时）
+    """
+    info = probe(video_path)
+    if info is None or info.resolution is None:
+        print(f"获取视频分辨率失败: {video_path}")
         return None
+    return info.resolution
 
 # ==================== 获取时间基准 ====================
+# 流信息缺少 start_time 时，回退读取数据包的最大时长（秒）
+START_PTS_READ_SECONDS = 5
+
 def get_start_pts(media_path: str, is_video: bool) -> float:
     """获取音视频的起始时间戳（秒）"""
+    info = probe(media_path)
+    stream = None if info is None else (info.video if is_video else info.audio)
+    if stream is not None and stream.start_time is not None:
+        return stream.start_time
+    # 流信息中没有 start_time 时，读取开头几个数据包的时间戳
+    return read_first_packet_pts(media_path, is_video)
+
+def read_first_packet_pts(media_path: str, is_video: bool) -> float:
+    """
+    读取文件开头数据包的最早时间戳（秒）
+    -read_intervals 限制 ffprobe 只读取开头 START_PTS_READ_SECONDS 秒，耗时与文件总长度无关
+    """
     cmd = [
         'ffprobe', '-v', 'error',
         '-select_streams', 'v:0' if is_video else 'a:0',
+        '-read_intervals', f'%+{START_PTS_READ_SECONDS}',
         '-show_entries', 'packet=pts_time',
         '-of', 'csv=p=0',
         media_path
     ]
     try:
         result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-        first_pts = float(result.stdout.split('\n')[0])
-        return first_pts
+        # 含 B 帧时第一个数据包不一定最早显示，取开头这些数据包中的最小值
+        pts_values = [float(line) for line in result.stdout.split('\n') if line.strip() not in ('', 'N/A')]
+        return min(pts_values)
     except Exception as e:
         print(f"获取PTS失败: {e}")
         return 0.0
 
 # 检查视频是否包含音频轨道
 def has_audio(video_path: str) -> bool:
-    cmd = [
-        'ffprobe', '-v', 'error',
-        '-select_streams', 'a',
-        '-show_entries', 'stream=codec_type',
-        '-of', 'csv=p=0',
-        video_path
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return bool(result.stdout.strip())
\ No newline at end of file
+    info = probe(video_path)
+    if info is None:
+        print(f"检测音频轨道失败: {video_path}")
+        return False
+    return info.has_audio
+
+# ==================== 时间字符串转换 ====================
+def parse_time(value) -> float:
+    """
+    把时间转换为秒数
+    :param value: "HH:MM:SS(.ms)"、"MM:SS"、"SS(.ms)" 字符串，或数字
+    :return: 秒数，如 "00:01:05.5" → 65.5
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    seconds = 0.0
+    for part in str(value).strip().split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+# ==================== 滤镜字符串切分 ====================
+def split_top_level(text: str, separator: str) -> List[str]:
+    """
+    按分隔符切分滤镜字符串，忽略引号、括号内以及反斜杠转义的分隔符
+    :param text: 滤镜链或滤镜图，如 "curves=r='0/0 0.5/0.6',eq=contrast=1.1"
+    :param separator: 分隔符，滤镜链用 ","，滤镜图用 ";"
+    :return: 去掉空白项后的各段（保留原有的引号与转义）
+    """
+    parts, buffer, depth, quoted, escaped = [], [], 0, False, False
+    for ch in text:
+        if escaped:
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif ch == "'":
+            quoted = not quoted
+        elif not quoted and ch in '([':
+            depth += 1
+        elif not quoted and ch in ')]':
+            depth -= 1
+        elif ch == separator and not quoted and depth == 0:
+            parts.append(''.join(buffer))
+            buffer = []
+            continue
+        buffer.append(ch)
+    parts.append(''.join(buffer))
+    return [part for part in parts if part.strip()]
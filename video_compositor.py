@@ -1,17 +1,19 @@
 # video_compositor.py
 import os
-import subprocess
 from typing import Optional
 from utils import get_output_filepath
+from ffmpeg_engine import FFmpegEngine, FFmpegJobMixin, get_default_engine
 
 
-class VideoCompositor:
-    def __init__(self, ffmpeg_cmd: str = "ffmpeg"):
+class VideoCompositor(FFmpegJobMixin):
+    def __init__(self, ffmpeg_cmd: str = "ffmpeg", engine: Optional[FFmpegEngine] = None):
         """
         初始化视频合成器
         :param ffmpeg_cmd: ffmpeg 命令名称，默认为 'ffmpeg'
+        :param engine: 共享的 ffmpeg 执行引擎，默认使用全局引擎（限制并发进程数）
         """
         self.ffmpeg = ffmpeg_cmd
+        self.engine = engine if engine is not None else get_default_engine()
 
     def _run_ffmpeg(self, cmd_args: list) -> bool:
         """
@@ -19,23 +21,8 @@ class VideoCompositor:
         :param cmd_args: 参数列表，如 ['-i', 'input.mp4', '-vf', 'drawtext=...', 'output.mp4']
         :return: True 表示成功，False 表示失败
         """
-        global full_cmd
-        try:
-            full_cmd = [self.ffmpeg] + cmd_args
-            result = subprocess.run(
-                full_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True
-            )
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"[❌ 视频合成失败，命令：{' '.join(full_cmd)}]")
-            print(f"[错误详情]: {e.stderr.decode('utf-8', errors='ignore')}")
-            return False
-        except Exception as e:
-            print(f"[❌ 未知错误: {e}]")
-            return False
+        # 统一提交到共享执行引擎，由引擎负责进程并发控制与错误日志
+        return self.engine.run([self.ffmpeg] + cmd_args, label="视频合成失败")
 
     # ----------------------------------------------------------------------
     # 【1】添加文字标题（静态）
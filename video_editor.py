@@ -1,18 +1,22 @@
 # video_editor.py
 import os
-import subprocess
+from typing import Optional
 #from typing import List
-from utils import get_output_filepath
+from utils import get_output_filepath, parse_time
+from ffmpeg_engine import FFmpegEngine, FFmpegJobMixin, get_default_engine
+from smart_cut import smart_cut
 #from utils import get_output_filepath, ensure_dir_exists
 
 
-class VideoEditor:
-    def __init__(self, ffmpeg_cmd: str = "ffmpeg"):
+class VideoEditor(FFmpegJobMixin):
+    def __init__(self, ffmpeg_cmd: str = "ffmpeg", engine: Optional[FFmpegEngine] = None):
         """
         初始化视频编辑器。
         :param ffmpeg_cmd: ffmpeg 命令的名称，默认为 'ffmpeg'（需已在系统 PATH 中）
+        :param engine: 共享的 ffmpeg 执行引擎，默认使用全局引擎（限制并发进程数）
         """
         self.ffmpeg = ffmpeg_cmd
+        self.engine = engine if engine is not None else get_default_engine()
 
     def _run_ffmpeg(self, cmd_args: list[str]) -> bool:
         """
@@ -20,48 +24,25 @@ class VideoEditor:
         :param cmd_args: ffmpeg 的参数列表，例如 ['-i', 'input.mp4', 'output.mp4']
         :return: True 表示执行成功，False 表示执行失败（会打印详细的错误日志）
         """
-        global full_cmd
-        try:
-            # 构造完整的 ffmpeg 命令列表，例如：['ffmpeg', '-i', 'input.mp4', 'output.mp4']
-            full_cmd = [self.ffmpeg] + cmd_args  # type: list[str]
+        # 统一提交到共享执行引擎，由引擎负责进程并发控制与错误日志
+        return self.engine.run([self.ffmpeg] + cmd_args, label="FFmpeg 命令执行失败")
 
-            # 执行 ffmpeg 命令
-            # stdout=subprocess.PIPE 捕获标准输出（一般不需要打印）
-            # stderr=subprocess.PIPE 捕获错误输出（调试时很重要）
-            # check=True 表示如果 ffmpeg 返回非零状态码，就抛出 CalledProcessError 异常
-            result = subprocess.run(
-                full_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True
-            )
-
-            # 如果执行到这里，说明 ffmpeg 命令成功了
-            return True
-
-        except subprocess.CalledProcessError as e:
-            # 捕获 ffmpeg 命令执行错误（比如参数错误、输入文件不存在、编码问题等）
-            # e.stderr 是字节串，需要用 decode 转成人可读的消息
-            print(f"[❌ FFmpeg 命令执行失败，命令：{' '.join(full_cmd)}]")  # ✅ full_cmd 已定义，安全访问
-            print(f"[错误输出]: {e.stderr.decode('utf-8', errors='ignore')}")  # 打印 ffmpeg 的错误详情
-            return False
-
-        except Exception as e:
-            # 捕获其它可能的异常，比如：权限不足、系统调用失败、内存问题等
-            print(f"[❌ 发生未知错误: {e}]")
-            return False
-
-    def cut_video(self, input_path: str, output_path: str, start_time: str, end_time: str) -> bool:
+    def cut_video(self, input_path: str, output_path: str, start_time: str, end_time: str, smart: bool = False) -> bool:
         """
         裁剪视频：从 start_time 到 end_time（支持格式：HH:MM:SS 或 MM:SS）
-        使用 copy 模式，不重新编码，速度最快。
+        默认使用 copy 模式，不重新编码，速度最快，但只能在关键帧处切开（开头可能有定格 / 黑帧）。
+        smart=True 时为帧精确的智能剪切：输入端跳转，只重新编码切点处不完整的 GOP，其余部分流复制。
         :param input_path: 输入视频路径，如 "inputs/input1.mp4"
         :param output_path: 输出视频路径，如 "outputs/cut.mp4"
         :param start_time: 开始时间，如 "00:00:05"
         :param end_time: 结束时间，如 "00:00:10"
+        :param smart: 是否使用智能剪切（帧精确，速度接近流复制）
         :return: 成功返回 True，失败返回 False
         """
         safe_output = get_output_filepath(os.path.dirname(output_path), os.path.basename(output_path))
+        if smart:
+            return smart_cut(self.engine, self.ffmpeg, input_path, safe_output,
+                             parse_time(start_time), parse_time(end_time), label="智能剪切失败")
         cmd = [
             '-i', input_path,
             '-ss', start_time,     # 开始时间
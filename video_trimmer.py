@@ -1,17 +1,29 @@
 # video_trimmer.py
 import os
-import subprocess
-from typing import List, Tuple
-from utils import get_output_filepath,get_video_duration
+import tempfile
+from typing import List, Optional, Tuple
+from utils import get_output_filepath,get_video_duration, parse_time
+from ffmpeg_engine import FFmpegEngine, FFmpegJobMixin, defer_cleanup, get_default_engine
+from media_probe import probe
+from render_tier import render_tier
 
+# 多段剪辑：段数超过该值时（strategy="auto"），改为逐段输入端跳转 + 并行编码 + 拼接
+SEEK_SEGMENT_THRESHOLD = 16
+# 分段变速：速度渐变（ramp）拆分成的匀速小段数
+SPEED_RAMP_STEPS = 8
+# atempo 单级支持的倍速范围，超出范围时串联多级
+ATEMPO_MIN, ATEMPO_MAX = 0.5, 2.0
 
-class VideoTrimmer:
-    def __init__(self, ffmpeg_cmd: str = "ffmpeg"):
+
+class VideoTrimmer(FFmpegJobMixin):
+    def __init__(self, ffmpeg_cmd: str = "ffmpeg", engine: Optional[FFmpegEngine] = None):
         """
         初始化精剪工具类
         :param ffmpeg_cmd: ffmpeg 命令名称，默认为 'ffmpeg'（需在系统 PATH 中）
+        :param engine: 共享的 ffmpeg 执行引擎，默认使用全局引擎（限制并发进程数）
         """
         self.ffmpeg = ffmpeg_cmd
+        self.engine = engine if engine is not None else get_default_engine()
 
     def _run_ffmpeg(self, cmd_args: List[str]) -> bool:
         """
@@ -19,37 +31,31 @@ class VideoTrimmer:
         :param cmd_args: ffmpeg 参数列表，如 ['-i', 'input.mp4', 'output.mp4']
         :return: True 表示成功，False 表示失败（会打印错误日志）
         """
-        global full_cmd
-        try:
-            full_cmd = [self.ffmpeg] + cmd_args
-            result = subprocess.run(
-                full_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True
-            )
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"[❌ 精剪操作失败，命令：{' '.join(full_cmd)}]")
-            print(f"[错误详情]: {e.stderr.decode('utf-8', errors='ignore')}")
-            return False
-        except Exception as e:
-            print(f"[❌ 未知错误: {e}]")
-            return False
+        # 统一提交到共享执行引擎，由引擎负责进程并发控制与错误日志
+        return self.engine.run([self.ffmpeg] + cmd_args, label="精剪操作失败")
 
     # ======================================================================
     # 【1】调整剪辑点：精准多段剪辑（按时间段裁剪并拼接）
     # ======================================================================
 
-    def trim_by_segments(self, input_path: str, output_path: str, segments: List[Tuple[str, str]]) -> bool:
+    def trim_by_segments(self, input_path: str, output_path: str, segments: List[Tuple[str, str]],
+                         strategy: str = "auto") -> bool:
         """
         按多个时间段精准裁剪视频并拼接（多段剪辑）
         :param input_path: 输入视频路径，如 "inputs/cat_01.mp4"
         :param output_path: 输出视频路径，如 "outputs/trimmed_output.mp4"
         :param segments: 剪辑时间段列表，每个元素为 (开始时间, 结束时间)，如 [("00:00:05", "00:00:10"), ("00:00:15", "00:00:20")]
+        :param strategy: "graph"：一个 filter_complex 中用 trim / atrim 截取所有时间段（解码整个文件，适合少量时间段）；
+                         "seek"：每段输入端跳转、并行编码后拼接（适合成百上千个时间段、长时间素材）；
+                         "auto"（默认）：段数超过 SEEK_SEGMENT_THRESHOLD 时使用 "seek"
         :return: 成功返回 True，失败返回 False
         """
         safe_output = get_output_filepath(os.path.dirname(output_path), os.path.basename(output_path))
+        if strategy not in ("auto", "graph", "seek"):
+            print(f"[❌ 未知的多段剪辑策略：{strategy}]")
+            return False
+        if strategy == "seek" or (strategy == "auto" and len(segments) > SEEK_SEGMENT_THRESHOLD):
+            return self._trim_by_seeking(input_path, safe_output, segments)
         filter_parts = []
 
         for i, (start, end) in enumerate(segments):
@@ -74,18 +80,92 @@ class VideoTrimmer:
         ]
         return self._run_ffmpeg(cmd)
 
+    def _trim_by_seeking(self, input_path: str, safe_output: str, segments: List[Tuple[str, str]]) -> bool:
+        """
+        逐段输入端跳转的多段剪辑：每段只解码自身（从最近的关键帧开始），各段并行编码为中间文件，
+        再用 concat 拼接。中间文件的视频为 libx264、音频为无损 PCM，拼接时视频流复制、音频整体编码一次，
+        不会因 AAC 编码延迟在段与段之间产生间隙；concat 按每个文件的时长衔接，段数再多音画也不会累积偏移。
+        """
+        info = probe(input_path)
+        with_audio = info is None or info.has_audio
+        work_dir = tempfile.mkdtemp(prefix="segments_", dir=os.path.dirname(os.path.abspath(safe_output)))
+        try:
+            commands, parts = [], []
+            for i, (start, end) in enumerate(segments):
+                start_sec = parse_time(start)
+                part = os.path.join(work_dir, f"segment_{i:05d}.mkv")
+                commands.append([
+                    self.ffmpeg, '-y',
+                    '-ss', f"{start_sec:.6f}",                   # 输入端跳转：不解码之前的内容
+                    '-i', input_path,
+                    '-t', f"{parse_time(end) - start_sec:.6f}",
+                    '-map', '0:v:0',
+                ] + (['-map', '0:a:0', '-c:a', 'pcm_s16le'] if with_audio else []) + [
+                    '-c:v', 'libx264',
+                    '-avoid_negative_ts', 'make_zero',
+                    part
+                ])
+                parts.append(part)
+
+            list_file = os.path.join(work_dir, "segments.txt")
+            with open(list_file, 'w', encoding='utf-8') as f:
+                for part in parts:
+                    f.write(f"file '{part}'\n")
+
+            if not all(self.engine.run_many(commands, label="精剪操作失败")):
+                return False
+            cmd = ['-y', '-f', 'concat', '-safe', '0', '-i', list_file, '-c:v', 'copy']
+            cmd += ['-c:a', 'aac'] if with_audio else []
+            return self._run_ffmpeg(cmd + [safe_output])
+        finally:
+            # 捕获模式下（Project / 异步 API）等命令真正执行之后再删除中间文件
+            defer_cleanup(work_dir)
+
     # ======================================================================
-    # 【2】节奏控制：分段变速（可扩展，暂未完整实现复杂逻辑）
+    # 【2】节奏控制：分段变速（一次解码 / 编码完成所有变速区间）
     # ======================================================================
 
-    def adjust_speed_segments(self, input_path: str, output_path: str, speed_map: List[Tuple[str, str, float]]) -> bool:
+    def adjust_speed_segments(self, input_path: str, output_path: str, speed_map: List[Tuple[str, str, float]],
+                              ramp: float = 0.0) -> bool:
         """
-        对视频的不同时间段设置不同的播放速度（分段变速 / 慢动作 / 快进）
+        对视频的不同时间段设置不同的播放速度（分段变速 / 慢动作 / 快进），所有区间在一个 filter_complex 中完成
+        未覆盖的时间段保持原速；每个匀速小段的视频用 setpts、音频用 atempo（超出 0.5~2.0 时串联多级）变速，
+        音视频按相同倍速处理后再 concat，整段保持同步
         :param speed_map: 列表，每个元素为 (开始时间, 结束时间, 倍速)，如 [("00:00:05", "00:00:10", 2.0)]
-        :return: 成功返回 True，失败返回 False（复杂逻辑，留作扩展）
+        :param ramp: 速度渐变时长（源视频秒数）。大于 0 时，每次速度变化在进入新区间的前 ramp 秒内
+                     分 SPEED_RAMP_STEPS 级逐步过渡，而不是突变
+        :return: 成功返回 True，失败返回 False
         """
-        print("[⚠️] 分段变速功能（adjust_speed_segments）需要复杂的滤镜链，暂未实现，预留接口。")
-        return False
+        safe_output = get_output_filepath(os.path.dirname(output_path), os.path.basename(output_path))
+        info = probe(input_path)
+        try:
+            pieces = plan_speed_pieces(speed_map, ramp, info.duration if info is not None else None)
+        except ValueError as e:
+            print(f"[❌ 分段变速参数错误：{e}]")
+            return False
+        with_audio = info is None or info.has_audio
+
+        filter_parts = []
+        for i, (start, end, speed) in enumerate(pieces):
+            bounds = f"start={start:.6f}" + (f":end={end:.6f}" if end is not None else "")
+            # 视频：时间戳除以倍速；音频：atempo 逐级变速（不改变音高）
+            video_pts = "setpts=PTS-STARTPTS" if speed == 1 else f"setpts=(PTS-STARTPTS)/{speed:.6g}"
+            filter_parts.append(f"[0:v]trim={bounds},{video_pts}[v{i}];")
+            if with_audio:
+                tempo = "".join(f",atempo={factor:.6g}" for factor in atempo_chain(speed))
+                filter_parts.append(f"[0:a]atrim={bounds},asetpts=PTS-STARTPTS{tempo}[a{i}];")
+
+        count = len(pieces)
+        if with_audio:
+            streams = "".join(f"[v{i}][a{i}]" for i in range(count))
+            filter_complex = "".join(filter_parts) + f"{streams}concat=n={count}:v=1:a=1[outv][outa]"
+        else:
+            streams = "".join(f"[v{i}]" for i in range(count))
+            filter_complex = "".join(filter_parts) + f"{streams}concat=n={count}:v=1:a=0[outv]"
+
+        cmd = ['-y', '-i', input_path, '-filter_complex', filter_complex, '-map', '[outv]']
+        cmd += ['-map', '[outa]'] if with_audio else []
+        return self._run_ffmpeg(cmd + [safe_output])
 
     # ======================================================================
     # 【3】转场效果：淡入淡出（开头和结尾）
@@ -457,7 +537,10 @@ class VideoTrimmer:
     # =====================================================================
     def merge_videos(self, video_paths: list, output_path: str) -> bool:
         """
-        合并多个视频为一个视频（按顺序拼接，适用于相同分辨率/编码格式的视频）
+        合并多个视频为一个视频（按顺序拼接）
+        先探测每个片段的编码、分辨率、像素格式、帧率、时间基和音频采样率 / 声道，
+        以多数片段的参数作为目标规格：符合规格的片段直接流复制，不符合的片段并行重新编码为目标规格，
+        最后用 concat 分离器以 -c copy 拼接。所有片段一致时与原来一样只有一次流复制。
         :param video_paths: 视频路径列表，如 [cat_01.mp4, cat_02.mp4]
         :param output_path: 合并后的输出路径，如 outputs/merged.mp4
         :return: 是否成功
@@ -467,36 +550,51 @@ class VideoTrimmer:
             return False
 
         safe_output = get_output_filepath(os.path.dirname(output_path), os.path.basename(output_path))
-
-        # 创建临时文本文件，用于 ffmpeg concat 分离器（适用于相同编码视频）
-        list_file = os.path.join(os.path.dirname(safe_output), "file_list.txt")
+        # 临时目录由 mkdtemp 生成且每次调用唯一，多个合并任务并发执行时不会互相覆盖
+        work_dir = tempfile.mkdtemp(prefix="merge_", dir=os.path.dirname(os.path.abspath(safe_output)))
         try:
+            clips = [os.path.abspath(path) for path in video_paths]
+            infos = [probe(path) for path in clips]
+            normalize_cmds = []
+            if all(info is not None and info.has_video for info in infos):
+                target = pick_merge_profile(infos)
+                extension = os.path.splitext(safe_output)[1] or ".mp4"
+                for index, info in enumerate(infos):
+                    if merge_profile(info) == target:
+                        continue
+                    # 不符合目标规格的片段：重新编码到临时文件，拼接时替换原片段
+                    clips[index] = os.path.join(work_dir, f"normalized_{index:03d}{extension}")
+                    normalize_cmds.append([self.ffmpeg, '-y'] + _normalize_args(info, target, clips[index]))
+
+            list_file = os.path.join(work_dir, "file_list.txt")
             with open(list_file, 'w', encoding='utf-8') as f:
-                for path in video_paths:
-                    f.write(f"file '{os.path.abspath(path)}'\n")
+                for path in clips:
+                    f.write(f"file '{path}'\n")
         except Exception as e:
             print(f"[❌ 创建视频列表文件失败：{e}]")
+            defer_cleanup(work_dir)
             return False
 
-        # 使用 concat 分离器进行视频合并（最快最稳定，要求视频参数一致）
-        cmd = [
-            '-f', 'concat',
-            '-safe', '0',
-            '-i', list_file,
-            '-c', 'copy',  # 直接拷贝流，不重新编码，速度最快
-            safe_output
-        ]
-
-        success = self._run_ffmpeg(cmd)
-
-        # 清理临时文件
-        if os.path.exists(list_file):
-            try:
-                os.remove(list_file)
-            except:
-                pass
-
-        return success
+        try:
+            if normalize_cmds:
+                print(f"[🔧 {len(normalize_cmds)}/{len(clips)} 个片段与目标规格不一致，重新编码后再合并]")
+                # 规格化必须得到与流复制片段完全一致的参数，不能被 draft / preview 档位缩小或降帧率
+                with render_tier("final"):
+                    if not all(self.engine.run_many(normalize_cmds, label="精剪操作失败")):
+                        return False
+
+            # 使用 concat 分离器进行视频合并（所有片段参数已一致，直接拷贝流）
+            cmd = [
+                '-f', 'concat',
+                '-safe', '0',
+                '-i', list_file,
+                '-c', 'copy',  # 直接拷贝流，不重新编码，速度最快
+                safe_output
+            ]
+            return self._run_ffmpeg(cmd)
+        finally:
+            # 清理临时文件（捕获命令时推迟到命令真正执行之后，见 defer_cleanup）
+            defer_cleanup(work_dir)
 
     # ======================================================================
     #  补充方法
@@ -551,4 +649,132 @@ class VideoTrimmer:
                 safe_output
             ]
 
-        return self._run_ffmpeg(cmd)
\ No newline at end of file
+        return self._run_ffmpeg(cmd)
+
+
+# ======================================================================
+# 合并规格：concat 流复制要求所有片段的这些参数一致
+# ======================================================================
+# 目标编码 → 重新编码时使用的 ffmpeg 编码器（目标编码不在表中时统一使用 H.264 + AAC）
+_MERGE_VIDEO_ENCODERS = {'h264': 'libx264', 'hevc': 'libx265', 'mpeg4': 'mpeg4', 'vp9': 'libvpx-vp9'}
+_MERGE_AUDIO_ENCODERS = {'aac': 'aac', 'mp3': 'libmp3lame', 'opus': 'libopus'}
+
+
+def atempo_chain(speed: float) -> List[float]:
+    """
+    把任意倍速拆成若干级 atempo 因子（每级在 0.5~2.0 之间，乘积等于 speed）
+    :return: 因子列表，原速时为空列表，如 atempo_chain(6.0) → [2.0, 2.0, 1.5]
+    """
+    factors = []
+    while speed > ATEMPO_MAX:
+        factors.append(ATEMPO_MAX)
+        speed /= ATEMPO_MAX
+    while speed < ATEMPO_MIN:
+        factors.append(ATEMPO_MIN)
+        speed /= ATEMPO_MIN
+    if abs(speed - 1.0) > 1e-9:
+        factors.append(speed)
+    return factors
+
+
+def plan_speed_pieces(speed_map: List[Tuple[str, str, float]], ramp: float = 0.0,
+                      duration: Optional[float] = None) -> List[Tuple[float, Optional[float], float]]:
+    """
+    把变速区间展开为首尾相接的匀速小段（覆盖整个视频）
+    :param speed_map: [(开始时间, 结束时间, 倍速), ...]，区间不能重叠
+    :param ramp: 速度渐变时长（秒），0 表示速度突变
+    :param duration: 视频时长（秒），未知时最后一段截取到视频结尾
+    :return: [(起点秒, 终点秒或 None（到结尾）, 倍速), ...]
+    """
+    zones = sorted((parse_time(start), parse_time(end), float(speed)) for start, end, speed in speed_map)
+    if not zones:
+        raise ValueError("speed_map 为空")
+    for start, end, speed in zones:
+        if speed <= 0 or end <= start:
+            raise ValueError(f"无效的变速区间：({start}, {end}, {speed})")
+    for (_, prev_end, _), (next_start, _, _) in zip(zones, zones[1:]):
+        if next_start < prev_end:
+            raise ValueError(f"变速区间重叠：{next_start} < {prev_end}")
+
+    # 未覆盖的时间段按原速补齐
+    pieces, cursor = [], 0.0
+    for start, end, speed in zones:
+        if start > cursor:
+            pieces.append((cursor, start, 1.0))
+        pieces.append((start, end, speed))
+        cursor = end
+    if duration is None or duration > cursor:
+        pieces.append((cursor, duration, 1.0))
+
+    if ramp <= 0:
+        return pieces
+    # 速度变化处：在新区间的开头插入逐级过渡的小段
+    ramped = [pieces[0]]
+    for start, end, speed in pieces[1:]:
+        previous = ramped[-1][2]
+        length = ramp if end is None else min(ramp, (end - start) / 2)
+        if speed == previous or length <= 0:
+            ramped.append((start, end, speed))
+            continue
+        step = length / SPEED_RAMP_STEPS
+        for k in range(1, SPEED_RAMP_STEPS + 1):
+            ramp_speed = previous + (speed - previous) * k / (SPEED_RAMP_STEPS + 1)
+            ramped.append((start + step * (k - 1), start + step * k, round(ramp_speed, 6)))
+        ramped.append((start + length, end, speed))
+    return ramped
+
+
+def merge_profile(info) -> tuple:
+    """
+    片段的合并规格：((视频编码, 宽, 高, 像素格式, 帧率, 时间基), (音频编码, 采样率, 声道数) 或 None)
+    :param info: media_probe.MediaInfo
+    """
+    video, audio = info.video, info.audio
+    video_profile = (video.codec_name, video.width, video.height, video.pix_fmt,
+                     round(video.frame_rate or 0, 3), video.time_base)
+    audio_profile = (audio.codec_name, audio.sample_rate, audio.channels) if audio is not None else None
+    return video_profile, audio_profile
+
+
+def pick_merge_profile(infos: list) -> tuple:
+    """
+    选择目标规格：视频、音频分别取出现次数最多的规格（相同时取靠前的片段），
+    只要有片段带音频，目标就带音频（无音频的片段补静音）
+    """
+    profiles = [merge_profile(info) for info in infos]
+    video_profiles = [video for video, _ in profiles]
+    audio_profiles = [audio for _, audio in profiles if audio is not None]
+    video_target = max(video_profiles, key=lambda p: (video_profiles.count(p), -video_profiles.index(p)))
+    audio_target = max(audio_profiles, key=lambda p: (audio_profiles.count(p), -audio_profiles.index(p))) \
+        if audio_profiles else None
+    if video_target[0] not in _MERGE_VIDEO_ENCODERS:
+        video_target = ('h264',) + video_target[1:]
+    if audio_target is not None and audio_target[0] not in _MERGE_AUDIO_ENCODERS:
+        audio_target = ('aac',) + audio_target[1:]
+    return video_target, audio_target
+
+
+def _normalize_args(info, target: tuple, output_path: str) -> List[str]:
+    """把一个片段重新编码为目标规格的 ffmpeg 参数（不含 ffmpeg 本身）"""
+    (codec, width, height, pix_fmt, fps, time_base), audio_target = target
+    args = ['-i', info.path]
+    if audio_target is not None and not info.has_audio:
+        # 片段没有音频：补一路与目标规格相同的静音
+        layout = 'mono' if audio_target[2] == 1 else 'stereo'
+        args += ['-f', 'lavfi', '-i', f"anullsrc=r={audio_target[1] or 48000}:cl={layout}", '-shortest']
+    filters = [f"scale={width}:{height}:force_original_aspect_ratio=decrease",
+               f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2", "setsar=1"]
+    if fps:
+        filters.append(f"fps={fps}")
+    if pix_fmt:
+        filters.append(f"format={pix_fmt}")
+    args += ['-map', '0:v:0', '-vf', ','.join(filters), '-c:v', _MERGE_VIDEO_ENCODERS[codec]]
+    if time_base and '/' in time_base and os.path.splitext(output_path)[1].lower() in ('.mp4', '.mov', '.m4v'):
+        args += ['-video_track_timescale', time_base.split('/')[1]]  # 与其他片段使用相同的时间基
+    if audio_target is None:
+        return args + ['-an', output_path]
+    audio_codec, sample_rate, channels = audio_target
+    args += ['-map', '0:a:0' if info.has_audio else '1:a:0', '-c:a', _MERGE_AUDIO_ENCODERS[audio_codec]]
+    args += ['-ar', str(sample_rate)] if sample_rate else []
+    args += ['-ac', str(channels)] if channels else []
+    return args + [output_path]
@@ -0,0 +1,340 @@
+# watch_folder.py
+import argparse
+import inspect
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from batch_cli import BatchJournal, job_id_for
+from ffmpeg_engine import FFmpegEngine
+from job_metrics import JobMetrics
+from job_queue import JobResult, RenderJob, default_worker_id
+from operations import OperationRunner, resolve_operation
+from resource_governor import ResourceGovernor
+
+# ======================================================================
+# 监视文件夹：素材放入输入目录后自动按配置的流水线处理
+#   python watch_folder.py ingest.json
+# 配置示例（JSON）：
+#   {"input_dir": "inbox", "output_dir": "outputs",
+#    "pipeline": [
+#      {"operation": "VideoTrimmer.trim_by_segments", "params": {"segments": [["0", "30"]]}},
+#      {"operation": "ColorCorrection.apply_preset_style", "params": {"style": "douyin"}},
+#      {"operation": "ExportDistributor.export_all_platforms",
+#       "params": {"outputs_by_platform": {"douyin": "{output_dir}/{stem}_douyin.mp4",
+#                                          "bilibili": "{output_dir}/{stem}_bilibili.mp4"}}}]}
+# 参数中的字符串可以使用占位符：
+#   {input} 上一步的输出（第一步为素材本身）  {source} 素材路径  {name} 素材文件名
+#   {stem} 素材相对输入目录的路径、不含扩展名（如 "day1/clip"，子目录中的同名素材输出不会互相覆盖）
+#   {ext} 扩展名  {output_dir} 输出目录  {work_dir} 本次处理的临时目录（处理完成后删除）
+# 未指定时 input_path 取 {input}；output_path 在最后一步为 {output_dir}/{stem}{ext}，其余步骤为临时文件。
+# ======================================================================
+
+# 默认监视的素材扩展名
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.mkv', '.avi', '.flv', '.webm', '.ts', '.mts')
+# 上传中的临时文件后缀（浏览器 / rsync / 同步盘），始终忽略
+PARTIAL_SUFFIXES = ('.part', '.partial', '.tmp', '.crdownload', '.download', '.filepart')
+
+
+class IngestPipeline:
+    """
+    对一个素材依次执行的操作列表。每一步是一个 "类名.方法名" 操作（见 operations.resolve_operation），
+    上一步的输出作为下一步的输入。
+    """
+
+    def __init__(self, steps: List[Dict[str, Any]], output_dir: str, runner: Optional[OperationRunner] = None):
+        """
+        :param steps: [{"operation": "ColorCorrection.apply_preset_style", "params": {...}}, ...]
+        :param output_dir: 输出目录
+        :param runner: 执行操作的 OperationRunner，默认使用全局引擎
+        """
+        if not steps:
+            raise ValueError("流水线为空：至少需要一个操作")
+        self.steps: List[Tuple[str, Dict[str, Any], Set[str]]] = []
+        for index, step in enumerate(steps):
+            operation, params = step.get('operation'), step.get('params', {})
+            if not operation or not isinstance(params, dict):
+                raise ValueError(f"第 {index + 1} 步缺少 operation 或 params")
+            cls, method_name = resolve_operation(operation)
+            parameter_names = set(inspect.signature(getattr(cls, method_name)).parameters)
+            self.steps.append((operation, params, parameter_names))
+        self.output_dir = output_dir
+        self.runner = runner or OperationRunner()
+
+    def jobs_for(self, source: str, work_dir: str, relative: Optional[str] = None) -> List[RenderJob]:
+        """
+        展开占位符，得到处理某个素材的作业列表（不执行）
+        :param source: 素材路径
+        :param work_dir: 中间文件目录
+        :param relative: 素材相对输入目录的路径，决定 {stem} 与作业 ID，默认为文件名
+        """
+        name = os.path.basename(source)
+        stem, ext = os.path.splitext(relative or name)
+        context = {'source': source, 'name': name, 'stem': stem, 'ext': ext,
+                   'output_dir': self.output_dir, 'work_dir': work_dir, 'input': source}
+        jobs = []
+        for index, (operation, params, parameter_names) in enumerate(self.steps):
+            params = dict(params)
+            if 'input_path' in parameter_names:
+                params.setdefault('input_path', "{input}")
+            if 'output_path' in parameter_names:
+                if index == len(self.steps) - 1:
+                    params.setdefault('output_path', os.path.join("{output_dir}", "{stem}{ext}"))
+                else:
+                    # 临时目录每个素材一个，中间文件只用文件名
+                    params.setdefault('output_path', os.path.join("{work_dir}", f"step{index}{{ext}}"))
+            params = _expand(params, context)
+            if 'output_path' in params:
+                context['input'] = params['output_path']
+            jobs.append(RenderJob(operation, params, job_id=f"{stem}#{index}"))
+        return jobs
+
+    def run(self, source: str, relative: Optional[str] = None) -> bool:
+        """
+        处理一个素材：中间文件写到输出目录下的临时目录，完成后删除
+        :param relative: 素材相对输入目录的路径（见 jobs_for）
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix="ingest_", dir=self.output_dir)
+        try:
+            for job in self.jobs_for(source, work_dir, relative):
+                if self.runner.run(job.operation, job.params) is False:
+                    print(f"[❌ 流水线中断于 {job.operation}：{source}]")
+                    return False
+            return True
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class FolderWatcher:
+    """
+    轮询输入目录：文件大小与修改时间在 settle_seconds 内不再变化才视为上传完成，然后交给工作线程处理。
+    - 背压：排队 + 执行中的素材不超过 workers + queue_size 个，其余留在目录中，等有空位时再派发
+    - 不重复处理：每个素材按（相对路径, 大小, 修改时间）生成 ID，处理结果写入日志（JSON Lines）；
+      已成功的素材在重启后也不会再处理，失败的素材本次运行不再重试，重启后重试
+    """
+
+    def __init__(self, input_dir: str, pipeline: IngestPipeline, journal_path: Optional[str] = None,
+                 workers: int = 2, queue_size: Optional[int] = None, poll_interval: float = 1.0,
+                 settle_seconds: float = 2.0, extensions: Tuple[str, ...] = VIDEO_EXTENSIONS,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param input_dir: 监视的输入目录（包括子目录）
+        :param pipeline: 对每个素材执行的流水线
+        :param journal_path: 处理日志路径，默认 <输出目录>/.ingest_journal.jsonl
+        :param workers: 同时处理的素材数
+        :param queue_size: 等待处理的素材数上限，默认等于 workers
+        :param poll_interval: 扫描间隔（秒）
+        :param settle_seconds: 文件保持不变多久（秒）后视为上传完成
+        :param extensions: 处理的扩展名
+        :param clock: 单调时钟（便于测试）
+        """
+        if os.path.abspath(input_dir) == os.path.abspath(pipeline.output_dir):
+            raise ValueError("输出目录不能与输入目录相同，否则输出文件会被再次处理")
+        self.input_dir = input_dir
+        self.pipeline = pipeline
+        self.journal = BatchJournal(journal_path or os.path.join(pipeline.output_dir, ".ingest_journal.jsonl"))
+        self.workers = max(1, int(workers))
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.clock = clock
+        self.worker_id = default_worker_id()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest")
+        self._slots = threading.BoundedSemaphore(self.workers + (self.workers if queue_size is None else queue_size))
+        self._observed: Dict[str, Tuple[int, int, float]] = {}  # 路径 → (大小, 修改时间, 首次观察到该状态的时刻)
+        self._seen: Set[str] = set()  # 已派发（本次运行）的素材 ID
+        self._done = self.journal.completed()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stop = threading.Event()
+        self.processed = 0
+        self.failed = 0
+
+    # ----------------------------------------------------------------------
+    # 【1】扫描：找出上传完成且尚未处理的素材
+    # ----------------------------------------------------------------------
+    def scan(self) -> List[Tuple[str, str]]:
+        """
+        扫描一次输入目录
+        :return: 可以处理的 [(素材 ID, 路径)]，按修改时间先后排列
+        """
+        now = self.clock()
+        present, ready = set(), []
+        output_dir = os.path.abspath(self.pipeline.output_dir)
+        for root, dirs, files in os.walk(self.input_dir):
+            # 跳过隐藏目录，以及位于输入目录之内的输出目录
+            dirs[:] = [d for d in dirs if not d.startswith('.') and os.path.abspath(os.path.join(root, d)) != output_dir]
+            for name in files:
+                lower = name.lower()
+                if name.startswith('.') or lower.endswith(PARTIAL_SUFFIXES) or not lower.endswith(self.extensions):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # 扫描期间被移动或删除
+                if stat.st_size == 0:
+                    continue  # 刚创建、尚未写入内容
+                present.add(path)
+                previous = self._observed.get(path)
+                if previous is None or previous[:2] != (stat.st_size, stat.st_mtime_ns):
+                    self._observed[path] = (stat.st_size, stat.st_mtime_ns, now)
+                    continue
+                if now - previous[2] < self.settle_seconds:
+                    continue
+                key = self._key_for(path, stat.st_size, stat.st_mtime_ns)
+                if key not in self._seen and key not in self._done:
+                    ready.append((stat.st_mtime_ns, key, path))
+        for path in set(self._observed) - present:
+            del self._observed[path]
+        return [(key, path) for _, key, path in sorted(ready)]
+
+    def poll(self) -> int:
+        """
+        扫描并派发。队列已满时剩余的素材留到下一次扫描
+        :return: 本次派发的素材数
+        """
+        dispatched = 0
+        for key, path in self.scan():
+            if not self._slots.acquire(blocking=False):
+                break
+            self._seen.add(key)
+            with self._lock:
+                self._in_flight += 1
+            self._pool.submit(self._process, key, path)
+            dispatched += 1
+        return dispatched
+
+    # ----------------------------------------------------------------------
+    # 【2】运行
+    # ----------------------------------------------------------------------
+    def run(self, once: bool = False) -> None:
+        """
+        持续监视，直到 stop() 或 Ctrl+C
+        :param once: 处理完当前目录中的素材（包括仍在上传、稍后完成的）后退出，适合由定时任务调用
+        """
+        print(f"[👀 监视 {self.input_dir}，{self.workers} 个工作线程，日志 {self.journal.path}]")
+        try:
+            while not self._stop.is_set():
+                self.poll()
+                if once and self.idle():
+                    break
+                self._stop.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            print("[⏹️ 收到中断，等待处理中的素材完成...]")
+        finally:
+            self._pool.shutdown(wait=True)
+        print(f"[📊 监视结束：成功 {self.processed}，失败 {self.failed}]")
+
+    def idle(self) -> bool:
+        """没有处理中的素材，也没有等待上传完成的新文件"""
+        with self._lock:
+            if self._in_flight:
+                return False
+            handled = self._seen | self._done
+        return not self.scan() and all(self._key_for(path, size, mtime_ns) in handled
+                                       for path, (size, mtime_ns, _) in self._observed.items())
+
+    def stop(self) -> None:
+        """停止监视（处理中的素材会继续完成）"""
+        self._stop.set()
+
+    def _key_for(self, path: str, size: int, mtime_ns: int) -> str:
+        """素材 ID：同一路径被替换为新内容（大小或修改时间不同）时视为新素材"""
+        return job_id_for("ingest", {'path': os.path.relpath(path, self.input_dir), 'size': size, 'mtime_ns': mtime_ns})
+
+    def _process(self, key: str, path: str) -> None:
+        started, ok = time.time(), False
+        try:
+            try:
+                ok = self.pipeline.run(path, os.path.relpath(path, self.input_dir))
+                error = None if ok else "流水线返回 False"
+            except Exception:
+                error = traceback.format_exc(limit=5)
+            self.journal.append(JobResult(key, ok, self.worker_id, started, time.time(), error))
+        except OSError as e:
+            # 日志写入失败（目录被删除、磁盘已满等）：本次运行内仍不会重复处理（已在 _seen 中）
+            print(f"[❌ 写入处理日志失败：{e}]")
+        finally:
+            # 无论日志是否写入成功都要释放名额、减少计数，否则 idle() 永远不会为真
+            self._slots.release()
+            with self._lock:
+                self._in_flight -= 1
+                if ok:
+                    self.processed += 1
+                    self._done.add(key)
+                else:
+                    self.failed += 1
+        print(f"[{'✅' if ok else '❌'} {os.path.basename(path)} 处理{'完成' if ok else '失败'}，"
+              f"用时 {time.time() - started:.1f}s]")
+
+
+def _expand(value: Any, context: Dict[str, str]) -> Any:
+    """替换参数中的占位符（只替换已知的名称，滤镜表达式中的其他花括号保持不变）"""
+    if isinstance(value, str):
+        for name, replacement in context.items():
+            value = value.replace("{" + name + "}", replacement)
+        return value
+    if isinstance(value, list):
+        return [_expand(item, context) for item in value]
+    if isinstance(value, dict):
+        return {key: _expand(item, context) for key, item in value.items()}
+    return value
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口：python watch_folder.py ingest.json [--once]"""
+    parser = argparse.ArgumentParser(description="AutoVideoClip 监视文件夹：新素材上传完成后自动处理")
+    parser.add_argument('config', help="配置文件（JSON），包含 input_dir / output_dir / pipeline")
+    parser.add_argument('--input-dir', default=None, help="覆盖配置中的输入目录")
+    parser.add_argument('--output-dir', default=None, help="覆盖配置中的输出目录")
+    parser.add_argument('--workers', type=int, default=None, help="同时处理的素材数")
+    parser.add_argument('--queue-size', type=int, default=None, help="等待处理的素材数上限")
+    parser.add_argument('--poll', type=float, default=None, help="扫描间隔（秒）")
+    parser.add_argument('--settle', type=float, default=None, help="文件保持不变多久（秒）后视为上传完成")
+    parser.add_argument('--once', action='store_true', help="处理完当前素材后退出")
+    parser.add_argument('--ffmpeg', default="ffmpeg", help="ffmpeg 命令名称")
+    parser.add_argument('--max-processes', type=int, default=None, help="同时运行的 ffmpeg 进程数")
+    parser.add_argument('--governor', choices=('off', 'on', 'pin'), default='off',
+                        help="资源调度：on 按核心数与并行作业数分配线程数，pin 同时绑定 CPU")
+    parser.add_argument('--job-log', default=None, help="ffmpeg 资源记录（JSON Lines）文件路径")
+    parser.add_argument('--metrics-textfile', default=None, help="Prometheus textfile 路径")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        input_dir = args.input_dir or config['input_dir']
+        output_dir = args.output_dir or config['output_dir']
+        governor = ResourceGovernor(pin=args.governor == 'pin') if args.governor != 'off' else None
+        metrics = JobMetrics(args.job_log, args.metrics_textfile) if args.job_log or args.metrics_textfile else None
+        engine = FFmpegEngine(max_processes=args.max_processes, governor=governor, metrics=metrics)
+        pipeline = IngestPipeline(config.get('pipeline', []), output_dir, OperationRunner(args.ffmpeg, engine))
+    except (OSError, KeyError, ValueError) as e:
+        print(f"[❌ 读取配置失败：{e}]")
+        return 2
+
+    watcher = FolderWatcher(
+        input_dir, pipeline, journal_path=config.get('journal'),
+        workers=args.workers or config.get('workers', 2),
+        queue_size=args.queue_size if args.queue_size is not None else config.get('queue_size'),
+        poll_interval=args.poll if args.poll is not None else config.get('poll_interval', 1.0),
+        settle_seconds=args.settle if args.settle is not None else config.get('settle_seconds', 2.0),
+        extensions=tuple(config.get('extensions', VIDEO_EXTENSIONS)))
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    watcher.run(once=args.once)
+    engine.shutdown()
+    return 1 if watcher.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())